@@ -0,0 +1,181 @@
+# Servidor/cache_respuestas.py
+# Caché de respuestas de las vistas de consulta por fecha y por empleado.
+#
+# Cada respuesta se guarda bajo una etiqueta (por ejemplo ("pagos_fecha",
+# "2024-12-05")) con un número de versión propio. Al guardar o borrar un
+# registro se incrementa la versión de las etiquetas a las que pertenece, así
+# un cambio en una fecha solo invalida las respuestas de esa fecha. Con un
+# caché compartido entre procesos (archivos, Redis...) las versiones se
+# guardan en el mismo caché; con el LocMem de cada proceso viven en la base de
+# datos (Servidor/versiones.py), para que el cambio confirmado en un worker
+# invalide también el caché en memoria de los demás.
+import functools
+import hashlib
+import os
+from datetime import datetime
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import versiones as versiones_compartidas
+
+ALIAS = 'respuestas'
+CLAVE_ACIERTOS = 'respuestas:estadisticas:aciertos'
+CLAVE_FALLOS = 'respuestas:estadisticas:fallos'
+CLAVE_VERSION_GLOBAL = 'respuestas:version'
+
+
+class CacheArchivosLRU(FileBasedCache):
+    """
+    Caché en archivos compartida entre procesos que, al llenarse, descarta las
+    entradas usadas hace más tiempo en lugar de una muestra al azar.
+    """
+
+    def get(self, key, default=None, version=None):
+        valor = super().get(key, self, version)
+        if valor is self:
+            return default
+        # La fecha de modificación marca el último uso
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+        return valor
+
+    def _cull(self):
+        archivos = self._list_cache_files()
+        total = len(archivos)
+        if total < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def ultimo_uso(archivo):
+            try:
+                return os.path.getmtime(archivo)
+            except FileNotFoundError:
+                return 0
+
+        archivos.sort(key=ultimo_uso)
+        for archivo in archivos[:int(total / self._cull_frequency)]:
+            self._delete(archivo)
+
+
+def cache_respuestas():
+    return caches[ALIAS]
+
+
+def clave_version(etiqueta, valor):
+    return f'respuestas:version:{etiqueta}:{valor}'
+
+
+def contar(clave):
+    cache = cache_respuestas()
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 1, None)
+
+
+def estadisticas():
+    cache = cache_respuestas()
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    return {
+        "backend": f"{type(cache).__module__}.{type(cache).__name__}",
+        "aciertos": valores.get(CLAVE_ACIERTOS, 0),
+        "fallos": valores.get(CLAVE_FALLOS, 0),
+    }
+
+
+def versiones_en_base_de_datos():
+    return isinstance(cache_respuestas(), LocMemCache)
+
+
+def versiones(claves):
+    if versiones_en_base_de_datos():
+        encontradas = versiones_compartidas.versiones(claves)
+        return [encontradas[clave] for clave in claves]
+
+    cache = cache_respuestas()
+    encontradas = cache.get_many(claves)
+    for clave in claves:
+        if clave not in encontradas:
+            # Si una versión se pierde por desalojo, la nueva no coincide con
+            # ninguna anterior y no puede revivir respuestas viejas
+            version = versiones_compartidas.nueva_version()
+            cache.add(clave, version, None)
+            encontradas[clave] = cache.get(clave, version)
+    return [encontradas[clave] for clave in claves]
+
+
+def incrementar_versiones(claves):
+    if versiones_en_base_de_datos():
+        versiones_compartidas.incrementar(claves)
+        return
+
+    cache = cache_respuestas()
+    for clave in claves:
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, versiones_compartidas.nueva_version(), None)
+
+
+def invalidar(etiquetas):
+    """
+    Invalida las respuestas de un conjunto de pares (etiqueta, valor). Se
+    ejecuta después del commit para no volver a guardar datos sin confirmar.
+    """
+    etiquetas = set(etiquetas)
+    if not etiquetas:
+        return
+
+    transaction.on_commit(lambda: incrementar_versiones(
+        [clave_version(etiqueta, valor) for etiqueta, valor in etiquetas]
+    ))
+
+
+def invalidar_todo():
+    transaction.on_commit(lambda: incrementar_versiones([CLAVE_VERSION_GLOBAL]))
+
+
+def normalizar_fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date().isoformat()
+
+
+def cachear_respuesta(etiqueta, parametro, normalizar=str):
+    """
+    Guarda en caché las respuestas 200 de una vista GET. La clave incluye el
+    valor normalizado del parámetro de la URL, la versión de la etiqueta y la
+    cadena de consulta (cursor, límite...). Si el parámetro no se puede
+    normalizar, la vista responde sin caché (por ejemplo con su error 400).
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            try:
+                valor = normalizar(kwargs[parametro])
+            except ValueError:
+                return vista(request, *args, **kwargs)
+
+            cache = cache_respuestas()
+            version_global, version = versiones([CLAVE_VERSION_GLOBAL, clave_version(etiqueta, valor)])
+            consulta = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+            clave = f'respuestas:{etiqueta}:{valor}:{version_global}.{version}:{consulta}'
+
+            datos = cache.get(clave)
+            if datos is not None:
+                contar(CLAVE_ACIERTOS)
+                return Response(datos)
+
+            contar(CLAVE_FALLOS)
+            respuesta = vista(request, *args, **kwargs)
+            if isinstance(respuesta, Response) and respuesta.status_code == status.HTTP_200_OK:
+                cache.set(clave, respuesta.data)
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,80 @@
+# Servidor/condicional.py
+# Peticiones condicionales (ETag) para las listas.
+#
+# El ETag sale de Max(updated_at) y Count de los registros que forman la
+# respuesta y de las tablas relacionadas que lee el serializer (por ejemplo el
+# nombre del empleado), así que si nada cambió se responde 304 sin serializar
+# la lista. Max(updated_at) usa el índice de updated_at de cada modelo. Las
+# páginas por cursor no se validan: ya son baratas y la agregación recorrería
+# la tabla completa en cada página.
+#
+# No se envía Last-Modified: con resolución de un segundo y sin el conteo, un
+# cliente que solo mandara If-Modified-Since recibiría 304 después de borrar
+# un registro que no es el más reciente o de dos cambios en el mismo segundo.
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import Empleado
+from .paginacion import CursorInvalido, limite_de_pagina
+
+
+def consultas_de_la_respuesta(modelo, serializer_class, empleado_id=None):
+    """
+    Devuelve los querysets cuyos cambios alteran la respuesta: el del modelo y
+    uno por cada relación declarada en Meta.select_related del serializer.
+    """
+    consultas = [modelo.objects.all()]
+    for relacion in getattr(serializer_class.Meta, 'select_related', ()) if serializer_class else ():
+        consultas.append(modelo._meta.get_field(relacion).related_model.objects.all())
+
+    if empleado_id is not None:
+        consultas = [
+            consulta.filter(pk=empleado_id) if consulta.model is Empleado else consulta.filter(empleado_id=empleado_id)
+            for consulta in consultas
+        ]
+    return consultas
+
+
+def calcular_etag(consultas):
+    """
+    Calcula el ETag con una consulta de agregación por queryset.
+    """
+    marcas = []
+    for consulta in consultas:
+        agregado = consulta.order_by().aggregate(ultimo=Max('updated_at'), total=Count('pk'))
+        marcas.append(f"{consulta.model.__name__}:{agregado['total']}:{agregado['ultimo'] and agregado['ultimo'].isoformat()}")
+    return hashlib.md5('|'.join(marcas).encode()).hexdigest()
+
+
+def respuesta_condicional(modelo, serializer_class=None, por_empleado=False):
+    """
+    Atiende If-None-Match en las peticiones GET de una vista de lista sin
+    paginar. Con por_empleado=True el ETag se limita a los registros del
+    empleado de la URL.
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+            try:
+                if limite_de_pagina(request) is not None:
+                    return vista(request, *args, **kwargs)
+            except CursorInvalido:
+                return vista(request, *args, **kwargs)
+
+            empleado_id = kwargs.get('empleado_id') if por_empleado else None
+            etag = quote_etag(calcular_etag(consultas_de_la_respuesta(modelo, serializer_class, empleado_id)))
+
+            respuesta = get_conditional_response(request, etag=etag)
+            if respuesta is None:
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code == 200:
+                    respuesta.headers.setdefault('ETag', etag)
+            return respuesta
+        return envoltura
+    return decorador
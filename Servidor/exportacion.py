@@ -0,0 +1,67 @@
+# Servidor/exportacion.py
+# Exportación de pagos a CSV en flujo.
+#
+# Los pagos se leen por lotes con iterator(chunk_size=...) (cursor del lado del
+# servidor en PostgreSQL) y cada fila se escribe en cuanto se lee, así la
+# memoria no depende de cuántos pagos tenga el periodo.
+import csv
+
+from .models import Pago
+
+TAMANO_LOTE = 2000
+
+COLUMNAS_PAGOS = [
+    'id', 'empleado', 'nombre_empleado', 'fecha_pago', 'semana', 'monto_a_pagar',
+    'dias_faltados', 'descuento', 'total_abonos', 'sueldo_base', 'total_pagado',
+]
+
+
+class Eco:
+    """
+    Objeto con la interfaz de un archivo que devuelve lo que se le escribe,
+    para que csv.writer produzca cada fila como texto.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def pagos_a_exportar(desde=None, hasta=None):
+    pagos = Pago.objects.order_by('fecha_pago', 'id')
+    if desde:
+        pagos = pagos.filter(fecha_pago__gte=desde)
+    if hasta:
+        pagos = pagos.filter(fecha_pago__lte=hasta)
+    return pagos.values_list(
+        'id', 'empleado_id', 'empleado__nombre', 'fecha_pago', 'semana', 'monto_a_pagar', 'detalle'
+    )
+
+
+def aplanar_detalle(detalle):
+    """
+    Devuelve las columnas del desglose de un pago. Los pagos capturados a mano
+    pueden no tener desglose, en ese caso las columnas quedan vacías.
+    """
+    if not isinstance(detalle, dict):
+        detalle = {}
+    faltas = detalle.get('faltas') if isinstance(detalle.get('faltas'), dict) else {}
+    return [
+        faltas.get('dias_faltados', ''),
+        faltas.get('descuento', ''),
+        detalle.get('total_abonos', ''),
+        detalle.get('sueldo_base', ''),
+        detalle.get('total_pagado', ''),
+    ]
+
+
+def csv_de_pagos(pagos, tamano_lote=TAMANO_LOTE):
+    """
+    Genera el CSV de los pagos línea por línea, empezando por el encabezado.
+    """
+    escritor = csv.writer(Eco())
+    yield escritor.writerow(COLUMNAS_PAGOS)
+    for pago_id, empleado_id, nombre, fecha_pago, semana, monto, detalle in pagos.iterator(chunk_size=tamano_lote):
+        yield escritor.writerow([
+            pago_id, empleado_id, nombre, fecha_pago.isoformat(), semana.isoformat() if semana else '', monto,
+            *aplanar_detalle(detalle),
+        ])
@@ -0,0 +1,202 @@
+# Servidor/instrumentacion.py
+# Medición por petición: consultas SQL, tiempo en la base de datos, tiempo de
+# serialización y tiempo total.
+#
+# Los tiempos se exponen en la cabecera Server-Timing y las peticiones que
+# pasan de INSTRUMENTACION_UMBRAL_LENTO_MS se registran en el log con las
+# consultas más lentas. Las consultas se miden con execute_wrapper, así que no
+# depende de DEBUG ni guarda la lista completa de consultas.
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    def __init__(self, consultas_top):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_serializacion = 0.0
+        self.consultas_top = consultas_top
+        self.mas_lentas = []  # Montículo de (duración, orden, sql) con las N más lentas
+
+    def registrar_consulta(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo_sql += duracion
+        if self.consultas_top:
+            entrada = (duracion, self.consultas, sql)
+            if len(self.mas_lentas) < self.consultas_top:
+                heapq.heappush(self.mas_lentas, entrada)
+            elif duracion > self.mas_lentas[0][0]:
+                heapq.heapreplace(self.mas_lentas, entrada)
+
+    def sumar_serializacion(self, inicio, sql_inicio):
+        # Las consultas que se ejecutan durante la serialización cuentan como SQL
+        self.tiempo_serializacion += time.perf_counter() - inicio - (self.tiempo_sql - sql_inicio)
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+@contextmanager
+def medir_serializacion():
+    """
+    Suma al tiempo de serialización de la petición en curso lo que tarde el
+    bloque, sin contar las consultas que se ejecuten dentro (querysets
+    perezosos). No hace nada si la instrumentación está apagada.
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio, sql_inicio = time.perf_counter(), medicion.tiempo_sql
+    try:
+        yield
+    finally:
+        medicion.sumar_serializacion(inicio, sql_inicio)
+
+
+class InstrumentacionMiddleware:
+    """
+    Agrega Server-Timing a cada respuesta y registra las peticiones lentas. Se
+    apaga con INSTRUMENTACION_ACTIVA = False. Funciona igual bajo WSGI y ASGI,
+    sin adaptar la cadena de middlewares entre sync y async.
+
+    Las respuestas en streaming (la exportación de pagos) leen la base de
+    datos mientras se envían, después de mandar las cabeceras: no llevan
+    Server-Timing y la medición termina, con su registro si es lenta, al
+    cerrarse el contenido.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_ACTIVA', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.umbral_lento = getattr(settings, 'INSTRUMENTACION_UMBRAL_LENTO_MS', 500) / 1000
+        self.consultas_top = getattr(settings, 'INSTRUMENTACION_CONSULTAS_TOP', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def iniciar_medicion(self, request):
+        """
+        Envuelve las conexiones del hilo actual y devuelve (medición, pila); al
+        cerrar la pila se dejan de medir las consultas.
+        """
+        medicion = Medicion(self.consultas_top)
+        pila = ExitStack()
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(medicion))
+        request._medicion = medicion
+        return medicion, pila
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        medicion, pila = self.iniciar_medicion(request)
+        token = _medicion_actual.set(medicion)
+        try:
+            respuesta = self.get_response(request)
+        except BaseException:
+            pila.close()
+            raise
+        finally:
+            _medicion_actual.reset(token)
+        return self.terminar_medicion(request, respuesta, medicion, pila, inicio)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        # Bajo ASGI las consultas se ejecutan en el hilo de sync_to_async de la
+        # petición, así que se envuelven las conexiones de ese hilo
+        medicion, pila = await sync_to_async(self.iniciar_medicion)(request)
+        token = _medicion_actual.set(medicion)
+        try:
+            respuesta = await self.get_response(request)
+        except BaseException:
+            pila.close()
+            raise
+        finally:
+            _medicion_actual.reset(token)
+        return self.terminar_medicion(request, respuesta, medicion, pila, inicio)
+
+    def terminar_medicion(self, request, respuesta, medicion, pila, inicio):
+        if respuesta.streaming:
+            respuesta.streaming_content = self.medir_contenido(request, respuesta, medicion, pila, inicio)
+            return respuesta
+
+        pila.close()
+        total = time.perf_counter() - inicio
+        respuesta.headers['Server-Timing'] = ', '.join([
+            f'db;dur={medicion.tiempo_sql * 1000:.1f};desc="{medicion.consultas} consultas"',
+            f'ser;dur={medicion.tiempo_serializacion * 1000:.1f}',
+            f'app;dur={max(total - medicion.tiempo_sql - medicion.tiempo_serializacion, 0) * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        if total >= self.umbral_lento:
+            self.registrar_peticion_lenta(request, respuesta, medicion, total)
+        return respuesta
+
+    def medir_contenido(self, request, respuesta, medicion, pila, inicio):
+        contenido = respuesta.streaming_content
+
+        def terminar():
+            pila.close()
+            total = time.perf_counter() - inicio
+            if total >= self.umbral_lento:
+                self.registrar_peticion_lenta(request, respuesta, medicion, total)
+
+        if respuesta.is_async:
+            async def medir():
+                try:
+                    async for parte in contenido:
+                        yield parte
+                finally:
+                    terminar()
+        else:
+            def medir():
+                try:
+                    yield from contenido
+                finally:
+                    terminar()
+        return medir()
+
+    def process_template_response(self, request, response):
+        # Las respuestas de DRF se convierten a JSON después de la vista
+        medicion = getattr(request, '_medicion', None)
+        if medicion is not None:
+            inicio, sql_inicio = time.perf_counter(), medicion.tiempo_sql
+            response.add_post_render_callback(lambda respuesta: medicion.sumar_serializacion(inicio, sql_inicio))
+        return response
+
+    def registrar_peticion_lenta(self, request, respuesta, medicion, total):
+        registro = {
+            "metodo": request.method,
+            "ruta": request.get_full_path(),
+            "estado": respuesta.status_code,
+            "total_ms": round(total * 1000, 1),
+            "sql_ms": round(medicion.tiempo_sql * 1000, 1),
+            "serializacion_ms": round(medicion.tiempo_serializacion * 1000, 1),
+            "consultas": medicion.consultas,
+            "consultas_mas_lentas": [
+                {"ms": round(duracion * 1000, 1), "sql": sql}
+                for duracion, _, sql in sorted(medicion.mas_lentas, reverse=True)
+            ],
+        }
+        logger.warning("Petición lenta %s", json.dumps(registro, ensure_ascii=False), extra={"peticion_lenta": registro})
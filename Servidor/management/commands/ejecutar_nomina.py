@@ -0,0 +1,141 @@
+# Servidor/management/commands/ejecutar_nomina.py
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from Servidor.models import Empleado
+from Servidor.nomina import calcular_nomina, registrar_nomina, semana_de_pago
+from Servidor.salarios import sueldos_vigentes
+
+
+def iniciar_proceso():
+    # Con "spawn" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+def pagar_lote(numero, fecha_pago, empleado_ids):
+    """
+    Calcula y registra el pago de un lote de empleados en su propia conexión y
+    transacción. Devuelve un resumen con el tiempo empleado.
+    """
+    inicio = time.perf_counter()
+    try:
+        # Fuera de la transacción, para que los sueldos queden en memoria del proceso
+        sueldos = sueldos_vigentes(empleado_ids, fecha_pago)
+        with transaction.atomic():
+            calculos, sin_salario = calcular_nomina(fecha_pago, empleado_ids=empleado_ids, bloquear=True, sueldos=sueldos)
+            pagos = registrar_nomina(calculos, fecha_pago)
+        error = None
+    except Exception as exc:  # El lote se revierte completo; los demás siguen
+        pagos, sin_salario, error = [], [], str(exc)
+    finally:
+        connections.close_all()
+
+    return {
+        "lote": numero,
+        "empleados": len(empleado_ids),
+        "pagos": len(pagos),
+        "sin_salario": sin_salario,
+        "segundos": time.perf_counter() - inicio,
+        "error": error,
+    }
+
+
+def resultado_del_lote(numero, empleado_ids, futuro):
+    # Un proceso hijo que termina de golpe (BrokenProcessPool) cuenta como lote
+    # fallido, sin perder el resumen de los demás lotes
+    try:
+        return futuro.result()
+    except Exception as exc:
+        return {
+            "lote": numero,
+            "empleados": len(empleado_ids),
+            "pagos": 0,
+            "sin_salario": [],
+            "segundos": 0,
+            "error": f"{type(exc).__name__}: {exc}",
+        }
+
+
+class Command(BaseCommand):
+    help = "Registra la nómina de todos los empleados repartiéndolos en lotes que se procesan en paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help="Fecha de pago YYYY-MM-DD (por defecto hoy).")
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help="Número de procesos; con 1 se ejecuta en este mismo proceso.")
+        parser.add_argument('--lotes', type=int,
+                            help="Número de lotes en que se reparten los empleados (por defecto uno por proceso).")
+
+    def handle(self, *args, **options):
+        fecha_pago = date.today()
+        if options['fecha']:
+            try:
+                fecha_pago = datetime.strptime(options['fecha'], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("Formato de fecha inválido. Use 'YYYY-MM-DD'.")
+        procesos = max(1, options['procesos'])
+        numero_lotes = max(1, options['lotes'] or procesos)
+
+        # Los empleados ya pagados en la semana se omiten, igual que en registrar_pagos_masivo
+        empleado_ids = list(
+            Empleado.objects.exclude(pago__semana=semana_de_pago(fecha_pago))
+            .order_by('id').values_list('id', flat=True)
+        )
+        if not empleado_ids:
+            self.stdout.write("No hay empleados pendientes de pago.")
+            return
+
+        # Lotes contiguos por id para que cada uno lea rangos compactos de las tablas
+        tamano = -(-len(empleado_ids) // numero_lotes)
+        lotes = [empleado_ids[i:i + tamano] for i in range(0, len(empleado_ids), tamano)]
+
+        if connection.vendor == 'sqlite' and procesos > 1:
+            self.stderr.write("SQLite solo admite un escritor a la vez; los lotes se procesarán en un solo proceso.")
+            procesos = 1
+
+        inicio = time.perf_counter()
+        if procesos == 1:
+            resultados = [pagar_lote(numero, fecha_pago, lote) for numero, lote in enumerate(lotes, 1)]
+        else:
+            # Los procesos hijos no deben heredar la conexión abierta del padre
+            connections.close_all()
+            contexto = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=iniciar_proceso) as executor:
+                futuros = [
+                    executor.submit(pagar_lote, numero, fecha_pago, lote)
+                    for numero, lote in enumerate(lotes, 1)
+                ]
+                resultados = [
+                    resultado_del_lote(numero, lote, futuro)
+                    for (numero, lote), futuro in zip(enumerate(lotes, 1), futuros)
+                ]
+        total = time.perf_counter() - inicio
+
+        for resultado in resultados:
+            linea = (
+                f"Lote {resultado['lote']}: {resultado['pagos']}/{resultado['empleados']} pagos "
+                f"en {resultado['segundos']:.3f}s"
+            )
+            if resultado['sin_salario']:
+                linea += f", sin salario: {resultado['sin_salario']}"
+            if resultado['error']:
+                self.stderr.write(self.style.ERROR(f"{linea}, error: {resultado['error']}"))
+            else:
+                self.stdout.write(linea)
+
+        pagos = sum(resultado['pagos'] for resultado in resultados)
+        resumen = f"{pagos} pagos registrados en {len(lotes)} lotes con {procesos} procesos en {total:.3f}s."
+        fallidos = [resultado['lote'] for resultado in resultados if resultado['error']]
+        if fallidos:
+            # CommandError termina manage.py con código de salida 1
+            raise CommandError(
+                f"{resumen} Los lotes {fallidos} fallaron y se revirtieron; vuelva a ejecutar para completarlos."
+            )
+        self.stdout.write(self.style.SUCCESS(resumen))
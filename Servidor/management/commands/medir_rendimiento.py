@@ -0,0 +1,242 @@
+# Servidor/management/commands/medir_rendimiento.py
+import json
+import math
+import platform
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from Servidor import urls
+from Servidor.models import Empleado, Asistencia, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
+
+# Modelo del <int:pk> de cada ruta de detalle
+MODELOS_DE_DETALLE = {
+    'empleado-detail': Empleado,
+    'asistencia-detail': Asistencia,
+    'vacacion-detail': Vacacion,
+    'vacacion-tomada-detail': VacacionTomada,
+    'salario-detail': Salario,
+    'prestamo-detail': Prestamo,
+    'abono-detail': Abono,
+    'pago-detail': Pago,
+}
+
+# Campo del que sale el <str:fecha> de cada ruta (la fecha más reciente con datos)
+FECHAS = {
+    'asistencia_por_fecha': (Asistencia, 'fecha'),
+    'pagos_por_fecha': (Pago, 'fecha_pago'),
+}
+
+# Campo del que sale el ?desde=&hasta= de cada ruta por rango (las últimas cuatro semanas con datos)
+RANGOS = {
+    'asistencia_por_rango': (Asistencia, 'fecha'),
+    'pagos_por_rango': (Pago, 'fecha_pago'),
+}
+
+# Rutas que se miden con POST; su trabajo se revierte al terminar cada petición
+ESCRITURAS = {'registrar_pago', 'registrar_pagos_masivo', 'asistencia_masiva'}
+
+MAXIMO_ASISTENCIAS_MASIVAS = 100
+
+
+def percentil(valores, porcentaje):
+    """
+    Percentil por rango más cercano de una lista ordenada.
+    """
+    posicion = max(math.ceil(porcentaje / 100 * len(valores)) - 1, 0)
+    return valores[posicion]
+
+
+def resumen_de_latencias(latencias):
+    ordenadas = sorted(latencias)
+    return {
+        "p50": round(percentil(ordenadas, 50), 3),
+        "p90": round(percentil(ordenadas, 90), 3),
+        "p95": round(percentil(ordenadas, 95), 3),
+        "p99": round(percentil(ordenadas, 99), 3),
+        "max": round(ordenadas[-1], 3),
+        "promedio": round(statistics.fmean(ordenadas), 3),
+    }
+
+
+class Reversion(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia (percentiles) y el número de consultas SQL de cada URL de Servidor/urls.py "
+        "sobre los datos actuales, guarda el resultado en JSON y lo compara con una corrida anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--salida', default='rendimiento.json', help="Archivo JSON con los resultados.")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior para detectar regresiones.")
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.25,
+            help="Aumento relativo de la latencia p50 que se considera regresión (0.25 = 25%%)."
+        )
+        parser.add_argument(
+            '--margen-ms', type=float, default=1.0,
+            help="Aumento absoluto mínimo de la latencia p50 para reportarlo, para ignorar el ruido en rutas rápidas."
+        )
+        parser.add_argument(
+            '--con-cache', action='store_true',
+            help="No vaciar los cachés antes de cada petición (mide las respuestas en caché)."
+        )
+
+    def handle(self, *args, **options):
+        if not Empleado.objects.exists():
+            raise CommandError("No hay datos. Ejecute primero: python manage.py sembrar_datos")
+
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*', '') and not host.startswith('.')), 'localhost')
+        cliente = Client(HTTP_HOST=host)
+        repeticiones = max(options['repeticiones'], 1)
+
+        rutas, omitidas = {}, {}
+        for patron in urls.urlpatterns:
+            if not isinstance(patron, URLPattern) or not patron.name:
+                continue
+            try:
+                metodo, url, cuerpo = self.peticion(patron)
+            except LookupError as error:
+                omitidas[patron.name] = str(error)
+                self.stderr.write(self.style.WARNING(f"{patron.name}: omitida ({error})"))
+                continue
+            rutas[patron.name] = self.medir(cliente, metodo, url, cuerpo, repeticiones, options['con_cache'])
+            self.stdout.write(
+                f"{patron.name:<32}{metodo:<6}{rutas[patron.name]['estado']:>5}"
+                f"{rutas[patron.name]['consultas']:>6} consultas  p50 {rutas[patron.name]['latencia_ms']['p50']:>9.3f} ms"
+                f"  p95 {rutas[patron.name]['latencia_ms']['p95']:>9.3f} ms"
+            )
+
+        resultado = {
+            "fecha": timezone.now().isoformat(),
+            "base_de_datos": connection.vendor,
+            "python": platform.python_version(),
+            "repeticiones": repeticiones,
+            "con_cache": options['con_cache'],
+            "registros": {
+                modelo.__name__: modelo.objects.count()
+                for modelo in (Empleado, Asistencia, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago)
+            },
+            "rutas": rutas,
+            "omitidas": omitidas,
+        }
+        with open(options['salida'], 'w') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+        if options['comparar']:
+            with open(options['comparar']) as archivo:
+                anterior = json.load(archivo)
+            regresiones = self.regresiones(anterior.get('rutas', {}), rutas, options['tolerancia'], options['margen_ms'])
+            for regresion in regresiones:
+                self.stderr.write(self.style.ERROR(regresion))
+            if regresiones:
+                raise CommandError(f"{len(regresiones)} regresiones respecto a {options['comparar']}")
+            self.stdout.write(self.style.SUCCESS(f"Sin regresiones respecto a {options['comparar']}"))
+
+    def peticion(self, patron):
+        """
+        Devuelve (método, url, cuerpo) de una ruta, tomando los parámetros de
+        los datos existentes. Lanza LookupError si no hay datos para la ruta.
+        """
+        empleado = Empleado.objects.filter(prestamo__isnull=False).order_by('id').values_list('id', flat=True).first()
+        if empleado is None:
+            empleado = Empleado.objects.order_by('id').values_list('id', flat=True).first()
+
+        parametros = {}
+        for nombre in patron.pattern.converters:
+            if nombre == 'empleado_id':
+                parametros[nombre] = empleado
+            elif nombre == 'pk' and patron.name in MODELOS_DE_DETALLE:
+                parametros[nombre] = MODELOS_DE_DETALLE[patron.name].objects.order_by('id').values_list('id', flat=True).first()
+            elif nombre == 'fecha' and patron.name in FECHAS:
+                modelo, campo = FECHAS[patron.name]
+                fecha = modelo.objects.aggregate(fecha=Max(campo))['fecha']
+                parametros[nombre] = fecha and fecha.isoformat()
+            else:
+                raise LookupError(f"no se sabe cómo llenar el parámetro '{nombre}'")
+            if parametros[nombre] is None:
+                raise LookupError(f"no hay datos para el parámetro '{nombre}'")
+        url = reverse(patron.name, kwargs=parametros)
+        if patron.name in RANGOS:
+            modelo, campo = RANGOS[patron.name]
+            hasta = modelo.objects.aggregate(fecha=Max(campo))['fecha']
+            if hasta is None:
+                raise LookupError("no hay datos para el rango de fechas")
+            url += f'?desde={hasta - timedelta(days=27)}&hasta={hasta}'
+
+        if patron.name not in ESCRITURAS:
+            return 'GET', url, None
+        if patron.name == 'asistencia_masiva':
+            ids = Empleado.objects.order_by('id').values_list('id', flat=True)[:MAXIMO_ASISTENCIAS_MASIVAS]
+            return 'POST', url, {
+                "fecha": timezone.localdate().isoformat(),
+                "asistencias": [{"empleado": empleado_id, "asistencia": True} for empleado_id in ids],
+            }
+        return 'POST', url, {}
+
+    def medir(self, cliente, metodo, url, cuerpo, repeticiones, con_cache):
+        latencias, consultas, estados = [], set(), set()
+        for _ in range(repeticiones):
+            if not con_cache:
+                for alias in settings.CACHES:
+                    caches[alias].clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                if metodo == 'GET':
+                    respuesta = cliente.get(url)
+                else:
+                    respuesta = self.escribir_y_revertir(cliente, url, cuerpo)
+                if respuesta.streaming:
+                    # Las respuestas en flujo hacen su trabajo al leerse
+                    b''.join(respuesta.streaming_content)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            consultas.add(len([consulta for consulta in capturadas if 'SAVEPOINT' not in consulta['sql']]))
+            estados.add(respuesta.status_code)
+
+        return {
+            "url": url,
+            "metodo": metodo,
+            "estado": max(estados),
+            "consultas": max(consultas),
+            "consultas_variables": len(consultas) > 1,
+            "latencia_ms": resumen_de_latencias(latencias),
+        }
+
+    def escribir_y_revertir(self, cliente, url, cuerpo):
+        # Cada repetición hace el trabajo completo sobre los mismos datos
+        try:
+            with transaction.atomic():
+                respuesta = cliente.post(url, cuerpo, content_type='application/json')
+                raise Reversion
+        except Reversion:
+            return respuesta
+
+    def regresiones(self, anteriores, actuales, tolerancia, margen_ms):
+        regresiones = []
+        for nombre, actual in actuales.items():
+            anterior = anteriores.get(nombre)
+            if anterior is None:
+                continue
+            if actual['consultas'] > anterior['consultas']:
+                regresiones.append(f"{nombre}: {anterior['consultas']} -> {actual['consultas']} consultas")
+            p50_anterior, p50_actual = anterior['latencia_ms']['p50'], actual['latencia_ms']['p50']
+            if p50_actual > p50_anterior * (1 + tolerancia) and p50_actual - p50_anterior > margen_ms:
+                regresiones.append(f"{nombre}: p50 {p50_anterior:.3f} -> {p50_actual:.3f} ms")
+            if actual['estado'] != anterior['estado']:
+                regresiones.append(f"{nombre}: estado {anterior['estado']} -> {actual['estado']}")
+        return regresiones
@@ -0,0 +1,68 @@
+# Servidor/management/commands/medir_serializacion.py
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from Servidor import serializers
+from Servidor.models import Empleado, Asistencia, ResumenAsistenciaSemanal, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
+
+LISTAS = [
+    (Empleado, serializers.EmpleadoSerializer),
+    (Asistencia, serializers.AsistenciaSerializer),
+    (ResumenAsistenciaSemanal, serializers.ResumenAsistenciaSemanalSerializer),
+    (Vacacion, serializers.VacacionSerializer),
+    (VacacionTomada, serializers.VacacionTomadaSerializer),
+    (Salario, serializers.SalarioSerializer),
+    (Prestamo, serializers.PrestamoSerializer),
+    (Abono, serializers.AbonoSerializer),
+    (Pago, serializers.PagoSerializer),
+]
+
+
+def mejor_tiempo(funcion, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, resultado
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el tiempo de serializar cada lista completa con los serializers de DRF y con la "
+        "lectura rápida desde .values(), incluyendo la consulta y el render a JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help="Se reporta el mejor tiempo de N corridas.")
+        parser.add_argument('--limite', type=int, default=None, help="Máximo de registros por lista.")
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        repeticiones = max(options['repeticiones'], 1)
+
+        self.stdout.write(f"{'lista':<36}{'registros':>10}{'drf (s)':>10}{'rápida (s)':>12}{'registros/s':>14}{'factor':>8}")
+        for modelo, serializer_class in LISTAS:
+            queryset = modelo.objects.order_by('id')[:options['limite']]
+
+            tiempo_drf, salida_drf = mejor_tiempo(
+                lambda: renderer.render(serializer_class(serializers.precargar(queryset, serializer_class), many=True).data),
+                repeticiones
+            )
+            tiempo_rapido, salida_rapida = mejor_tiempo(
+                lambda: renderer.render(serializers.serializar_lista(queryset, serializer_class)),
+                repeticiones
+            )
+            if salida_drf != salida_rapida:
+                self.stderr.write(self.style.ERROR(f"{serializer_class.__name__}: la salida no coincide con DRF."))
+
+            registros = queryset.count()
+            por_segundo = registros / tiempo_rapido if tiempo_rapido else 0
+            factor = tiempo_drf / tiempo_rapido if tiempo_rapido else 0
+            self.stdout.write(
+                f"{serializer_class.__name__:<36}{registros:>10}{tiempo_drf:>10.4f}{tiempo_rapido:>12.4f}"
+                f"{por_segundo:>14.0f}{factor:>7.1f}x"
+            )
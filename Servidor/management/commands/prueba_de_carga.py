@@ -0,0 +1,92 @@
+# Servidor/management/commands/prueba_de_carga.py
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Servidor.management.commands.medir_rendimiento import resumen_de_latencias
+
+RUTAS_POR_DEFECTO = [
+    '/api/empleados/',
+    '/api/empleado/1/pagos/',
+    '/api/empleado/1/prestamos/',
+    '/api/asistencias/?limite=100',
+    '/api/pagos/?limite=100',
+    '/api/pagos/previsualizar/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera carga concurrente contra un servidor en ejecución (por ejemplo gunicorn con "
+        "gunicorn.conf.py) y reporta peticiones por segundo y latencias, para comparar perfiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Dirección base del servidor.")
+        parser.add_argument('--ruta', action='append', dest='rutas', help="Ruta a pedir; se puede repetir.")
+        parser.add_argument('--concurrencia', type=int, default=16, help="Clientes simultáneos.")
+        parser.add_argument('--duracion', type=float, default=10, help="Segundos de carga.")
+        parser.add_argument('--salida', help="Archivo JSON con los resultados.")
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        rutas = options['rutas'] or RUTAS_POR_DEFECTO
+        try:
+            urllib.request.urlopen(base + rutas[0], timeout=10).read()
+        except (urllib.error.URLError, OSError) as error:
+            raise CommandError(f"No se pudo conectar con {base}: {error}")
+
+        siguiente_ruta = cycle(rutas)
+        candado = threading.Lock()
+        latencias, errores = [], {}
+        fin = time.perf_counter() + options['duracion']
+
+        def cliente():
+            while time.perf_counter() < fin:
+                with candado:
+                    ruta = next(siguiente_ruta)
+                inicio = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(base + ruta, timeout=30) as respuesta:
+                        respuesta.read()
+                    error = None
+                except urllib.error.HTTPError as excepcion:
+                    error = f"HTTP {excepcion.code}"
+                except (urllib.error.URLError, OSError) as excepcion:
+                    error = type(excepcion).__name__
+                transcurrido = (time.perf_counter() - inicio) * 1000
+                with candado:
+                    if error:
+                        errores[error] = errores.get(error, 0) + 1
+                    else:
+                        latencias.append(transcurrido)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as ejecutor:
+            for _ in range(options['concurrencia']):
+                ejecutor.submit(cliente)
+        duracion = time.perf_counter() - inicio
+
+        if not latencias:
+            raise CommandError(f"Ninguna petición tuvo éxito: {errores}")
+
+        resultado = {
+            "url": base,
+            "rutas": rutas,
+            "concurrencia": options['concurrencia'],
+            "duracion_s": round(duracion, 2),
+            "peticiones": len(latencias),
+            "peticiones_por_segundo": round(len(latencias) / duracion, 1),
+            "errores": errores,
+            "latencia_ms": resumen_de_latencias(latencias),
+        }
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                json.dump(resultado, archivo, indent=2, ensure_ascii=False)
@@ -0,0 +1,12 @@
+# Servidor/management/commands/reconstruir_resumen_asistencia.py
+from django.core.management.base import BaseCommand
+
+from Servidor.resumen_asistencia import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = "Reconstruye ResumenAsistenciaSemanal a partir de todo el historial de Asistencia."
+
+    def handle(self, *args, **options):
+        filas = reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(f"{filas} resúmenes semanales reconstruidos."))
@@ -0,0 +1,12 @@
+# Servidor/management/commands/reconstruir_saldos_vacaciones.py
+from django.core.management.base import BaseCommand
+
+from Servidor.vacaciones import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = "Recalcula Vacacion.dias_restantes de todos los empleados a partir de sus días asignados y tomados."
+
+    def handle(self, *args, **options):
+        saldos = reconstruir_saldos()
+        self.stdout.write(self.style.SUCCESS(f"{saldos} saldos de vacaciones recalculados."))
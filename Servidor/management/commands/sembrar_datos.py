@@ -0,0 +1,157 @@
+# Servidor/management/commands/sembrar_datos.py
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Servidor import cache_respuestas
+from Servidor.models import Empleado, Asistencia, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
+from Servidor.nomina import calcular_pago, invalidar_previsualizacion, periodo_de_pago, semana_de_pago
+from Servidor.resumen_asistencia import actualizar_resumenes, semana_de
+from Servidor.salarios import invalidar_salarios
+
+SUELDOS = [Decimal('1500.00'), Decimal('1800.00'), Decimal('2100.50'), Decimal('2450.75')]
+MONTOS_PRESTAMO = [Decimal('500.00'), Decimal('1200.00'), Decimal('3000.00')]
+ABONOS_SEMANALES = [Decimal('100.00'), Decimal('150.00'), Decimal('250.00')]
+MARTES = 1
+
+# Empleados que se generan e insertan juntos, para que la memoria no dependa del tamaño total
+EMPLEADOS_POR_BLOQUE = 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos reproducibles (empleados, asistencias diarias, préstamos con su "
+        "historial de abonos y pagos semanales) con inserciones por lotes, para medir rendimiento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empleados', type=int, default=100)
+        parser.add_argument('--semanas', type=int, default=8, help="Semanas de historial hacia atrás.")
+        parser.add_argument('--prestamos', type=int, default=2, help="Máximo de préstamos por empleado.")
+        parser.add_argument('--hasta', help="Último día con asistencia (YYYY-MM-DD). Por defecto, hoy.")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--limpiar', action='store_true', help="Borra todos los empleados (y sus datos) antes de sembrar.")
+
+    def handle(self, *args, **options):
+        try:
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else date.today()
+        except ValueError:
+            raise CommandError("El formato de la fecha debe ser YYYY-MM-DD")
+        inicio = hasta - timedelta(weeks=options['semanas'])
+        aleatorio = random.Random(options['semilla'])
+
+        # Los pagos llegan hasta la semana anterior, así registrar_pago tiene trabajo en la actual
+        dias = [inicio + timedelta(days=n) for n in range((hasta - inicio).days + 1)]
+        dias_de_pago = [dia for dia in dias if dia.weekday() == MARTES and semana_de_pago(dia) < semana_de_pago(hasta)]
+
+        totales = dict.fromkeys(['empleados', 'asistencias', 'prestamos', 'abonos', 'pagos'], 0)
+        with transaction.atomic():
+            if options['limpiar']:
+                Empleado.objects.all().delete()
+
+            for desde in range(0, options['empleados'], EMPLEADOS_POR_BLOQUE):
+                cantidad = min(EMPLEADOS_POR_BLOQUE, options['empleados'] - desde)
+                bloque = self.sembrar_bloque(aleatorio, desde, cantidad, dias, dias_de_pago, options['prestamos'])
+                for clave, total in bloque.items():
+                    totales[clave] += total
+
+            # bulk_create no dispara señales: los cachés se invalidan aquí
+            transaction.on_commit(invalidar_previsualizacion)
+            transaction.on_commit(invalidar_salarios)
+            cache_respuestas.invalidar_todo()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sembrados del {inicio} al {hasta}: " + ", ".join(f"{total} {clave}" for clave, total in totales.items())
+        ))
+
+    def sembrar_bloque(self, aleatorio, desde, cantidad, dias, dias_de_pago, maximo_prestamos):
+        empleados = Empleado.objects.bulk_create([
+            Empleado(nombre=f"Empleado {desde + n}", telefono=f"55{desde + n:08d}", fecha_entrada=dias[0] - timedelta(days=30))
+            for n in range(cantidad)
+        ])
+
+        sueldos = {empleado.id: aleatorio.choice(SUELDOS) for empleado in empleados}
+        Salario.objects.bulk_create([
+            Salario(empleado=empleado, sueldo_semanal=sueldos[empleado.id], vigente_desde=empleado.fecha_entrada)
+            for empleado in empleados
+        ])
+
+        # Asistencia diaria sin los martes (día de pago); 10% de faltas
+        asistencias = [
+            Asistencia(empleado=empleado, fecha=dia, asistencia=aleatorio.random() >= 0.1)
+            for empleado in empleados for dia in dias if dia.weekday() != MARTES
+        ]
+        Asistencia.objects.bulk_create(asistencias, batch_size=2000)
+        # Solo el resumen semanal de los empleados nuevos; el de los que ya existían no cambia
+        actualizar_resumenes({(empleado.id, semana_de(dia)) for empleado in empleados for dia in dias})
+        faltas = {(asistencia.empleado.id, asistencia.fecha) for asistencia in asistencias if not asistencia.asistencia}
+
+        vacaciones, tomadas = [], []
+        for empleado in empleados:
+            dia = aleatorio.choice(dias)
+            dias_restantes = aleatorio.randint(0, 12)
+            vacaciones.append(Vacacion(empleado=empleado, dias_restantes=dias_restantes, dias_asignados=dias_restantes + 2))
+            tomadas.append(VacacionTomada(empleado=empleado, fecha_inicio=dia, fecha_fin=dia + timedelta(days=1), dias_tomados=2))
+        Vacacion.objects.bulk_create(vacaciones)
+        VacacionTomada.objects.bulk_create(tomadas)
+
+        prestamos = []
+        for empleado in empleados:
+            for numero in range(aleatorio.randint(0, maximo_prestamos)):
+                monto = aleatorio.choice(MONTOS_PRESTAMO)
+                prestamos.append(Prestamo(
+                    empleado=empleado, monto_prestamo=monto, deuda_restante=monto,
+                    abono_semanal=aleatorio.choice(ABONOS_SEMANALES), razon=f"Préstamo {numero + 1}",
+                    fecha_prestamo=aleatorio.choice(dias),
+                ))
+        Prestamo.objects.bulk_create(prestamos)
+
+        prestamos_por_empleado = {}
+        for prestamo in prestamos:
+            prestamos_por_empleado.setdefault(prestamo.empleado.id, []).append(prestamo)
+
+        # Cada semana se abona a los préstamos vigentes y se registra el pago con
+        # el mismo cálculo de la nómina (calcular_pago)
+        abonos, pagos = [], []
+        for dia_de_pago in dias_de_pago:
+            fecha_inicio, fecha_fin = periodo_de_pago(dia_de_pago)
+            for empleado in empleados:
+                dias_faltados = sum(
+                    (empleado.id, fecha_inicio + timedelta(days=n)) in faltas
+                    for n in range((fecha_fin - fecha_inicio).days + 1)
+                )
+                activos = {
+                    prestamo.id: prestamo for prestamo in prestamos_por_empleado.get(empleado.id, [])
+                    if prestamo.estatus and prestamo.fecha_prestamo < dia_de_pago
+                }
+                calculo = calcular_pago(
+                    {"id": empleado.id, "nombre": empleado.nombre}, sueldos[empleado.id], dias_faltados,
+                    [
+                        {"id": prestamo.id, "abono_semanal": prestamo.abono_semanal,
+                         "deuda_restante": prestamo.deuda_restante, "razon": prestamo.razon}
+                        for prestamo in activos.values()
+                    ]
+                )
+                for abono in calculo['abonos']:
+                    prestamo = activos[abono['prestamo_id']]
+                    prestamo.deuda_restante, prestamo.estatus = abono['deuda_restante'], abono['estatus']
+                    abonos.append(Abono(
+                        empleado=empleado, prestamo=prestamo, monto_abono=abono['monto_abono'],
+                        fecha_abono=dia_de_pago, deuda_restante=abono['deuda_restante'],
+                    ))
+                pagos.append(Pago(
+                    empleado=empleado, monto_a_pagar=calculo['monto_a_pagar'], fecha_pago=dia_de_pago,
+                    semana=semana_de_pago(dia_de_pago), detalle=calculo['detalle'],
+                ))
+
+        Prestamo.objects.bulk_update(prestamos, ['deuda_restante', 'estatus'], batch_size=1000)
+        Abono.objects.bulk_create(abonos, batch_size=2000)
+        Pago.objects.bulk_create(pagos, batch_size=2000)
+
+        return {
+            'empleados': len(empleados), 'asistencias': len(asistencias), 'prestamos': len(prestamos),
+            'abonos': len(abonos), 'pagos': len(pagos),
+        }
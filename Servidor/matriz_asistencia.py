@@ -0,0 +1,85 @@
+# Servidor/matriz_asistencia.py
+# Matriz de asistencias empleados × días en un rango de fechas.
+#
+# Cada empleado lleva dos mapas de bits sobre los días del rango: el bit i de
+# "presentes" indica que asistió el día desde + i, y el de "ausentes" que
+# faltó; un día sin ninguno de los dos no tiene registro. Se arman desplazando
+# los mapas semanales de ResumenAsistenciaSemanal, leídos con una sola
+# consulta, y se entregan como texto ("1" y "0", el primer carácter es el día
+# `desde`) o en base64 (bytes little-endian: el día i es el bit i % 8 del
+# byte i // 8).
+import base64
+from datetime import timedelta
+
+from django.db.models import FilteredRelation, Q
+
+from .instrumentacion import medir_serializacion
+from .models import Empleado
+from .resumen_asistencia import semana_de
+
+FORMATOS = ('texto', 'base64')
+MAXIMO_DIAS = 366
+
+
+def ultimo_dia_del_mes(fecha):
+    return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def codificar_bits(bits, dias, formato):
+    if formato == 'base64':
+        return base64.b64encode(bits.to_bytes((dias + 7) // 8, 'little')).decode('ascii')
+    return format(bits, f'0{dias}b')[::-1] if dias else ''
+
+
+def matriz_de_asistencia(desde, hasta, empleado_id=None, formato='texto'):
+    """
+    Devuelve la matriz de asistencias de `desde` a `hasta` (inclusive) de todos
+    los empleados, o de uno con empleado_id. Los empleados sin registros en el
+    rango aparecen con los mapas en cero.
+    """
+    dias = (hasta - desde).days + 1
+    empleados = Empleado.objects.annotate(
+        semanas_del_rango=FilteredRelation(
+            'resumenasistenciasemanal',
+            condition=Q(resumenasistenciasemanal__semana__range=(semana_de(desde), hasta))
+        )
+    )
+    if empleado_id is not None:
+        empleados = empleados.filter(id=empleado_id)
+    # Una sola consulta: LEFT JOIN de cada empleado con sus semanas del rango
+    filas = empleados.order_by('id').values_list(
+        'id', 'nombre', 'semanas_del_rango__semana', 'semanas_del_rango__registrados', 'semanas_del_rango__presentes'
+    )
+
+    matriz = {}
+    for empleado, nombre, semana, registrados, presentes in filas:
+        fila = matriz.setdefault(empleado, {"nombre": nombre, "registrados": 0, "presentes": 0})
+        if semana is None:
+            continue
+        # El bit 0 de la semana es el día semana; en la matriz, el día desde
+        desplazamiento = (semana - desde).days
+        if desplazamiento >= 0:
+            fila["registrados"] |= registrados << desplazamiento
+            fila["presentes"] |= presentes << desplazamiento
+        else:
+            fila["registrados"] |= registrados >> -desplazamiento
+            fila["presentes"] |= presentes >> -desplazamiento
+
+    dentro_del_rango = (1 << dias) - 1
+    with medir_serializacion():
+        empleados = [
+            {
+                "empleado": empleado,
+                "nombre_empleado": fila["nombre"],
+                "presentes": codificar_bits(fila["presentes"] & dentro_del_rango, dias, formato),
+                "ausentes": codificar_bits(fila["registrados"] & ~fila["presentes"] & dentro_del_rango, dias, formato),
+            }
+            for empleado, fila in matriz.items()
+        ]
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "dias": dias,
+        "formato": formato,
+        "empleados": empleados,
+    }
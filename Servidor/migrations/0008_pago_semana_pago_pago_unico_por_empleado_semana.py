@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:42
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def asignar_semanas(apps, schema_editor):
+    # El primer pago de cada empleado en cada semana queda como el pago de
+    # nómina de esa semana; los duplicados que ya existían se quedan sin
+    # semana para no romper la restricción única
+    Pago = apps.get_model('Servidor', 'Pago')
+    vistas = set()
+    pagos = []
+    filas = Pago.objects.order_by('id').values_list('id', 'empleado_id', 'fecha_pago')
+    for pago_id, empleado_id, fecha_pago in filas.iterator():
+        semana = fecha_pago - timedelta(days=fecha_pago.weekday())
+        if (empleado_id, semana) not in vistas:
+            vistas.add((empleado_id, semana))
+            pagos.append(Pago(id=pago_id, semana=semana))
+    Pago.objects.bulk_update(pagos, ['semana'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0007_remove_abono_created_at_remove_abono_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pago',
+            name='semana',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(asignar_semanas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pago',
+            constraint=models.UniqueConstraint(fields=('empleado', 'semana'), name='pago_unico_por_empleado_semana'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncWeek
+
+
+def llenar_resumenes(apps, schema_editor):
+    """
+    Crea el resumen de las asistencias que ya existen, con una consulta
+    agrupada por empleado y semana.
+    """
+    Asistencia = apps.get_model('Servidor', 'Asistencia')
+    ResumenAsistenciaSemanal = apps.get_model('Servidor', 'ResumenAsistenciaSemanal')
+    filas = (
+        Asistencia.objects.annotate(semana=TruncWeek('fecha'))
+        .values('empleado_id', 'semana')
+        .annotate(
+            dias_presentes=Count('id', filter=Q(asistencia=True)),
+            dias_ausentes=Count('id', filter=Q(asistencia=False)),
+        )
+        .order_by()
+    )
+    ResumenAsistenciaSemanal.objects.bulk_create(
+        (ResumenAsistenciaSemanal(**fila) for fila in filas.iterator(chunk_size=2000)),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0008_pago_semana_pago_pago_unico_por_empleado_semana'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenAsistenciaSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana', models.DateField()),
+                ('dias_presentes', models.PositiveSmallIntegerField(default=0)),
+                ('dias_ausentes', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Servidor.empleado')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('empleado', 'semana'), name='resumen_asistencia_unico_por_semana')],
+            },
+        ),
+        migrations.RunPython(llenar_resumenes, migrations.RunPython.noop),
+    ]
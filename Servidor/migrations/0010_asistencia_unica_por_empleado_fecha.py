@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:46
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def eliminar_asistencias_duplicadas(apps, schema_editor):
+    """
+    Conserva solo el registro más reciente de cada (empleado, fecha) y recalcula
+    el resumen semanal de las semanas afectadas.
+    """
+    Asistencia = apps.get_model('Servidor', 'Asistencia')
+    ResumenAsistenciaSemanal = apps.get_model('Servidor', 'ResumenAsistenciaSemanal')
+
+    duplicados = (
+        Asistencia.objects.values('empleado_id', 'fecha')
+        .annotate(total=Count('id'), ultimo=Max('id'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    semanas = set()
+    for duplicado in duplicados.iterator():
+        Asistencia.objects.filter(
+            empleado_id=duplicado['empleado_id'], fecha=duplicado['fecha']
+        ).exclude(id=duplicado['ultimo']).delete()
+        fecha = duplicado['fecha']
+        semanas.add((duplicado['empleado_id'], fecha - timedelta(days=fecha.weekday())))
+
+    for empleado_id, semana in semanas:
+        conteo = Asistencia.objects.filter(
+            empleado_id=empleado_id, fecha__range=(semana, semana + timedelta(days=6))
+        ).aggregate(
+            dias_presentes=Count('id', filter=Q(asistencia=True)),
+            dias_ausentes=Count('id', filter=Q(asistencia=False)),
+        )
+        ResumenAsistenciaSemanal.objects.filter(empleado_id=empleado_id, semana=semana).update(**conteo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0009_resumenasistenciasemanal'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_asistencias_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='asistencia',
+            constraint=models.UniqueConstraint(fields=('empleado', 'fecha'), name='asistencia_unica_por_empleado_fecha'),
+        ),
+    ]
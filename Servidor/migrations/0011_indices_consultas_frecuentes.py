@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0010_asistencia_unica_por_empleado_fecha'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['fecha', 'id'], name='asistencia_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['fecha_pago', 'id'], name='pago_fecha_pago_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['empleado', 'estatus'], name='prestamo_empleado_estatus_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salario',
+            index=models.Index(fields=['empleado', '-created_at'], name='salario_empleado_reciente_idx'),
+        ),
+    ]
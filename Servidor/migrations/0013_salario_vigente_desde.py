@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:10
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def vigente_desde_su_registro(apps, schema_editor):
+    """
+    Los salarios existentes aplican desde el día en que se registraron, así que
+    el salario vigente hoy sigue siendo el más reciente de cada empleado.
+    """
+    Salario = apps.get_model('Servidor', 'Salario')
+    Salario.objects.update(vigente_desde=TruncDate('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0012_abono_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='salario',
+            name='salario_empleado_reciente_idx',
+        ),
+        migrations.AddField(
+            model_name='salario',
+            name='vigente_desde',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.RunPython(vigente_desde_su_registro, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='salario',
+            index=models.Index(fields=['empleado', '-vigente_desde', '-created_at'], name='salario_empleado_vigente_idx'),
+        ),
+    ]
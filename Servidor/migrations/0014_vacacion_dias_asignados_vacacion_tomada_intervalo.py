@@ -0,0 +1,47 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:25
+
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def asignar_dias(apps, schema_editor):
+    """
+    Los saldos actuales ya descuentan todas las vacaciones tomadas, así que los
+    días asignados del saldo vigente de cada empleado son los restantes más los
+    tomados; los registros anteriores quedan con sus restantes.
+    """
+    Vacacion = apps.get_model('Servidor', 'Vacacion')
+    VacacionTomada = apps.get_model('Servidor', 'VacacionTomada')
+
+    Vacacion.objects.update(dias_asignados=F('dias_restantes'))
+    tomados = (
+        VacacionTomada.objects.filter(empleado=OuterRef('empleado'))
+        .order_by()
+        .values('empleado')
+        .annotate(total=Sum('dias_tomados'))
+        .values('total')
+    )
+    ultimas = Vacacion.objects.order_by().values('empleado').annotate(ultima=Max('id')).values('ultima')
+    Vacacion.objects.filter(id__in=ultimas).update(dias_asignados=F('dias_restantes') + Coalesce(Subquery(tomados), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0013_salario_vigente_desde'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacacion',
+            name='dias_asignados',
+            field=models.IntegerField(blank=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(asignar_dias, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vacaciontomada',
+            index=models.Index(fields=['empleado', 'fecha_inicio', 'fecha_fin'], name='vacacion_tomada_intervalo_idx'),
+        ),
+    ]
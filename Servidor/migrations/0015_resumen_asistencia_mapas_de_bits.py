@@ -0,0 +1,58 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:40
+
+from django.db import migrations, models
+from django.db.models import Case, Count, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncWeek
+
+
+def convertir_asistencias(apps, schema_editor):
+    """
+    Llena los mapas de bits de cada empleado y semana a partir de los registros
+    diarios existentes, con una consulta agrupada. Las semanas sin fila de
+    resumen (asistencias escritas sin señales, como las de bulk_create) se
+    crean, y los conteos se recalculan junto con los mapas para que ambos
+    coincidan con los registros diarios.
+    """
+    Asistencia = apps.get_model('Servidor', 'Asistencia')
+    ResumenAsistenciaSemanal = apps.get_model('Servidor', 'ResumenAsistenciaSemanal')
+
+    bit_del_dia = Case(*[When(fecha__iso_week_day=dia + 1, then=Value(1 << dia)) for dia in range(7)], default=Value(0))
+    filas = (
+        Asistencia.objects.annotate(semana=TruncWeek('fecha'))
+        .values('empleado_id', 'semana')
+        .annotate(
+            dias_presentes=Count('id', filter=Q(asistencia=True)),
+            dias_ausentes=Count('id', filter=Q(asistencia=False)),
+            registrados=Coalesce(Sum(bit_del_dia), 0),
+            presentes=Coalesce(Sum(bit_del_dia, filter=Q(asistencia=True)), 0),
+        )
+        .order_by()
+    )
+    ResumenAsistenciaSemanal.objects.bulk_create(
+        (ResumenAsistenciaSemanal(**fila) for fila in filas.iterator(chunk_size=2000)),
+        update_conflicts=True,
+        unique_fields=['empleado', 'semana'],
+        update_fields=['dias_presentes', 'dias_ausentes', 'registrados', 'presentes', 'updated_at'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0014_vacacion_dias_asignados_vacacion_tomada_intervalo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumenasistenciasemanal',
+            name='presentes',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='resumenasistenciasemanal',
+            name='registrados',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(convertir_asistencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0015_resumen_asistencia_mapas_de_bits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDeCache',
+            fields=[
+                ('clave', models.CharField(max_length=200, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0016_versiondecache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abono',
+            index=models.Index(fields=['updated_at'], name='abono_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['updated_at'], name='asistencia_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empleado',
+            index=models.Index(fields=['updated_at'], name='empleado_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['updated_at'], name='pago_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['updated_at'], name='prestamo_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenasistenciasemanal',
+            index=models.Index(fields=['updated_at'], name='resumen_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salario',
+            index=models.Index(fields=['updated_at'], name='salario_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacacion',
+            index=models.Index(fields=['updated_at'], name='vacacion_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacaciontomada',
+            index=models.Index(fields=['updated_at'], name='vacacion_tomada_updated_idx'),
+        ),
+    ]
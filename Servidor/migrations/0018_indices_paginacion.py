@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Servidor', '0017_indices_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abono',
+            index=models.Index(fields=['fecha_abono', 'id'], name='abono_fecha_abono_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='abono',
+            index=models.Index(fields=['empleado', 'fecha_abono', 'id'], name='abono_empleado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['empleado', 'fecha_pago', 'id'], name='pago_empleado_fecha_idx'),
+        ),
+    ]
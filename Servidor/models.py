@@ -1,4 +1,5 @@
 from django.db import models
+from datetime import date
 from decimal import Decimal
 # Create your models here.
 class Empleado(models.Model):
@@ -7,6 +8,12 @@ class Empleado(models.Model):
     fecha_entrada = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='empleado_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"Empleado: {self.nombre}"
@@ -18,12 +25,54 @@ class Asistencia(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # Un solo registro por empleado y día; los duplicados alteraban el conteo de faltas
+            models.UniqueConstraint(fields=['empleado', 'fecha'], name='asistencia_unica_por_empleado_fecha'),
+        ]
+        indexes = [
+            # asistencia_por_fecha y la paginación por (fecha, id); el rango por
+            # empleado de registrar_pago usa el índice de la restricción única
+            models.Index(fields=['fecha', 'id'], name='asistencia_fecha_idx'),
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='asistencia_updated_at_idx'),
+        ]
+
+class ResumenAsistenciaSemanal(models.Model):
+    # Conteo de asistencias por empleado y semana (lunes a domingo), mantenido al
+    # crear, editar o borrar Asistencia para no recorrer los registros diarios
+    empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
+    semana = models.DateField()  # Lunes de la semana
+    dias_presentes = models.PositiveSmallIntegerField(default=0)
+    dias_ausentes = models.PositiveSmallIntegerField(default=0)
+    # Mapas de bits de la semana: el bit i es el día lunes + i (ver resumen_asistencia.py)
+    registrados = models.PositiveSmallIntegerField(default=0)
+    presentes = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['empleado', 'semana'], name='resumen_asistencia_unico_por_semana'),
+        ]
+        indexes = [
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='resumen_updated_at_idx'),
+        ]
+
 class Vacacion(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     dias_restantes = models.IntegerField()
+    # Días del periodo; si no se indican, son los restantes más los ya tomados
+    dias_asignados = models.IntegerField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='vacacion_updated_at_idx'),
+        ]
+
 class VacacionTomada(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     fecha_inicio = models.DateField()
@@ -32,12 +81,30 @@ class VacacionTomada(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Revisión de traslapes de una solicitud nueva
+            models.Index(fields=['empleado', 'fecha_inicio', 'fecha_fin'], name='vacacion_tomada_intervalo_idx'),
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='vacacion_tomada_updated_idx'),
+        ]
+
 class Salario(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     sueldo_semanal = models.DecimalField(max_digits=10, decimal_places=2)
+    # Fecha desde la que aplica; rige hasta que empieza otro salario del empleado
+    vigente_desde = models.DateField(default=date.today)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Salario vigente de cada empleado en una fecha sin ordenar todos sus salarios
+            models.Index(fields=['empleado', '-vigente_desde', '-created_at'], name='salario_empleado_vigente_idx'),
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='salario_updated_at_idx'),
+        ]
+
 class Prestamo(models.Model):
     empleado = models.ForeignKey(Empleado, on_delete=models.CASCADE)
     monto_prestamo = models.DecimalField(max_digits=10, decimal_places=2)
@@ -49,6 +116,14 @@ class Prestamo(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Préstamos activos de un empleado en registrar_pago
+            models.Index(fields=['empleado', 'estatus'], name='prestamo_empleado_estatus_idx'),
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='prestamo_updated_at_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         # Solo inicializar deuda_restante al monto_prestamo al crear un nuevo préstamo
         if not self.pk and self.deuda_restante == 0.00:  # Si no existe en la BD (nuevo préstamo)
@@ -61,6 +136,16 @@ class Abono(models.Model):
     monto_abono = models.DecimalField(max_digits=10, decimal_places=2)
     fecha_abono = models.DateField()
     deuda_restante = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal(0))  # Nuevo campo
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Paginación por (fecha_abono, id) de abono_list y de abonos_por_empleado
+            models.Index(fields=['fecha_abono', 'id'], name='abono_fecha_abono_idx'),
+            models.Index(fields=['empleado', 'fecha_abono', 'id'], name='abono_empleado_fecha_idx'),
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='abono_updated_at_idx'),
+        ]
 
 from django.db import models
 from django.contrib.postgres.fields import JSONField  # Para PostgreSQL, o usa TextField para otros
@@ -70,5 +155,26 @@ class Pago(models.Model):
     monto_a_pagar = models.DecimalField(max_digits=10, decimal_places=2)
     fecha_pago = models.DateField()
     detalle = models.JSONField(default=list)  # Contiene el desglose del pago
+    semana = models.DateField(null=True, blank=True)  # Lunes de la semana pagada por registrar_pago
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Un solo pago de nómina por empleado y semana, para que los reintentos no dupliquen pagos
+            models.UniqueConstraint(fields=['empleado', 'semana'], name='pago_unico_por_empleado_semana'),
+        ]
+        indexes = [
+            # pagos_por_fecha y la paginación por (fecha_pago, id)
+            models.Index(fields=['fecha_pago', 'id'], name='pago_fecha_pago_idx'),
+            # Paginación de pagos_por_empleado
+            models.Index(fields=['empleado', 'fecha_pago', 'id'], name='pago_empleado_fecha_idx'),
+            # ETag de las listas (Servidor/condicional.py)
+            models.Index(fields=['updated_at'], name='pago_updated_at_idx'),
+        ]
+
+class VersionDeCache(models.Model):
+    # Versión de un caché en memoria (ver Servidor/versiones.py); vive en la
+    # base de datos para que todos los workers vean la misma
+    clave = models.CharField(max_length=200, primary_key=True)
+    version = models.BigIntegerField()
@@ -0,0 +1,263 @@
+# Servidor/nomina.py
+# Cálculo y registro de nómina por lotes.
+#
+# Las reglas son las mismas que aplicaba registrar_pago empleado por empleado
+# (faltas de miércoles a lunes sin contar el martes, sueldo/6 por falta y
+# abono semanal a cada préstamo activo), pero las lecturas se hacen con unas
+# pocas consultas por conjunto y las escrituras con bulk_create/bulk_update,
+# de modo que el número de consultas no crece con el número de empleados.
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Empleado, Prestamo, Abono, Pago
+from .resumen_asistencia import contar_faltas
+from .salarios import sueldos_vigentes
+from . import cache_respuestas, versiones
+
+MARTES = 1  # weekday() del día de pago, que no cuenta como falta
+
+
+def periodo_de_pago(fecha_pago):
+    """
+    Devuelve (fecha_inicio, fecha_fin) del periodo de faltas que cubre un pago.
+    """
+    fecha_fin = fecha_pago - timedelta(days=1)  # Día anterior al pago (lunes)
+    fecha_inicio = fecha_fin - timedelta(days=4)  # Miércoles anterior
+    return fecha_inicio, fecha_fin
+
+
+def semana_de_pago(fecha_pago):
+    """
+    Devuelve el lunes de la semana de una fecha de pago; junto con el empleado
+    identifica un pago de nómina.
+    """
+    return fecha_pago - timedelta(days=fecha_pago.weekday())
+
+
+def aplicar_abono(deuda_restante, abono):
+    """
+    Aplica el abono semanal a un préstamo. Devuelve (abono aplicado, deuda
+    restante, estatus); si la deuda no alcanza el abono, se cobra solo la deuda
+    y el préstamo queda saldado.
+    """
+    if deuda_restante <= abono:
+        return deuda_restante, Decimal(0), False  # Ajustar abono a la deuda y saldar el préstamo
+    return abono, deuda_restante - abono, True
+
+
+def calcular_pago(empleado, sueldo_semanal, faltas, prestamos):
+    """
+    Calcula el pago de un empleado ({"id", "nombre"}) a partir de su sueldo,
+    sus faltas del periodo y sus préstamos activos ({"id", "abono_semanal",
+    "deuda_restante", "razon"}), sin consultar la base de datos. Devuelve el
+    cálculo con los abonos a registrar y el desglose que se guarda en el Pago.
+    """
+    descuento_por_faltas = faltas * (sueldo_semanal / Decimal(6))  # Sueldo dividido por 6 días laborables
+
+    total_abonos = Decimal(0)
+    abonos = []
+    detalle_prestamos = []
+    for prestamo in prestamos:
+        abono, deuda_restante, estatus = aplicar_abono(prestamo['deuda_restante'], prestamo['abono_semanal'])
+
+        total_abonos += abono
+        abonos.append({
+            "prestamo_id": prestamo['id'],
+            "monto_abono": abono,
+            "deuda_restante": deuda_restante,
+            "estatus": estatus,
+        })
+        detalle_prestamos.append({
+            "prestamo_id": prestamo['id'],
+            "monto_abonado": str(abono),
+            "monto_restante": str(deuda_restante),
+            "razon": prestamo['razon']
+        })
+
+    monto_a_pagar = sueldo_semanal - descuento_por_faltas - total_abonos
+    return {
+        "empleado_id": empleado['id'],
+        "nombre_empleado": empleado['nombre'],
+        "monto_a_pagar": monto_a_pagar,
+        "abonos": abonos,
+        "detalle": {
+            "faltas": {
+                "dias_faltados": faltas,
+                "descuento": str(descuento_por_faltas)
+            },
+            "prestamos": detalle_prestamos,
+            "total_abonos": str(total_abonos),
+            "sueldo_base": str(sueldo_semanal),
+            "total_pagado": str(monto_a_pagar)
+        },
+    }
+
+
+def calcular_nomina(fecha_pago=None, empleado_ids=None, bloquear=False, sueldos=None):
+    """
+    Calcula el pago de cada empleado sin escribir nada en la base de datos.
+
+    Con bloquear=True los préstamos activos se leen con SELECT ... FOR UPDATE,
+    por lo que debe llamarse dentro de una transacción. En ese caso conviene
+    pasar en `sueldos` el resultado de sueldos_vigentes para los mismos
+    empleados, leído antes de abrirla: dentro de una transacción los sueldos no
+    se guardan en memoria.
+
+    Devuelve (calculos, sin_salario): una lista con un diccionario por empleado
+    con salario registrado y la lista de ids de empleados sin salario.
+    """
+    fecha_pago = fecha_pago or date.today()
+    fecha_inicio, fecha_fin = periodo_de_pago(fecha_pago)
+
+    empleados = Empleado.objects.all()
+    if empleado_ids is not None:
+        empleados = empleados.filter(id__in=empleado_ids)
+    empleados = list(empleados.order_by('id').values('id', 'nombre'))
+    ids = [empleado['id'] for empleado in empleados]
+
+    # Salario vigente de cada empleado en la fecha de pago, en una sola consulta
+    if sueldos is None:
+        sueldos = sueldos_vigentes(ids, fecha_pago)
+
+    # Faltas del periodo por empleado, excluyendo el martes, con los mapas de
+    # bits de las (a lo más dos) semanas que abarca el periodo
+    faltas_por_empleado = contar_faltas(ids, fecha_inicio, fecha_fin, excluir=(MARTES,))
+
+    # Préstamos activos de todos los empleados
+    prestamos_por_empleado = defaultdict(list)
+    prestamos_activos = Prestamo.objects.filter(empleado_id__in=ids, estatus=True)
+    if bloquear:
+        # Solo se bloquean los préstamos de estos empleados; los demás pagos no esperan
+        prestamos_activos = prestamos_activos.select_for_update()
+    prestamos_activos = prestamos_activos.order_by('id').values(
+        'id', 'empleado_id', 'abono_semanal', 'deuda_restante', 'razon'
+    )
+    for prestamo in prestamos_activos:
+        prestamos_por_empleado[prestamo['empleado_id']].append(prestamo)
+
+    calculos = []
+    sin_salario = []
+    for empleado in empleados:
+        sueldo_semanal = sueldos.get(empleado['id'])
+        if sueldo_semanal is None:
+            sin_salario.append(empleado['id'])
+            continue
+        calculos.append(calcular_pago(
+            empleado, sueldo_semanal, faltas_por_empleado.get(empleado['id'], 0),
+            prestamos_por_empleado.get(empleado['id'], [])
+        ))
+
+    return calculos, sin_salario
+
+
+def registrar_nomina(calculos, fecha_pago=None):
+    """
+    Escribe los abonos, préstamos y pagos de una lista de cálculos.
+
+    Debe llamarse dentro de una transacción. Si algún empleado ya tiene pago en
+    la semana, la restricción única de Pago lanza IntegrityError y la
+    transacción se revierte completa. Devuelve los Pago creados en el mismo
+    orden que los cálculos.
+    """
+    fecha_pago = fecha_pago or date.today()
+    semana = semana_de_pago(fecha_pago)
+    ahora = timezone.now()
+
+    prestamos = []
+    abonos = []
+    pagos = []
+    for calculo in calculos:
+        for abono in calculo['abonos']:
+            # bulk_update no aplica auto_now, así que updated_at se asigna a mano
+            prestamos.append(Prestamo(
+                id=abono['prestamo_id'],
+                deuda_restante=abono['deuda_restante'],
+                estatus=abono['estatus'],
+                updated_at=ahora,
+            ))
+            abonos.append(Abono(
+                prestamo_id=abono['prestamo_id'],
+                empleado_id=calculo['empleado_id'],
+                monto_abono=abono['monto_abono'],
+                fecha_abono=fecha_pago,
+                deuda_restante=abono['deuda_restante']
+            ))
+        pagos.append(Pago(
+            empleado_id=calculo['empleado_id'],
+            monto_a_pagar=calculo['monto_a_pagar'],
+            fecha_pago=fecha_pago,
+            detalle=calculo['detalle'],
+            semana=semana
+        ))
+
+    if prestamos:
+        Prestamo.objects.bulk_update(prestamos, ['deuda_restante', 'estatus', 'updated_at'], batch_size=500)
+    if abonos:
+        Abono.objects.bulk_create(abonos, batch_size=500)
+    pagos = Pago.objects.bulk_create(pagos, batch_size=500)
+
+    # bulk_update y bulk_create no disparan señales, así que los cachés se invalidan aquí
+    transaction.on_commit(invalidar_previsualizacion)
+    etiquetas = {('pagos_fecha', fecha_pago.isoformat()), ('reporte_nomina', semana.isoformat())}
+    for calculo in calculos:
+        empleado_id = str(calculo['empleado_id'])
+        etiquetas.add(('pagos_empleado', empleado_id))
+        if calculo['abonos']:
+            etiquetas.update({('abonos_empleado', empleado_id), ('prestamos_empleado', empleado_id)})
+    cache_respuestas.invalidar(etiquetas)
+    return pagos
+
+
+# Previsualización de nómina
+CLAVE_VERSION_PREVISUALIZACION = 'nomina:previsualizacion:version'
+
+# Segundos que se guarda una previsualización aunque no cambie la versión
+TIEMPO_PREVISUALIZACION = 15 * 60
+
+
+def version_previsualizacion():
+    return versiones.version(CLAVE_VERSION_PREVISUALIZACION)
+
+
+def invalidar_previsualizacion():
+    """
+    Descarta las previsualizaciones en caché de todos los procesos cambiando la
+    versión.
+    """
+    versiones.incrementar([CLAVE_VERSION_PREVISUALIZACION])
+
+
+def previsualizar_nomina(fecha_pago=None):
+    """
+    Devuelve el desglose de pago de todos los empleados para una fecha de pago
+    sin escribir nada. El resultado se guarda en el caché del proceso por
+    fecha hasta que cambien asistencias, salarios, préstamos o empleados, o
+    por TIEMPO_PREVISUALIZACION segundos.
+    """
+    fecha_pago = fecha_pago or date.today()
+    clave = f'nomina:previsualizacion:{version_previsualizacion()}:{fecha_pago.isoformat()}'
+    previsualizacion = cache.get(clave)
+    if previsualizacion is None:
+        calculos, sin_salario = calcular_nomina(fecha_pago)
+        fecha_inicio, fecha_fin = periodo_de_pago(fecha_pago)
+        previsualizacion = {
+            "fecha_pago": fecha_pago,
+            "periodo": {"inicio": fecha_inicio, "fin": fecha_fin},
+            "pagos": [
+                {
+                    "empleado": calculo['empleado_id'],
+                    "nombre_empleado": calculo['nombre_empleado'],
+                    "monto_a_pagar": calculo['monto_a_pagar'],
+                    "detalle": calculo['detalle']
+                }
+                for calculo in calculos
+            ],
+            "sin_salario": sin_salario
+        }
+        cache.set(clave, previsualizacion, TIEMPO_PREVISUALIZACION)
+    return previsualizacion
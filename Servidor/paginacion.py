@@ -0,0 +1,120 @@
+# Servidor/paginacion.py
+# Paginación por cursor (keyset) para las vistas de listas.
+#
+# En lugar de OFFSET, cada página filtra a partir de los valores de orden del
+# último registro entregado, así que una página profunda cuesta lo mismo que la
+# primera. El cursor es opaco para el cliente: base64 de esos valores.
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .instrumentacion import medir_serializacion
+from .serializers import precargar, representar_filas, serializar_lista, valores_de_lectura
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(valores):
+    texto = json.dumps([valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in valores])
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(cursor, modelo, orden):
+    """
+    Devuelve los valores de orden del cursor convertidos al tipo de cada campo
+    de `orden`. Un cursor alterado lanza CursorInvalido en lugar de llegar al
+    filtro de la consulta.
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(valores, list) or len(valores) != len(orden) or None in valores:
+            raise CursorInvalido("Cursor inválido.")
+        # clean() además revisa los rangos, p. ej. un id que no cabe en la columna
+        return [modelo._meta.get_field(campo).clean(valor, None) for campo, valor in zip(orden, valores)]
+    except (ValidationError, ValueError, TypeError):
+        raise CursorInvalido("Cursor inválido.")
+
+
+def filtro_despues_de(orden, valores):
+    """
+    Construye el filtro (a > x) OR (a = x AND b > y) OR ... para un orden
+    ascendente de varios campos.
+    """
+    filtro = Q()
+    for i, campo in enumerate(orden):
+        condicion = Q(**{f'{campo}__gt': valores[i]})
+        for anterior, valor in zip(orden[:i], valores[:i]):
+            condicion &= Q(**{anterior: valor})
+        filtro |= condicion
+    return filtro
+
+
+def limite_de_pagina(request):
+    """
+    Devuelve el tamaño de página pedido con ?limite=, el de
+    PAGINACION_LIMITE_POR_DEFECTO si se usa ?cursor= o está configurado, o None
+    si la petición no pide paginación.
+    """
+    limite = request.query_params.get('limite')
+    por_defecto = getattr(settings, 'PAGINACION_LIMITE_POR_DEFECTO', None)
+    if limite is None:
+        if 'cursor' in request.query_params:
+            return por_defecto or 100
+        return por_defecto
+    if not limite.isdigit() or int(limite) < 1:
+        raise CursorInvalido("El límite debe ser un número entero positivo.")
+    return min(int(limite), getattr(settings, 'PAGINACION_LIMITE_MAXIMO', 1000))
+
+
+def lista_paginada(request, queryset, serializer_class, orden=('id',)):
+    """
+    Serializa un queryset como lista. Si la petición trae ?limite= o ?cursor=
+    (o hay un límite por defecto configurado), entrega una página ordenada por
+    `orden` con el cursor de la siguiente página. Los registros se leen con
+    .values() (relaciones incluidas) cuando el serializer lo admite.
+    """
+    try:
+        limite = limite_de_pagina(request)
+        if limite is None:
+            return Response(serializar_lista(queryset, serializer_class))
+
+        queryset = queryset.order_by(*orden)
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            queryset = queryset.filter(filtro_despues_de(orden, decodificar_cursor(cursor, queryset.model, orden)))
+    except CursorInvalido as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    valores = valores_de_lectura(queryset, serializer_class, orden)
+
+    # Se pide un registro de más para saber si hay otra página
+    registros = list((precargar(queryset, serializer_class) if valores is None else valores)[:limite + 1])
+    hay_mas = len(registros) > limite
+    registros = registros[:limite]
+
+    siguiente = cursor_siguiente = None
+    if hay_mas:
+        ultimo = registros[-1]
+        cursor_siguiente = codificar_cursor([
+            getattr(ultimo, campo) if valores is None else ultimo[campo] for campo in orden
+        ])
+        siguiente = replace_query_param(request.build_absolute_uri(), 'cursor', cursor_siguiente)
+
+    with medir_serializacion():
+        if valores is None:
+            resultados = serializer_class(registros, many=True).data
+        else:
+            resultados = representar_filas(registros, serializer_class)
+    return Response({
+        "siguiente": siguiente,
+        "cursor": cursor_siguiente,
+        "resultados": resultados
+    })
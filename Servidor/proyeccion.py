@@ -0,0 +1,144 @@
+# Servidor/proyeccion.py
+# Proyección de liquidación de los préstamos activos.
+#
+# Con la regla de aplicar_abono (se cobra el abono semanal completo hasta que
+# la deuda restante no lo alcanza; entonces se cobra solo la deuda), un
+# préstamo con deuda D y abono A se liquida en n = ceil(D / A) abonos y el
+# último es D - (n - 1) * A. Todos los préstamos se calculan juntos como
+# columnas y el calendario semanal de la empresa se arma con un arreglo de
+# diferencias: cada préstamo suma su abono en la semana en que empieza y lo
+# resta en la que termina, sin recorrer semana por semana cada préstamo.
+from datetime import date, timedelta
+from decimal import Decimal
+
+from .models import Prestamo, Pago
+from .nomina import semana_de_pago
+from .salarios import sueldos_vigentes
+
+DIA_DE_PAGO = 1  # Martes
+
+
+def proxima_fecha_de_pago(fecha):
+    return fecha + timedelta(days=(DIA_DE_PAGO - fecha.weekday()) % 7)
+
+
+def abonos_restantes(deudas, abonos):
+    """
+    Devuelve (número de abonos, último abono) de cada préstamo. Un préstamo
+    activo con deuda cero se cierra en la siguiente nómina con un abono de 0;
+    con abono semanal de 0 nunca se liquida y se devuelve (None, None).
+    """
+    numeros, ultimos = [], []
+    for deuda, abono in zip(deudas, abonos):
+        if deuda <= 0:
+            numeros.append(1)
+            ultimos.append(deuda)
+        elif abono <= 0:
+            numeros.append(None)
+            ultimos.append(None)
+        else:
+            cociente, residuo = divmod(deuda, abono)
+            numero = int(cociente) + (1 if residuo else 0)
+            numeros.append(numero)
+            ultimos.append(deuda - (numero - 1) * abono)
+    return numeros, ultimos
+
+
+def calendario_de_abonos(inicios, numeros, abonos, ultimos, semanas):
+    """
+    Suma por semana (0 .. semanas-1) los abonos de todos los préstamos. Cada
+    préstamo cobra `abono` desde la semana `inicio` durante numero - 1 semanas
+    y `ultimo` en la semana inicio + numero - 1.
+    """
+    montos = [Decimal(0)] * (semanas + 1)
+    activos = [0] * (semanas + 1)
+    for inicio, numero, abono, ultimo in zip(inicios, numeros, abonos, ultimos):
+        if inicio >= semanas:
+            continue
+        final = semanas if numero is None else min(inicio + numero - 1, semanas)
+        # Abonos completos en [inicio, final)
+        montos[inicio] += abono
+        montos[final] -= abono
+        activos[inicio] += 1
+        activos[final] -= 1
+        if numero is not None and final < semanas:
+            montos[final] += ultimo
+            montos[final + 1] -= ultimo
+            activos[final] += 1
+            activos[final + 1] -= 1
+
+    total, prestamos, calendario = Decimal(0), 0, []
+    for semana in range(semanas):
+        total += montos[semana]
+        prestamos += activos[semana]
+        calendario.append((total, prestamos))
+    return calendario
+
+
+def proyectar_prestamos(semanas, fecha=None, empleado_id=None):
+    """
+    Calcula para cada préstamo activo cuántos abonos le faltan, el último abono
+    y la fecha de liquidación, y el total de descuentos por préstamos de las
+    próximas `semanas` nóminas.
+    """
+    fecha = fecha or date.today()
+    primera_fecha = proxima_fecha_de_pago(fecha)
+
+    prestamos = Prestamo.objects.filter(estatus=True).order_by('id')
+    if empleado_id is not None:
+        prestamos = prestamos.filter(empleado_id=empleado_id)
+    prestamos = list(prestamos.values(
+        'id', 'empleado_id', 'empleado__nombre', 'razon', 'deuda_restante', 'abono_semanal'
+    ))
+    empleado_ids = {prestamo['empleado_id'] for prestamo in prestamos}
+
+    # La nómina omite a los empleados sin salario vigente, y si ya se pagó la semana
+    # el siguiente abono es el de la semana próxima
+    con_salario = set(sueldos_vigentes(empleado_ids, primera_fecha))
+    ya_pagados = set(
+        Pago.objects.filter(empleado_id__in=empleado_ids, semana=semana_de_pago(primera_fecha))
+        .values_list('empleado_id', flat=True)
+    )
+
+    deudas = [prestamo['deuda_restante'] for prestamo in prestamos]
+    abonos = [prestamo['abono_semanal'] for prestamo in prestamos]
+    inicios = [1 if prestamo['empleado_id'] in ya_pagados else 0 for prestamo in prestamos]
+    numeros, ultimos = abonos_restantes(deudas, abonos)
+
+    proyectados = [i for i, prestamo in enumerate(prestamos) if prestamo['empleado_id'] in con_salario]
+    calendario = calendario_de_abonos(
+        [inicios[i] for i in proyectados], [numeros[i] for i in proyectados],
+        [abonos[i] for i in proyectados], [ultimos[i] for i in proyectados], semanas
+    )
+
+    resultado = []
+    for i, prestamo in enumerate(prestamos):
+        sin_salario = prestamo['empleado_id'] not in con_salario
+        liquidacion = None
+        if numeros[i] is not None and not sin_salario:
+            liquidacion = primera_fecha + timedelta(weeks=inicios[i] + numeros[i] - 1)
+        resultado.append({
+            "prestamo_id": prestamo['id'],
+            "empleado": prestamo['empleado_id'],
+            "nombre_empleado": prestamo['empleado__nombre'],
+            "razon": prestamo['razon'],
+            "deuda_restante": str(deudas[i]),
+            "abono_semanal": str(abonos[i]),
+            "abonos_restantes": numeros[i],
+            "ultimo_abono": None if ultimos[i] is None else str(ultimos[i]),
+            "fecha_liquidacion": liquidacion and liquidacion.isoformat(),
+            "sin_salario": sin_salario,
+        })
+
+    return {
+        "fecha": fecha.isoformat(),
+        "prestamos": resultado,
+        "calendario": [
+            {
+                "fecha_pago": (primera_fecha + timedelta(weeks=semana)).isoformat(),
+                "total_abonos": str(total),
+                "prestamos": activos,
+            }
+            for semana, (total, activos) in enumerate(calendario)
+        ],
+    }
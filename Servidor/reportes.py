@@ -0,0 +1,206 @@
+# Servidor/reportes.py
+# Totales de nómina por semana y por mes.
+#
+# Los pagos se suman en la base de datos agrupados con TruncWeek/TruncMonth;
+# el sueldo base, las faltas y los abonos se leen del desglose (detalle) de
+# cada Pago con KT y Cast. Los periodos ya cerrados se guardan en el caché de
+# respuestas bajo una clave con la versión de cada semana que abarcan: guardar
+# o borrar un pago incrementa la versión de su semana, así que de ordinario
+# solo se vuelve a calcular el periodo abierto. Los nombres de los empleados no
+# se guardan con los totales; se leen en cada consulta.
+import hashlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, TruncMonth, TruncWeek
+
+from .models import Empleado, Pago
+from . import cache_respuestas
+
+PERIODOS = {'semana': TruncWeek, 'mes': TruncMonth}
+MAXIMO_PERIODOS = 120
+# Periodos que abarca el reporte si no se indica ?desde=
+PERIODOS_POR_DEFECTO = 12
+
+# Los descuentos se guardan con todos los decimales de sueldo/6
+DECIMAL = DecimalField(max_digits=20, decimal_places=6)
+CENTAVOS = Decimal('0.01')
+
+CAMPOS_MONTO = ('sueldo_base', 'descuento_faltas', 'abonos_prestamos', 'total_pagado')
+
+
+def inicio_de_periodo(fecha, periodo):
+    if periodo == 'mes':
+        return fecha.replace(day=1)
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def siguiente_periodo(inicio, periodo):
+    if periodo == 'mes':
+        return (inicio + timedelta(days=31)).replace(day=1)
+    return inicio + timedelta(days=7)
+
+
+def inicio_de_ultimos_periodos(hasta, periodo, cantidad):
+    """
+    Inicio del periodo que está `cantidad` - 1 periodos antes del que contiene
+    a hasta, por calendario (los meses no tienen todos el mismo número de días).
+    """
+    inicio = inicio_de_periodo(hasta, periodo)
+    for _ in range(cantidad - 1):
+        if periodo == 'mes':
+            inicio = (inicio - timedelta(days=1)).replace(day=1)
+        else:
+            inicio -= timedelta(days=7)
+    return inicio
+
+
+def inicios_de_periodos(periodo, desde, hasta):
+    inicios = []
+    inicio = inicio_de_periodo(desde, periodo)
+    while inicio <= hasta:
+        inicios.append(inicio)
+        inicio = siguiente_periodo(inicio, periodo)
+    return inicios
+
+
+def semanas_del_periodo(inicio, periodo):
+    # Lunes de cada semana con al menos un día en el periodo
+    semana = inicio - timedelta(days=inicio.weekday())
+    fin = siguiente_periodo(inicio, periodo)
+    semanas = []
+    while semana < fin:
+        semanas.append(semana)
+        semana += timedelta(days=7)
+    return semanas
+
+
+def clave_de_version(semana):
+    return cache_respuestas.clave_version('reporte_nomina', semana.isoformat())
+
+
+def sumas_de_nomina():
+    return {
+        "pagos": Count('id'),
+        "sueldo_base": Sum(Cast(KT('detalle__sueldo_base'), DECIMAL)),
+        "dias_faltados": Sum(Cast(KT('detalle__faltas__dias_faltados'), IntegerField())),
+        "descuento_faltas": Sum(Cast(KT('detalle__faltas__descuento'), DECIMAL)),
+        "abonos_prestamos": Sum(Cast(KT('detalle__total_abonos'), DECIMAL)),
+        "total_pagado": Sum('monto_a_pagar'),
+    }
+
+
+def totales_vacios():
+    return {"pagos": 0, "dias_faltados": 0, **{campo: Decimal(0) for campo in CAMPOS_MONTO}}
+
+
+def sumar_totales(totales, fila):
+    # Los pagos sin desglose (detalle vacío) suman None en sus campos
+    for campo in totales:
+        totales[campo] += fila[campo] or 0
+
+
+def formatear_totales(totales):
+    return {
+        "pagos": totales["pagos"],
+        "dias_faltados": totales["dias_faltados"],
+        **{campo: str(Decimal(totales[campo]).quantize(CENTAVOS)) for campo in CAMPOS_MONTO},
+    }
+
+
+def calcular_periodos(periodo, inicios, empleado_id=None, por_empleado=False):
+    """
+    Calcula los totales de varios periodos con una sola consulta agregada.
+    Devuelve {inicio: {"totales": ..., "empleados": [...]}}.
+    """
+    pagos = Pago.objects.filter(fecha_pago__gte=min(inicios), fecha_pago__lt=siguiente_periodo(max(inicios), periodo))
+    if empleado_id is not None:
+        pagos = pagos.filter(empleado_id=empleado_id)
+    grupos = ('inicio', 'empleado_id') if por_empleado else ('inicio',)
+    filas = (
+        pagos.annotate(inicio=PERIODOS[periodo]('fecha_pago'))
+        .values(*grupos)
+        .annotate(**sumas_de_nomina())
+        .order_by(*grupos)
+    )
+
+    resultado = {inicio: {"totales": totales_vacios(), "empleados": []} for inicio in inicios}
+    for fila in filas:
+        if fila['inicio'] not in resultado:
+            continue
+        grupo = resultado[fila['inicio']]
+        sumar_totales(grupo["totales"], fila)
+        if por_empleado:
+            totales = totales_vacios()
+            sumar_totales(totales, fila)
+            grupo["empleados"].append({
+                "empleado": fila['empleado_id'],
+                **formatear_totales(totales),
+            })
+
+    for grupo in resultado.values():
+        grupo["totales"] = formatear_totales(grupo["totales"])
+        if not por_empleado:
+            del grupo["empleados"]
+    return resultado
+
+
+def reporte_de_nomina(periodo, desde, hasta, empleado_id=None, por_empleado=False, hoy=None):
+    """
+    Devuelve los totales de nómina de cada semana o mes entre desde y hasta.
+    Los periodos que terminaron antes de `hoy` se toman del caché si están.
+    """
+    inicios = inicios_de_periodos(periodo, desde, hasta)
+    hoy = hoy or date.today()
+
+    cerrados = [inicio for inicio in inicios if siguiente_periodo(inicio, periodo) <= hoy]
+    semanas = {inicio: semanas_del_periodo(inicio, periodo) for inicio in cerrados}
+    claves_de_version = [cache_respuestas.CLAVE_VERSION_GLOBAL] + sorted({
+        clave_de_version(semana) for inicio in cerrados for semana in semanas[inicio]
+    })
+    versiones = dict(zip(claves_de_version, cache_respuestas.versiones(claves_de_version)))
+    claves = {}
+    for inicio in cerrados:
+        claves_del_periodo = [cache_respuestas.CLAVE_VERSION_GLOBAL] + [clave_de_version(semana) for semana in semanas[inicio]]
+        version = '.'.join(str(versiones[clave]) for clave in claves_del_periodo)
+        claves[inicio] = (
+            f'reportes:nomina:{periodo}:{inicio.isoformat()}:{empleado_id or "todos"}:{int(por_empleado)}:'
+            f'{hashlib.md5(version.encode()).hexdigest()}'
+        )
+
+    cache = cache_respuestas.cache_respuestas()
+    guardados = cache.get_many(list(claves.values()))
+    faltantes = [inicio for inicio in inicios if claves.get(inicio) not in guardados]
+    calculados = calcular_periodos(periodo, faltantes, empleado_id, por_empleado) if faltantes else {}
+    # Los periodos cerrados se reemplazan al cambiar la versión de sus semanas y
+    # vencen con el TIMEOUT del caché de respuestas
+    cache.set_many({claves[inicio]: calculados[inicio] for inicio in faltantes if inicio in claves})
+
+    periodos = [
+        {
+            "inicio": inicio.isoformat(),
+            "cerrado": inicio in claves,
+            **(guardados[claves[inicio]] if inicio in claves and claves[inicio] in guardados else calculados[inicio]),
+        }
+        for inicio in inicios
+    ]
+    if por_empleado:
+        nombres = dict(
+            Empleado.objects.filter(
+                id__in={fila["empleado"] for datos in periodos for fila in datos["empleados"]}
+            ).values_list('id', 'nombre')
+        )
+        for datos in periodos:
+            datos["empleados"] = [
+                {"empleado": fila["empleado"], "nombre_empleado": nombres.get(fila["empleado"]), **fila}
+                for fila in datos["empleados"]
+            ]
+
+    return {
+        "periodo": periodo,
+        "desde": inicios[0].isoformat(),
+        "hasta": hasta.isoformat(),
+        "periodos": periodos,
+    }
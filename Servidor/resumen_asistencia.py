@@ -0,0 +1,171 @@
+# Servidor/resumen_asistencia.py
+# Mantenimiento de ResumenAsistenciaSemanal a partir de Asistencia.
+#
+# Además de los conteos, cada fila guarda la semana como dos mapas de bits: en
+# `registrados` el bit i indica que el día lunes + i tiene asistencia
+# registrada y en `presentes` que el empleado asistió. Se escriben junto con
+# cada Asistencia (que sigue siendo el registro de la API), y las faltas de
+# la nómina y la matriz de asistencias se calculan con operaciones de bits
+# sobre una fila por semana en lugar de siete registros diarios.
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncWeek
+
+from .models import Asistencia, Empleado, ResumenAsistenciaSemanal
+
+
+def semana_de(fecha):
+    """
+    Devuelve el lunes de la semana a la que pertenece una fecha.
+    """
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def bit_del_dia():
+    # Como hay un registro por empleado y día, sumar los bits equivale a un OR
+    return Case(*[When(fecha__iso_week_day=dia + 1, then=Value(1 << dia)) for dia in range(7)], default=Value(0))
+
+
+def conteo_asistencias():
+    return {
+        "dias_presentes": Count('id', filter=Q(asistencia=True)),
+        "dias_ausentes": Count('id', filter=Q(asistencia=False)),
+        "registrados": Coalesce(Sum(bit_del_dia()), 0),
+        "presentes": Coalesce(Sum(bit_del_dia(), filter=Q(asistencia=True)), 0),
+    }
+
+
+def bloquear_empleados(empleado_ids):
+    """
+    Bloquea las filas de los empleados hasta el final de la transacción, para
+    que dos escrituras de asistencias del mismo empleado no recalculen su
+    resumen a la vez y la última pise el conteo de la otra (las solicitudes de
+    vacaciones lo usan igual, antes de revisar traslapes). FOR NO KEY UPDATE
+    no choca con el FOR KEY SHARE que toma el INSERT de una Asistencia, así
+    que dos transacciones que insertan y luego recalculan se ordenan en lugar
+    de bloquearse mutuamente.
+    """
+    list(
+        Empleado.objects.select_for_update(no_key=True)
+        .filter(id__in=empleado_ids).order_by('id').values_list('id', flat=True)
+    )
+
+
+def actualizar_resumen_semanal(empleado_id, semana):
+    """
+    Recalcula la fila de resumen de un empleado y semana con una sola consulta
+    sobre los días de esa semana, con el empleado bloqueado.
+    """
+    with transaction.atomic():
+        bloquear_empleados([empleado_id])
+        conteo = Asistencia.objects.filter(
+            empleado_id=empleado_id, fecha__range=(semana, semana + timedelta(days=6))
+        ).aggregate(**conteo_asistencias())
+
+        if not conteo['dias_presentes'] and not conteo['dias_ausentes']:
+            ResumenAsistenciaSemanal.objects.filter(empleado_id=empleado_id, semana=semana).delete()
+        else:
+            ResumenAsistenciaSemanal.objects.update_or_create(
+                empleado_id=empleado_id, semana=semana, defaults=conteo
+            )
+
+
+def actualizar_resumenes(semanas):
+    """
+    Recalcula varias filas de resumen a la vez, para escrituras masivas que no
+    disparan señales. `semanas` es un conjunto de pares (empleado_id, lunes).
+    """
+    if not semanas:
+        return
+    empleado_ids = {empleado_id for empleado_id, _ in semanas}
+    inicio = min(semana for _, semana in semanas)
+    fin = max(semana for _, semana in semanas) + timedelta(days=6)
+    filas = (
+        Asistencia.objects.filter(empleado_id__in=empleado_ids, fecha__range=(inicio, fin))
+        .annotate(semana=TruncWeek('fecha'))
+        .values('empleado_id', 'semana')
+        .annotate(**conteo_asistencias())
+        .order_by()
+    )
+    with transaction.atomic():
+        bloquear_empleados(empleado_ids)
+        ResumenAsistenciaSemanal.objects.bulk_create(
+            [ResumenAsistenciaSemanal(**fila) for fila in filas if (fila['empleado_id'], fila['semana']) in semanas],
+            update_conflicts=True,
+            unique_fields=['empleado', 'semana'],
+            update_fields=['dias_presentes', 'dias_ausentes', 'registrados', 'presentes', 'updated_at'],
+            batch_size=1000
+        )
+
+
+def reconstruir_resumenes():
+    """
+    Reconstruye todo el resumen con una consulta agrupada por empleado y semana.
+    Devuelve el número de filas creadas.
+    """
+    filas = (
+        Asistencia.objects.annotate(semana=TruncWeek('fecha'))
+        .values('empleado_id', 'semana')
+        .annotate(**conteo_asistencias())
+        .order_by()
+    )
+    with transaction.atomic():
+        ResumenAsistenciaSemanal.objects.all().delete()
+        resumenes = ResumenAsistenciaSemanal.objects.bulk_create(
+            (ResumenAsistenciaSemanal(**fila) for fila in filas.iterator(chunk_size=2000)),
+            batch_size=1000
+        )
+    return len(resumenes)
+
+
+def mascara_de_dias(semana, desde, hasta, excluir=()):
+    """
+    Bits de los días de la semana que caen entre desde y hasta (inclusive), sin
+    los días de la semana en `excluir` (0 = lunes).
+    """
+    mascara = 0
+    for dia in range(7):
+        if desde <= semana + timedelta(days=dia) <= hasta and dia not in excluir:
+            mascara |= 1 << dia
+    return mascara
+
+
+def contar_faltas(empleado_ids, desde, hasta, excluir=()):
+    """
+    Devuelve {empleado_id: faltas} entre desde y hasta sin contar los días de la
+    semana en `excluir`. Lee los mapas de bits del resumen semanal, o los
+    registros diarios si ASISTENCIA_FALTAS_DESDE_MAPAS = False.
+    """
+    if not getattr(settings, 'ASISTENCIA_FALTAS_DESDE_MAPAS', True):
+        return contar_faltas_en_registros(empleado_ids, desde, hasta, excluir)
+
+    mascaras = {}
+    semana = semana_de(desde)
+    while semana <= hasta:
+        mascaras[semana] = mascara_de_dias(semana, desde, hasta, excluir)
+        semana += timedelta(days=7)
+
+    faltas = defaultdict(int)
+    filas = ResumenAsistenciaSemanal.objects.filter(
+        empleado_id__in=empleado_ids, semana__in=mascaras
+    ).values_list('empleado_id', 'semana', 'registrados', 'presentes')
+    for empleado_id, semana, registrados, presentes in filas:
+        faltas[empleado_id] += (registrados & ~presentes & mascaras[semana]).bit_count()
+    return {empleado_id: total for empleado_id, total in faltas.items() if total}
+
+
+def contar_faltas_en_registros(empleado_ids, desde, hasta, excluir=()):
+    # week_day de Django va de 1 (domingo) a 7 (sábado)
+    return dict(
+        Asistencia.objects.filter(
+            empleado_id__in=empleado_ids, fecha__range=(desde, hasta), asistencia=False
+        )
+        .exclude(fecha__week_day__in=[(dia + 1) % 7 + 1 for dia in excluir])
+        .values('empleado_id')
+        .annotate(faltas=Count('id'))
+        .values_list('empleado_id', 'faltas')
+    )
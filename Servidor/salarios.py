@@ -0,0 +1,86 @@
+# Servidor/salarios.py
+# Salario vigente de cada empleado en una fecha.
+#
+# Un salario aplica desde su vigente_desde hasta que empieza otro del mismo
+# empleado; si dos empiezan el mismo día gana el último registrado. Los sueldos
+# consultados se guardan en memoria del proceso por (versión, empleado, fecha).
+# La versión vive en la base de datos (Servidor/versiones.py) y se incrementa al
+# confirmar cualquier cambio de Salario, con lo que cada proceso descarta sus
+# sueldos en memoria.
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+from . import versiones
+from .models import Salario
+
+CLAVE_VERSION_SALARIOS = 'salarios:version'
+
+# Entradas (empleado, fecha) en memoria antes de vaciarla
+MAXIMO_EN_MEMORIA = 50000
+
+_sueldos_en_memoria = {}
+_version_en_memoria = None
+# Marca de "no está en memoria"; None en memoria significa "sin salario vigente"
+_SIN_VALOR = object()
+
+
+def version_salarios():
+    return versiones.version(CLAVE_VERSION_SALARIOS)
+
+
+def invalidar_salarios():
+    """
+    Descarta los sueldos en memoria de todos los procesos cambiando la versión.
+    """
+    versiones.incrementar([CLAVE_VERSION_SALARIOS])
+
+
+def consultar_sueldos_vigentes(empleado_ids, fecha):
+    """
+    Devuelve {empleado_id: sueldo_semanal} con el salario vigente en `fecha` de
+    cada empleado, en una sola consulta. Los empleados sin salario vigente no
+    aparecen.
+    """
+    vigente = (
+        Salario.objects.filter(empleado=OuterRef('empleado'), vigente_desde__lte=fecha)
+        .order_by('-vigente_desde', '-created_at', '-id')
+    )
+    return dict(
+        Salario.objects.filter(empleado_id__in=empleado_ids, id=Subquery(vigente.values('id')[:1]))
+        .values_list('empleado_id', 'sueldo_semanal')
+    )
+
+
+def sueldos_vigentes(empleado_ids, fecha):
+    """
+    Igual que consultar_sueldos_vigentes, pero solo consulta la base de datos
+    por los empleados que no estén en memoria para esa fecha.
+
+    Lo leído dentro de una transacción no se guarda en memoria, porque puede
+    incluir salarios que todavía no se confirman o que se van a revertir; la
+    nómina lee los sueldos antes de abrir la suya (ver calcular_nomina).
+    """
+    global _version_en_memoria
+    version = version_salarios()
+    if version != _version_en_memoria or len(_sueldos_en_memoria) > MAXIMO_EN_MEMORIA:
+        _sueldos_en_memoria.clear()
+        _version_en_memoria = version
+
+    sueldos, faltantes = {}, []
+    for empleado_id in empleado_ids:
+        # Una sola lectura: otro hilo del worker puede vaciar la memoria entre dos
+        sueldo = _sueldos_en_memoria.get((version, empleado_id, fecha), _SIN_VALOR)
+        if sueldo is _SIN_VALOR:
+            faltantes.append(empleado_id)
+        elif sueldo is not None:
+            sueldos[empleado_id] = sueldo
+
+    if faltantes:
+        consultados = consultar_sueldos_vigentes(faltantes, fecha)
+        sueldos.update(consultados)
+        if not connection.in_atomic_block:
+            # La versión va en la clave: si otro hilo la cambia mientras se
+            # consulta, estos sueldos quedan guardados con la versión vieja
+            for empleado_id in faltantes:
+                _sueldos_en_memoria[(version, empleado_id, fecha)] = consultados.get(empleado_id)
+    return sueldos
@@ -1,5 +1,135 @@
-from rest_framework import serializers
-from .models import Empleado, Asistencia, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
+import decimal
+import functools
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .instrumentacion import medir_serializacion
+from .models import Empleado, Asistencia, ResumenAsistenciaSemanal, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
+from .vacaciones import vacaciones_que_se_traslapan
+
+
+def precargar(queryset, serializer_class):
+    """
+    Aplica select_related con las relaciones que el serializer declara en
+    Meta.select_related, para no hacer una consulta por registro al leer
+    campos como empleado.nombre.
+    """
+    relaciones = getattr(serializer_class.Meta, 'select_related', ())
+    return queryset.select_related(*relaciones) if relaciones else queryset
+
+
+# Lectura rápida: las listas se arman desde filas de .values() con la misma
+# salida que el serializer, sin crear instancias del modelo ni recorrer la
+# maquinaria de campos de DRF por cada registro. Los serializers siguen
+# usándose para validar y guardar.
+
+def convertir_decimal(campo):
+    # Mismo redondeo que DecimalField.quantize
+    exponente = decimal.Decimal('.1') ** campo.decimal_places
+    contexto = decimal.getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+    return lambda valor: '{:f}'.format(valor.quantize(exponente, rounding=campo.rounding, context=contexto))
+
+
+def convertir_fecha_hora(valor, zona):
+    texto = valor.astimezone(zona).isoformat()
+    return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+
+
+def conversion_de_campo(campo):
+    """
+    Devuelve (ruta en .values(), función de conversión) de un campo de DRF, o
+    None si el campo necesita la instancia del modelo. La conversión None deja
+    el valor tal como sale de la base de datos.
+    """
+    if isinstance(campo, serializers.SerializerMethodField) or campo.source == '*':
+        return None
+    ruta = campo.source.replace('.', '__')
+    formato = getattr(campo, 'format', None)
+
+    if isinstance(campo, serializers.PrimaryKeyRelatedField):
+        return (ruta, None) if campo.pk_field is None else None
+    if isinstance(campo, serializers.DateTimeField):
+        return (ruta, convertir_fecha_hora) if (formato or api_settings.DATETIME_FORMAT).lower() == ISO_8601 else None
+    if isinstance(campo, serializers.DateField):
+        return (ruta, lambda valor: valor.isoformat()) if (formato or api_settings.DATE_FORMAT).lower() == ISO_8601 else None
+    if isinstance(campo, serializers.DecimalField):
+        coercion = getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coercion or campo.localize or campo.normalize_output or campo.decimal_places is None:
+            return None
+        return ruta, convertir_decimal(campo)
+    if isinstance(campo, serializers.BooleanField):
+        return ruta, bool
+    if isinstance(campo, serializers.IntegerField):
+        return ruta, int
+    if isinstance(campo, serializers.CharField):
+        return ruta, str
+    if isinstance(campo, serializers.JSONField):
+        return None if campo.binary else (ruta, None)
+    return None
+
+
+@functools.cache
+def campos_de_lectura(serializer_class):
+    """
+    Lista (nombre, ruta, conversión) de los campos que entrega el serializer,
+    en su mismo orden, o None si alguno no se puede leer desde .values().
+    """
+    campos = []
+    for nombre, campo in serializer_class().fields.items():
+        if campo.write_only:
+            continue
+        conversion = conversion_de_campo(campo)
+        if conversion is None:
+            return None
+        campos.append((nombre, *conversion))
+    return campos
+
+
+def valores_de_lectura(queryset, serializer_class, adicionales=()):
+    """
+    Aplica .values() con las columnas (y joins) que necesita el serializer, más
+    las de `adicionales`. Devuelve None si el serializer no admite la lectura
+    rápida.
+    """
+    campos = campos_de_lectura(serializer_class)
+    if campos is None:
+        return None
+    return queryset.values(*dict.fromkeys([*(ruta for _, ruta, _ in campos), *adicionales]))
+
+
+def representar_filas(filas, serializer_class):
+    """
+    Convierte filas de valores_de_lectura en la misma lista de diccionarios
+    que serializer_class(..., many=True).data.
+    """
+    zona = timezone.get_current_timezone()
+    campos = [
+        (nombre, ruta, functools.partial(convertir_fecha_hora, zona=zona) if conversion is convertir_fecha_hora else conversion)
+        for nombre, ruta, conversion in campos_de_lectura(serializer_class)
+    ]
+    resultado = []
+    for fila in filas:
+        datos = {}
+        for nombre, ruta, conversion in campos:
+            valor = fila[ruta]
+            datos[nombre] = valor if valor is None or conversion is None else conversion(valor)
+        resultado.append(datos)
+    return resultado
+
+
+def serializar_lista(queryset, serializer_class):
+    """
+    Serializa un queryset para lectura con la vía rápida si el serializer la
+    admite, o con el serializer completo si no.
+    """
+    valores = valores_de_lectura(queryset, serializer_class)
+    with medir_serializacion():
+        if valores is None:
+            return serializer_class(precargar(queryset, serializer_class), many=True).data
+        return representar_filas(valores, serializer_class)
 
 class EmpleadoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,24 +142,57 @@ class AsistenciaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Asistencia
         fields = '__all__'
+        select_related = ('empleado',)
+
+class AsistenciaMasivaSerializer(serializers.Serializer):
+    # Solo valida el formato de cada fila; la existencia de los empleados se
+    # comprueba para todo el lote con una sola consulta en la vista
+    empleado = serializers.IntegerField(min_value=1)
+    fecha = serializers.DateField()
+    asistencia = serializers.BooleanField()
+
+class ResumenAsistenciaSemanalSerializer(serializers.ModelSerializer):
+    nombre_empleado = serializers.CharField(source='empleado.nombre', read_only=True)
+    class Meta:
+        model = ResumenAsistenciaSemanal
+        # Los mapas de bits son de uso interno; la respuesta conserva los conteos
+        exclude = ('registrados', 'presentes')
+        select_related = ('empleado',)
 
 class VacacionSerializer(serializers.ModelSerializer):
     nombre_empleado = serializers.CharField(source='empleado.nombre', read_only=True)
     class Meta:
         model = Vacacion
         fields = '__all__'
+        select_related = ('empleado',)
 
 class VacacionTomadaSerializer(serializers.ModelSerializer):
     nombre_empleado = serializers.CharField(source='empleado.nombre', read_only=True)
     class Meta:
         model = VacacionTomada
         fields = '__all__'
+        select_related = ('empleado',)
+
+    def validate(self, data):
+        empleado = data.get('empleado', getattr(self.instance, 'empleado', None))
+        fecha_inicio = data.get('fecha_inicio', getattr(self.instance, 'fecha_inicio', None))
+        fecha_fin = data.get('fecha_fin', getattr(self.instance, 'fecha_fin', None))
+        if fecha_fin < fecha_inicio:
+            raise serializers.ValidationError({"fecha_fin": "La fecha de fin no puede ser anterior a la de inicio."})
+
+        traslapes = vacaciones_que_se_traslapan(empleado.id, fecha_inicio, fecha_fin)
+        if self.instance is not None:
+            traslapes = traslapes.exclude(pk=self.instance.pk)
+        if traslapes.exists():
+            raise serializers.ValidationError("El empleado ya tiene vacaciones registradas en esas fechas.")
+        return data
 
 class SalarioSerializer(serializers.ModelSerializer):
     nombre_empleado = serializers.CharField(source='empleado.nombre', read_only=True)
     class Meta:
         model = Salario
         fields = '__all__'
+        select_related = ('empleado',)
 
 class PrestamoSerializer(serializers.ModelSerializer):
     nombre_empleado = serializers.CharField(source='empleado.nombre', read_only=True)
@@ -37,6 +200,7 @@ class PrestamoSerializer(serializers.ModelSerializer):
 
         model = Prestamo
         fields = '__all__'
+        select_related = ('empleado',)
 
 class AbonoSerializer(serializers.ModelSerializer):
     nombre_empleado = serializers.CharField(source='empleado.nombre', read_only=True)
@@ -44,6 +208,7 @@ class AbonoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Abono
         fields = '__all__'
+        select_related = ('empleado', 'prestamo')
         extra_fields = ['razon_prestamo']
 
 class PagoSerializer(serializers.ModelSerializer):
@@ -52,3 +217,5 @@ class PagoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pago
         fields = '__all__'
+        select_related = ('empleado',)
+        read_only_fields = ['semana']  # Solo la asigna registrar_pago
@@ -0,0 +1,147 @@
+# Servidor/signals.py
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Empleado, Asistencia, Salario, Prestamo, Abono, Pago, Vacacion, VacacionTomada
+from .nomina import invalidar_previsualizacion
+from .salarios import invalidar_salarios
+from .vacaciones import ajustar_dias_restantes, dias_tomados
+from .resumen_asistencia import actualizar_resumen_semanal, semana_de
+from . import cache_respuestas
+
+
+# Campos cuyo valor anterior hace falta al editar un registro, para invalidar
+# también la fecha o el empleado de origen si cambian
+CAMPOS_ANTERIORES = {
+    Asistencia: ['empleado_id', 'fecha'],
+    Pago: ['empleado_id', 'fecha_pago'],
+    Abono: ['empleado_id'],
+    Prestamo: ['empleado_id'],
+    VacacionTomada: ['empleado_id', 'dias_tomados'],
+}
+
+# Etiquetas del caché de respuestas a las que pertenece cada registro
+ETIQUETAS_CACHE = {
+    Asistencia: [('asistencias_fecha', 'fecha')],
+    Pago: [('pagos_fecha', 'fecha_pago'), ('pagos_empleado', 'empleado_id')],
+    Abono: [('abonos_empleado', 'empleado_id')],
+    # AbonoSerializer muestra la razón del préstamo
+    Prestamo: [('prestamos_empleado', 'empleado_id'), ('abonos_empleado', 'empleado_id')],
+    VacacionTomada: [('vacaciones_tomadas_empleado', 'empleado_id')],
+}
+
+
+def valor_campo(modelo, valores, campo):
+    # Los valores pueden llegar como texto si el registro se creó directamente con el ORM
+    return modelo._meta.get_field(campo).to_python(valores[campo])
+
+
+def valores_actuales(instance):
+    return {campo: getattr(instance, campo) for campo in CAMPOS_ANTERIORES[type(instance)]}
+
+
+@receiver(pre_save)
+def recordar_valores_anteriores(sender, instance, raw=False, **kwargs):
+    instance._valores_anteriores = None
+    if sender in CAMPOS_ANTERIORES and instance.pk and not raw:
+        instance._valores_anteriores = (
+            sender.objects.filter(pk=instance.pk).values(*CAMPOS_ANTERIORES[sender]).first()
+        )
+
+
+def versiones_del_registro(sender, instance):
+    """
+    Devuelve los valores actuales y, si es distinto, los anteriores a la edición.
+    """
+    versiones = [valores_actuales(instance)]
+    anteriores = getattr(instance, '_valores_anteriores', None)
+    if anteriores and anteriores != versiones[0]:
+        versiones.append(anteriores)
+    return versiones
+
+
+# La previsualización de nómina depende de estos modelos
+@receiver([post_save, post_delete], sender=Empleado)
+@receiver([post_save, post_delete], sender=Asistencia)
+@receiver([post_save, post_delete], sender=Salario)
+@receiver([post_save, post_delete], sender=Prestamo)
+def invalidar_previsualizacion_nomina(sender, **kwargs):
+    # Después del commit, para no guardar en caché datos aún sin confirmar
+    transaction.on_commit(invalidar_previsualizacion)
+
+
+# Sueldos vigentes en memoria de cada proceso
+@receiver([post_save, post_delete], sender=Salario)
+def invalidar_sueldos_vigentes(sender, **kwargs):
+    transaction.on_commit(invalidar_salarios)
+
+
+# Caché de respuestas por fecha y por empleado
+@receiver([post_save, post_delete])
+def invalidar_cache_respuestas(sender, instance, **kwargs):
+    if sender is Empleado:
+        # El nombre del empleado aparece en todas las respuestas
+        cache_respuestas.invalidar_todo()
+    elif sender in ETIQUETAS_CACHE:
+        cache_respuestas.invalidar(
+            (etiqueta, str(valor_campo(sender, valores, campo)))
+            for valores in versiones_del_registro(sender, instance)
+            for etiqueta, campo in ETIQUETAS_CACHE[sender]
+        )
+
+
+# Reportes de nómina: cada pago invalida los totales de la semana de su fecha
+@receiver([post_save, post_delete], sender=Pago)
+def invalidar_reportes_de_nomina(sender, instance, **kwargs):
+    cache_respuestas.invalidar(
+        ('reporte_nomina', semana_de(valor_campo(Pago, valores, 'fecha_pago')).isoformat())
+        for valores in versiones_del_registro(sender, instance)
+    )
+
+
+# Resumen semanal de asistencias
+@receiver(post_save, sender=Asistencia)
+def actualizar_resumen_al_guardar(sender, instance, **kwargs):
+    # Si una edición mueve la asistencia a otro empleado o semana, hay que
+    # recalcular también la semana de origen
+    semanas = {
+        (valores['empleado_id'], semana_de(valor_campo(Asistencia, valores, 'fecha')))
+        for valores in versiones_del_registro(sender, instance)
+    }
+    for empleado_id, semana in semanas:
+        actualizar_resumen_semanal(empleado_id, semana)
+
+
+@receiver(post_delete, sender=Asistencia)
+def actualizar_resumen_al_borrar(sender, instance, **kwargs):
+    actualizar_resumen_semanal(instance.empleado_id, semana_de(valor_campo(Asistencia, valores_actuales(instance), 'fecha')))
+
+
+# Saldo de vacaciones
+@receiver(pre_save, sender=Vacacion)
+def asignar_dias_de_vacaciones(sender, instance, raw=False, **kwargs):
+    if instance.dias_asignados is None and not raw:
+        instance.dias_asignados = int(instance.dias_restantes) + dias_tomados(instance.empleado_id)
+
+
+@receiver(post_save, sender=VacacionTomada)
+def ajustar_saldo_al_guardar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # En una edición se devuelven los días anteriores al empleado anterior, así
+    # que solo se aplica la diferencia
+    cambios = defaultdict(int)
+    for valores, signo in ((valores_actuales(instance), -1), (getattr(instance, '_valores_anteriores', None), 1)):
+        if valores:
+            cambios[valor_campo(sender, valores, 'empleado_id')] += signo * valor_campo(sender, valores, 'dias_tomados')
+    for empleado_id, dias in cambios.items():
+        if dias:
+            ajustar_dias_restantes(empleado_id, dias)
+
+
+@receiver(post_delete, sender=VacacionTomada)
+def ajustar_saldo_al_borrar(sender, instance, **kwargs):
+    ajustar_dias_restantes(instance.empleado_id, valor_campo(sender, valores_actuales(instance), 'dias_tomados'))
@@ -1,3 +1,1447 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentacion import InstrumentacionMiddleware
+from .models import (
+    Empleado, Asistencia, ResumenAsistenciaSemanal, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago, VersionDeCache
+)
+from .nomina import (
+    CLAVE_VERSION_PREVISUALIZACION, aplicar_abono, calcular_nomina, periodo_de_pago, registrar_nomina, semana_de_pago,
+    version_previsualizacion,
+)
+from .proyeccion import proxima_fecha_de_pago, proyectar_prestamos
+from .reportes import reporte_de_nomina
+from .resumen_asistencia import contar_faltas, contar_faltas_en_registros
+from .salarios import CLAVE_VERSION_SALARIOS, sueldos_vigentes
+from .vacaciones import vacaciones_que_se_traslapan
+from . import reportes, serializers, versiones
+
+
+# Las pruebas de consultas miden el trabajo en la base de datos, sin caché de respuestas
+SIN_CACHE_DE_RESPUESTAS = override_settings(CACHES={
+    **settings.CACHES,
+    'respuestas': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+
+
+def crear_empleado_con_historial(empleado=None, numero=0):
+    """
+    Crea (o reutiliza) un empleado y le agrega un registro de cada modelo.
+    """
+    hoy = date.today()
+    if empleado is None:
+        empleado = Empleado.objects.create(nombre=f"Empleado {numero}", telefono="5550000", fecha_entrada=hoy)
+    fecha = hoy - timedelta(days=numero)
+    Asistencia.objects.create(empleado=empleado, fecha=fecha, asistencia=numero % 2 == 0)
+    Vacacion.objects.create(empleado=empleado, dias_restantes=6)
+    VacacionTomada.objects.create(empleado=empleado, fecha_inicio=fecha, fecha_fin=fecha, dias_tomados=1)
+    Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('1800.00'))
+    prestamo = Prestamo.objects.create(
+        empleado=empleado, monto_prestamo=Decimal('500.00'), abono_semanal=Decimal('100.00'),
+        razon="Préstamo", fecha_prestamo=fecha
+    )
+    Abono.objects.create(
+        empleado=empleado, prestamo=prestamo, monto_abono=Decimal('100.00'),
+        fecha_abono=fecha, deuda_restante=Decimal('400.00')
+    )
+    Pago.objects.create(empleado=empleado, monto_a_pagar=Decimal('1700.00'), fecha_pago=fecha, detalle={})
+    return empleado
+
+
+@SIN_CACHE_DE_RESPUESTAS
+class ConsultasConstantesTest(TestCase):
+    """
+    Las listas deben hacer el mismo número de consultas sin importar cuántos
+    registros devuelvan (sin consultas N+1 por relaciones).
+    """
+
+    def setUp(self):
+        self.empleado = crear_empleado_con_historial(numero=0)
+
+    def urls(self):
+        hoy = date.today().isoformat()
+        return [
+            '/api/empleados/',
+            '/api/asistencias/',
+            '/api/asistencias/?limite=50',
+            f'/api/asistencias/{hoy}/',
+            '/api/asistencias/resumen_semanal/',
+            '/api/vacaciones/',
+            '/api/vacaciones_tomadas/',
+            '/api/salarios/',
+            '/api/prestamos/',
+            '/api/abonos/',
+            '/api/pagos/',
+            '/api/pagos/?limite=50',
+            f'/api/pagos/{hoy}/',
+            f'/api/empleado/{self.empleado.id}/pagos/',
+            f'/api/empleado/{self.empleado.id}/abonos/',
+            f'/api/empleado/{self.empleado.id}/prestamos/',
+            f'/api/empleado/{self.empleado.id}/vacacion_tomada/',
+            f'/api/empleado/{self.empleado.id}/tablero/',
+        ]
+
+    def contar_consultas(self):
+        consultas = {}
+        for url in self.urls():
+            with CaptureQueriesContext(connection) as capturadas:
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200, url)
+            consultas[url] = len(capturadas)
+        return consultas
+
+    def test_consultas_no_crecen_con_los_resultados(self):
+        antes = self.contar_consultas()
+        for numero in range(1, 6):
+            crear_empleado_con_historial(numero=numero)
+            crear_empleado_con_historial(self.empleado, numero=numero)
+        despues = self.contar_consultas()
+        self.assertEqual(antes, despues)
+
+
+def explicar(sql):
+    """
+    Devuelve el plan de ejecución de una consulta como texto. En PostgreSQL se
+    desactiva el recorrido secuencial para que solo aparezca si no hay un índice
+    utilizable, ya que con pocos datos el planificador lo prefiere de todos modos.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '\n'.join(str(fila[-1]) for fila in cursor.fetchall())
+
+
+def recorridos_secuenciales(plan, tabla):
+    lineas = plan.splitlines()
+    if connection.vendor == 'postgresql':
+        return [linea for linea in lineas if f'Seq Scan on "{tabla}"' in linea or f'Seq Scan on {tabla}' in linea]
+    return [linea for linea in lineas if linea.strip().startswith(f'SCAN {tabla}')]
+
+
+def ordenamientos(plan):
+    # Pasos que ordenan las filas en lugar de leerlas en el orden de un índice
+    lineas = plan.splitlines()
+    if connection.vendor == 'postgresql':
+        return [linea for linea in lineas if linea.strip().lstrip('->').strip().startswith(('Sort ', 'Incremental Sort '))]
+    return [linea for linea in lineas if 'TEMP B-TREE FOR ORDER BY' in linea]
+
+
+@SIN_CACHE_DE_RESPUESTAS
+class PlanesDeConsultaTest(TestCase):
+    """
+    Las consultas de los endpoints más usados deben resolverse con índices y no
+    recorriendo la tabla completa.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for numero in range(20):
+            empleado = crear_empleado_con_historial(numero=numero)
+            for dias in range(1, 15):
+                if dias != numero:
+                    Asistencia.objects.create(
+                        empleado=empleado, fecha=date.today() - timedelta(days=dias), asistencia=dias % 4 != 0
+                    )
+        cls.empleado = Empleado.objects.order_by('id').last()
+
+    def assertSinRecorridoSecuencial(self, metodo, url, tablas, sin_ordenar=False):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = getattr(self.client, metodo)(url)
+        self.assertLess(respuesta.status_code, 300, url)
+
+        consultas = [
+            consulta['sql'] for consulta in capturadas
+            if consulta['sql'].lstrip().upper().startswith('SELECT')
+            and any(tabla in consulta['sql'] for tabla in tablas)
+        ]
+        self.assertTrue(consultas, f"{url} no consultó {tablas}")
+        for sql in consultas:
+            plan = explicar(sql)
+            for tabla in tablas:
+                self.assertEqual(recorridos_secuenciales(plan, tabla), [], f"{url}\n{sql}\n{plan}")
+            if sin_ordenar:
+                self.assertEqual(ordenamientos(plan), [], f"{url}\n{sql}\n{plan}")
+
+    def test_asistencia_por_fecha(self):
+        fecha = date.today() - timedelta(days=3)
+        self.assertSinRecorridoSecuencial('get', f'/api/asistencias/{fecha}/', ['Servidor_asistencia'])
+
+    def test_asistencias_paginadas(self):
+        respuesta = self.client.get('/api/asistencias/?limite=10')
+        url = f"/api/asistencias/?limite=10&cursor={respuesta.json()['cursor']}"
+        self.assertSinRecorridoSecuencial('get', url, ['Servidor_asistencia'])
+
+    def test_abonos_paginados(self):
+        # El orden (fecha_abono, id) sale del índice, sin ordenar la tabla en cada página
+        cursor = self.client.get('/api/abonos/?limite=5').json()['cursor']
+        self.assertSinRecorridoSecuencial('get', f'/api/abonos/?limite=5&cursor={cursor}', ['Servidor_abono'], sin_ordenar=True)
+        for ruta in ('abonos', 'pagos'):
+            self.assertSinRecorridoSecuencial(
+                'get', f'/api/empleado/{self.empleado.id}/{ruta}/?limite=5&cursor={cursor}',
+                [f'Servidor_{ruta[:-1]}'], sin_ordenar=True
+            )
+
+    def test_pagos_por_fecha(self):
+        fecha = date.today() - timedelta(days=2)
+        self.assertSinRecorridoSecuencial('get', f'/api/pagos/{fecha}/', ['Servidor_pago'])
+
+    def test_rangos_de_fechas(self):
+        desde, hasta = date.today() - timedelta(days=6), date.today() - timedelta(days=2)
+        self.assertSinRecorridoSecuencial('get', f'/api/pagos/por_fecha/?desde={desde}&hasta={hasta}', ['Servidor_pago'])
+        self.assertSinRecorridoSecuencial('get', f'/api/asistencias/por_fecha/?desde={desde}&hasta={hasta}', ['Servidor_asistencia'])
+
+    def test_registrar_pago(self):
+        fecha_inicio, fecha_fin = periodo_de_pago(date.today())
+        self.assertTrue(Asistencia.objects.filter(empleado=self.empleado, fecha__range=(fecha_inicio, fecha_fin)).exists())
+        self.assertSinRecorridoSecuencial(
+            'post', f'/api/empleado/{self.empleado.id}/registrar_pago/',
+            ['Servidor_resumenasistenciasemanal', 'Servidor_prestamo', 'Servidor_salario', 'Servidor_pago']
+        )
+
+
+class CacheRespuestasTest(TestCase):
+    """
+    Las respuestas por fecha se sirven desde caché y un cambio solo invalida la
+    fecha afectada.
+    """
+
+    def setUp(self):
+        caches['respuestas'].clear()
+        self.empleado = crear_empleado_con_historial(numero=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_empleado_con_historial(self.empleado, numero=1)
+        self.hoy = date.today()
+        self.ayer = self.hoy - timedelta(days=1)
+
+    def consultas(self, url):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(capturadas), respuesta.json()
+
+    def test_cambio_invalida_solo_su_fecha(self):
+        url_hoy, url_ayer = f'/api/pagos/{self.hoy}/', f'/api/pagos/{self.ayer}/'
+        self.assertGreater(self.consultas(url_hoy)[0], 1)
+        self.assertGreater(self.consultas(url_ayer)[0], 1)
+        # Una respuesta en caché solo lee las versiones
+        self.assertEqual(self.consultas(url_hoy)[0], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pago.objects.create(empleado=self.empleado, monto_a_pagar=Decimal('10.00'), fecha_pago=self.ayer, detalle={})
+
+        self.assertEqual(self.consultas(url_hoy)[0], 1)
+        consultas, datos = self.consultas(url_ayer)
+        self.assertGreater(consultas, 1)
+        self.assertEqual(len(datos['pagos']), 2)
+
+    def test_consultar_no_escribe_versiones(self):
+        antes = VersionDeCache.objects.count()
+        for fecha in ('1999-01-01', '1999-01-02', '2001-05-05'):
+            self.assertEqual(self.client.get(f'/api/pagos/{fecha}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/empleado/{self.empleado.id + 100}/pagos/').status_code, 404)
+        self.assertEqual(VersionDeCache.objects.count(), antes)
+
+    def test_versiones_en_cache_compartido(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(CACHES={
+            **settings.CACHES,
+            'respuestas': {'BACKEND': 'Servidor.cache_respuestas.CacheArchivosLRU', 'LOCATION': directorio},
+        }):
+            url = f'/api/pagos/{self.ayer}/'
+            self.assertGreater(self.consultas(url)[0], 0)
+            # Las versiones están en el mismo caché: un acierto no consulta la base de datos
+            self.assertEqual(self.consultas(url)[0], 0)
+            antes = VersionDeCache.objects.count()
+            with self.captureOnCommitCallbacks(execute=True):
+                Pago.objects.create(empleado=self.empleado, monto_a_pagar=Decimal('10.00'), fecha_pago=self.ayer, detalle={})
+            consultas, datos = self.consultas(url)
+            self.assertGreater(consultas, 0)
+            self.assertEqual(len(datos['pagos']), 2)
+            self.assertEqual(VersionDeCache.objects.count(), antes)
+
+    def test_mover_registro_invalida_fecha_anterior(self):
+        url_ayer = f'/api/asistencias/{self.ayer}/'
+        self.assertEqual(len(self.consultas(url_ayer)[1]), 1)
+        asistencia = Asistencia.objects.get(empleado=self.empleado, fecha=self.ayer)
+        with self.captureOnCommitCallbacks(execute=True):
+            asistencia.fecha = self.hoy - timedelta(days=30)
+            asistencia.save()
+        self.assertEqual(self.consultas(url_ayer)[1], [])
+
+    def test_estadisticas(self):
+        url = f'/api/empleado/{self.empleado.id}/pagos/'
+        self.consultas(url)
+        self.consultas(url)
+        estadisticas = self.client.get('/api/cache/estadisticas/').json()
+        self.assertEqual((estadisticas['aciertos'], estadisticas['fallos']), (1, 1))
+
+
+class PeticionesCondicionalesTest(TestCase):
+    """
+    Las listas responden 304 mientras no cambien sus registros ni los datos
+    relacionados que muestran.
+    """
+
+    def setUp(self):
+        self.empleado = crear_empleado_con_historial(numero=0)
+
+    def test_no_modificado(self):
+        respuesta = self.client.get('/api/pagos/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Last-Modified', respuesta.headers)
+
+        respuesta = self.client.get('/api/pagos/', HTTP_IF_NONE_MATCH=respuesta.headers['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_borrar_un_registro_anterior(self):
+        crear_empleado_con_historial(self.empleado, numero=1)
+        etag = self.client.get('/api/pagos/').headers['ETag']
+        # Borrar el pago más antiguo no cambia Max(updated_at), pero sí el conteo
+        Pago.objects.order_by('updated_at').first().delete()
+        self.assertEqual(self.client.get('/api/pagos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # Sin ETag no hay validador: If-Modified-Since solo no produce 304
+        self.assertEqual(self.client.get('/api/pagos/', HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 2099 00:00:00 GMT').status_code, 200)
+
+    def test_cambio_en_relacion_cambia_etag(self):
+        url = f'/api/empleado/{self.empleado.id}/abonos/'
+        etag = self.client.get(url).headers['ETag']
+
+        self.empleado.nombre = "Otro nombre"
+        self.empleado.save()
+
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta.headers['ETag'], etag)
+
+        otro = crear_empleado_con_historial(numero=1)
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta.headers['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertNotEqual(self.client.get(f'/api/empleado/{otro.id}/abonos/').headers['ETag'], etag)
+
+
+class ExportarPagosTest(TestCase):
+    """
+    La exportación en CSV filtra por fecha y aplana el desglose del pago.
+    """
+
+    def test_exportar_con_rango(self):
+        empleado = crear_empleado_con_historial(numero=0)
+        crear_empleado_con_historial(empleado, numero=3)
+        Pago.objects.filter(empleado=empleado, fecha_pago=date.today()).update(detalle={
+            "faltas": {"dias_faltados": 1, "descuento": "300"},
+            "prestamos": [], "total_abonos": "100", "sueldo_base": "1800", "total_pagado": "1400",
+        })
+
+        respuesta = self.client.get(f'/api/pagos/exportar/?desde={date.today() - timedelta(days=1)}')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+
+        self.assertEqual(lineas[0].split(','), [
+            'id', 'empleado', 'nombre_empleado', 'fecha_pago', 'semana', 'monto_a_pagar',
+            'dias_faltados', 'descuento', 'total_abonos', 'sueldo_base', 'total_pagado',
+        ])
+        self.assertEqual(len(lineas), 2)
+        self.assertTrue(lineas[1].endswith(f',{date.today()},,1700.00,1,300,100,1800,1400'))
+
+        self.assertEqual(self.client.get('/api/pagos/exportar/?hasta=ayer').status_code, 400)
+
+
+class LecturaRapidaTest(TestCase):
+    """
+    La lectura desde .values() produce exactamente el mismo JSON que los
+    serializers de DRF.
+    """
+
+    def test_misma_salida_que_el_serializer(self):
+        for numero in range(3):
+            crear_empleado_con_historial(numero=numero)
+        empleado = Empleado.objects.first()
+        Pago.objects.create(
+            empleado=empleado, monto_a_pagar=Decimal('1533.33'), fecha_pago=date.today(), semana=date.today(),
+            detalle={"faltas": {"dias_faltados": 1, "descuento": "266.666"}, "prestamos": [], "total_pagado": "1533.33"}
+        )
+        Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('0.10'))
+
+        for modelo, serializer_class in [
+            (Empleado, serializers.EmpleadoSerializer), (Asistencia, serializers.AsistenciaSerializer),
+            (Vacacion, serializers.VacacionSerializer), (VacacionTomada, serializers.VacacionTomadaSerializer),
+            (Salario, serializers.SalarioSerializer), (Prestamo, serializers.PrestamoSerializer),
+            (Abono, serializers.AbonoSerializer), (Pago, serializers.PagoSerializer),
+            (ResumenAsistenciaSemanal, serializers.ResumenAsistenciaSemanalSerializer),
+        ]:
+            queryset = modelo.objects.order_by('id')
+            self.assertIsNotNone(serializers.campos_de_lectura(serializer_class), serializer_class)
+            esperado = JSONRenderer().render(serializer_class(queryset, many=True).data)
+            obtenido = JSONRenderer().render(serializers.serializar_lista(queryset, serializer_class))
+            self.assertEqual(obtenido, esperado, serializer_class)
+
+
+class MedirRendimientoTest(TestCase):
+    """
+    El sembrado de datos sintéticos y la medición cubren todas las rutas de la API.
+    """
+
+    def test_mide_todas_las_rutas(self):
+        from .urls import urlpatterns
+
+        call_command('sembrar_datos', empleados=5, semanas=2, stdout=open(os.devnull, 'w'))
+        self.assertEqual(Empleado.objects.count(), 5)
+        self.assertTrue(Pago.objects.exists())
+        # Con dos semanas puede no haber abonos todavía; todas las rutas deben tener datos
+        crear_empleado_con_historial(numero=1)
+        pagos_antes = Pago.objects.count()
+
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'rendimiento.json')
+            call_command('medir_rendimiento', repeticiones=2, salida=salida, stdout=open(os.devnull, 'w'))
+            with open(salida) as archivo:
+                resultado = json.load(archivo)
+
+        self.assertEqual(set(resultado['rutas']), {patron.name for patron in urlpatterns})
+        for nombre, ruta in resultado['rutas'].items():
+            self.assertLess(ruta['estado'], 300, nombre)
+        # Las escrituras medidas se revierten
+        self.assertEqual(Pago.objects.count(), pagos_antes)
+
+
+class SembrarDatosTest(TestCase):
+    """
+    Los pagos sembrados son los que calcularía la nómina con los mismos datos,
+    y sembrar más empleados no recalcula el resumen semanal de los existentes.
+    """
+
+    def sembrar(self, empleados, **opciones):
+        call_command('sembrar_datos', empleados=empleados, semanas=2, hasta='2026-10-15', stdout=io.StringIO(), **opciones)
+
+    def test_pagos_como_la_nomina(self):
+        self.sembrar(6, prestamos=0)
+        fecha_pago = date(2026, 10, 6)
+        calculos, sin_salario = calcular_nomina(fecha_pago)
+        self.assertEqual(sin_salario, [])
+        self.assertTrue(any(calculo['detalle']['faltas']['dias_faltados'] for calculo in calculos))
+        self.assertEqual(
+            {pago.empleado_id: (pago.monto_a_pagar, pago.detalle) for pago in Pago.objects.filter(fecha_pago=fecha_pago)},
+            {
+                calculo['empleado_id']: (calculo['monto_a_pagar'].quantize(Decimal('0.01')), calculo['detalle'])
+                for calculo in calculos
+            }
+        )
+
+    def test_abonos_con_las_reglas_de_la_nomina(self):
+        self.sembrar(20, prestamos=3)
+        self.assertTrue(Abono.objects.exists())
+        for prestamo in Prestamo.objects.filter(abono__isnull=False).distinct():
+            deuda, estatus = prestamo.monto_prestamo, True
+            for abono in prestamo.abono_set.order_by('fecha_abono'):
+                esperado, deuda, estatus = aplicar_abono(deuda, prestamo.abono_semanal)
+                self.assertEqual((abono.monto_abono, abono.deuda_restante), (esperado, deuda))
+            self.assertEqual((prestamo.deuda_restante, prestamo.estatus), (deuda, estatus))
+
+    def test_no_recalcula_los_resumenes_existentes(self):
+        self.sembrar(3)
+        antes = dict(ResumenAsistenciaSemanal.objects.values_list('id', 'updated_at'))
+        self.sembrar(2, semilla=2)
+        nuevos = set(ResumenAsistenciaSemanal.objects.exclude(id__in=antes).values_list('empleado_id', flat=True))
+        self.assertEqual(nuevos, set(Empleado.objects.order_by('-id').values_list('id', flat=True)[:2]))
+        self.assertEqual(dict(ResumenAsistenciaSemanal.objects.filter(id__in=antes).values_list('id', 'updated_at')), antes)
+        self.assertEqual(
+            sum(ResumenAsistenciaSemanal.objects.values_list('dias_presentes', flat=True)),
+            Asistencia.objects.filter(asistencia=True).count()
+        )
+
+
+class InstrumentacionTest(TestCase):
+    """
+    Cada respuesta trae Server-Timing y las peticiones lentas se registran con
+    sus consultas más lentas.
+    """
+
+    def setUp(self):
+        crear_empleado_con_historial(numero=0)
+
+    def test_cabecera_server_timing(self):
+        respuesta = self.client.get('/api/pagos/')
+        metricas = {parte.split(';')[0].strip() for parte in respuesta.headers['Server-Timing'].split(',')}
+        self.assertEqual(metricas, {'db', 'ser', 'app', 'total'})
+        self.assertRegex(respuesta.headers['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+
+    @override_settings(INSTRUMENTACION_UMBRAL_LENTO_MS=0, INSTRUMENTACION_CONSULTAS_TOP=2)
+    def test_registro_de_peticion_lenta(self):
+        with self.assertLogs('Servidor.instrumentacion', level='WARNING') as registros:
+            self.client.get('/api/asistencias/')
+        registro = registros.records[0].peticion_lenta
+        self.assertEqual((registro['ruta'], registro['estado']), ('/api/asistencias/', 200))
+        self.assertGreaterEqual(registro['consultas'], 2)
+        self.assertEqual(len(registro['consultas_mas_lentas']), 2)
+
+    async def test_asgi_sin_adaptacion(self):
+        async def vista(request):
+            pass
+        self.assertTrue(iscoroutinefunction(InstrumentacionMiddleware(vista)))
+
+        respuesta = await self.async_client.get('/api/pagos/')
+        self.assertRegex(respuesta.headers['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+
+    @override_settings(INSTRUMENTACION_UMBRAL_LENTO_MS=0)
+    def test_respuesta_en_streaming(self):
+        respuesta = self.client.get('/api/pagos/exportar/')
+        self.assertNotIn('Server-Timing', respuesta.headers)
+        # Las consultas de la exportación se ejecutan mientras se envía el contenido
+        with self.assertLogs('Servidor.instrumentacion', level='WARNING') as registros:
+            contenido = b''.join(respuesta.streaming_content)
+        self.assertIn(b'Empleado 0', contenido)
+        self.assertGreaterEqual(registros.records[0].peticion_lenta['consultas'], 1)
+
+    @override_settings(INSTRUMENTACION_ACTIVA=False)
+    def test_se_puede_apagar(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/pagos/').headers)
+
+
+class ProyeccionPrestamosTest(TestCase):
+    """
+    La proyección cerrada coincide con aplicar la nómina semana por semana.
+    """
+
+    def test_coincide_con_la_nomina_semanal(self):
+        hoy = date(2026, 10, 15)
+        casos = [('1000.00', '100.00'), ('1000.00', '300.00'), ('50.00', '100.00'), ('0.00', '100.00'), ('999.99', '333.33')]
+        pagado, sin_salario = Empleado.objects.bulk_create([
+            Empleado(nombre="Pagado", telefono="1", fecha_entrada=hoy),
+            Empleado(nombre="Sin salario", telefono="2", fecha_entrada=hoy),
+        ])
+        empleados = []
+        for numero, (deuda, abono) in enumerate(casos):
+            empleado = pagado if numero == 0 else Empleado.objects.create(nombre=f"E{numero}", telefono="3", fecha_entrada=hoy)
+            Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('2000.00'))
+            Prestamo.objects.create(
+                empleado=empleado, monto_prestamo=Decimal('1000.00'), deuda_restante=Decimal(deuda),
+                abono_semanal=Decimal(abono), razon="r", fecha_prestamo=hoy
+            )
+            empleados.append(empleado)
+        Prestamo.objects.create(
+            empleado=sin_salario, monto_prestamo=Decimal('500.00'), abono_semanal=Decimal('100.00'), razon="r", fecha_prestamo=hoy
+        )
+        primera_fecha = proxima_fecha_de_pago(hoy)
+        Pago.objects.create(empleado=pagado, monto_a_pagar=Decimal(1), fecha_pago=primera_fecha, semana=semana_de_pago(primera_fecha), detalle={})
+
+        semanas = 6
+        proyeccion = proyectar_prestamos(semanas, fecha=hoy)
+
+        esperado_calendario = [Decimal(0)] * semanas
+        for prestamo in Prestamo.objects.filter(empleado__in=empleados).order_by('id'):
+            semana = 1 if prestamo.empleado_id == pagado.id else 0
+            deuda, estatus, numero, ultimo = prestamo.deuda_restante, True, 0, None
+            while estatus:
+                ultimo, deuda, estatus = aplicar_abono(deuda, prestamo.abono_semanal)
+                if semana < semanas:
+                    esperado_calendario[semana] += ultimo
+                numero += 1
+                semana += 1
+            fila = next(fila for fila in proyeccion['prestamos'] if fila['prestamo_id'] == prestamo.id)
+            self.assertEqual((fila['abonos_restantes'], Decimal(fila['ultimo_abono'])), (numero, ultimo))
+            self.assertEqual(fila['fecha_liquidacion'], (primera_fecha + timedelta(weeks=semana - 1)).isoformat())
+
+        self.assertEqual([Decimal(semana['total_abonos']) for semana in proyeccion['calendario']], esperado_calendario)
+        fila = next(fila for fila in proyeccion['prestamos'] if fila['empleado'] == sin_salario.id)
+        self.assertEqual((fila['sin_salario'], fila['fecha_liquidacion']), (True, None))
+
+        self.assertEqual(self.client.get('/api/prestamos/proyeccion/?semanas=4').status_code, 200)
+        self.assertEqual(self.client.get('/api/prestamos/proyeccion/?semanas=0').status_code, 400)
+
+
+class TableroEmpleadoTest(TestCase):
+    """
+    El tablero reúne los datos del empleado con un número fijo de consultas.
+    """
+
+    def test_tablero(self):
+        empleado = crear_empleado_con_historial(numero=0)
+        for numero in range(1, 8):
+            crear_empleado_con_historial(empleado, numero=numero)
+        Prestamo.objects.filter(empleado=empleado).exclude(id=Prestamo.objects.filter(empleado=empleado).first().id).update(estatus=False)
+        ultimo_salario = Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('2500.00'))
+
+        with CaptureQueriesContext(connection) as capturadas:
+            datos = self.client.get(f'/api/empleado/{empleado.id}/tablero/?pagos=3').json()
+        self.assertEqual(len(capturadas), 6)
+
+        self.assertEqual(datos['empleado']['id'], empleado.id)
+        self.assertEqual(datos['salario']['id'], ultimo_salario.id)
+        self.assertEqual(len(datos['prestamos_activos']), 1)
+        self.assertEqual(datos['deuda_total'], datos['prestamos_activos'][0]['deuda_restante'])
+        self.assertEqual(datos['vacaciones']['dias_restantes'], 5)
+        self.assertEqual([pago['fecha_pago'] for pago in datos['pagos']], [str(date.today() - timedelta(days=n)) for n in range(3)])
+        semana = date.today() - timedelta(days=date.today().weekday())
+        self.assertEqual(
+            [asistencia['fecha'] for asistencia in datos['asistencia_semana']['asistencias']],
+            [str(semana + timedelta(days=n)) for n in range(date.today().weekday() + 1)]
+        )
+
+        self.assertEqual(self.client.get(f'/api/empleado/{empleado.id + 1}/tablero/').status_code, 404)
+
+
+class SalarioVigenteTest(TransactionTestCase):
+    """
+    Cada pago usa el salario vigente en su fecha, y los sueldos se consultan una
+    vez por proceso hasta que cambia la versión compartida en la base de datos.
+    Es TransactionTestCase porque lo leído dentro de una transacción no se
+    guarda en memoria.
+    """
+
+    def test_salario_vigente_en_memoria(self):
+        uno, dos, sin_salario = [
+            Empleado.objects.create(nombre=f"Empleado {numero}", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+            for numero in range(3)
+        ]
+        Salario.objects.create(empleado=uno, sueldo_semanal=Decimal('1000.00'), vigente_desde=date(2026, 1, 1))
+        Salario.objects.create(empleado=uno, sueldo_semanal=Decimal('1200.00'), vigente_desde=date(2026, 3, 1))
+        Salario.objects.create(empleado=dos, sueldo_semanal=Decimal('1500.00'), vigente_desde=date(2026, 2, 1))
+        ids = [uno.id, dos.id, sin_salario.id]
+
+        self.assertEqual(sueldos_vigentes(ids, date(2026, 1, 15)), {uno.id: Decimal('1000.00')})
+        self.assertEqual(sueldos_vigentes(ids, date(2026, 2, 15)), {uno.id: Decimal('1000.00'), dos.id: Decimal('1500.00')})
+        self.assertEqual(sueldos_vigentes(ids, date(2026, 3, 10)), {uno.id: Decimal('1200.00'), dos.id: Decimal('1500.00')})
+        # Solo se lee la versión
+        with self.assertNumQueries(1):
+            self.assertEqual(sueldos_vigentes(ids, date(2026, 3, 10)), {uno.id: Decimal('1200.00'), dos.id: Decimal('1500.00')})
+
+        # Una semana pasada se paga con el salario de entonces
+        calculos, sin_salario_ids = calcular_nomina(date(2026, 2, 17), empleado_ids=ids)
+        self.assertEqual([calculo['detalle']['sueldo_base'] for calculo in calculos], ['1000.00', '1500.00'])
+        self.assertEqual(sin_salario_ids, [sin_salario.id])
+
+        # Guardar un salario descarta los sueldos en memoria
+        Salario.objects.create(empleado=sin_salario, sueldo_semanal=Decimal('1800.00'), vigente_desde=date(2026, 1, 1))
+        with self.assertNumQueries(2):
+            self.assertEqual(sueldos_vigentes(ids, date(2026, 3, 10))[sin_salario.id], Decimal('1800.00'))
+
+        # Otro worker: cambia el salario y la versión en la base de datos, sin pasar por este proceso
+        Salario.objects.filter(empleado=sin_salario).update(sueldo_semanal=Decimal('1900.00'))
+        self.assertEqual(sueldos_vigentes(ids, date(2026, 3, 10))[sin_salario.id], Decimal('1800.00'))
+        versiones.incrementar([CLAVE_VERSION_SALARIOS])
+        self.assertEqual(sueldos_vigentes(ids, date(2026, 3, 10))[sin_salario.id], Decimal('1900.00'))
+
+    def test_la_nomina_guarda_los_sueldos_en_memoria(self):
+        empleado = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('1000.00'), vigente_desde=date(2026, 1, 1))
+        # registrar_pago calcula dentro de una transacción, pero lee los sueldos antes de abrirla
+        self.assertEqual(self.client.post(f'/api/empleado/{empleado.id}/registrar_pago/').status_code, 201)
+        with self.assertNumQueries(1):
+            self.assertEqual(sueldos_vigentes([empleado.id], date.today()), {empleado.id: Decimal('1000.00')})
+
+
+class SaldoVacacionesTest(TestCase):
+    """
+    El saldo de vacaciones se ajusta con cada alta, edición o baja de
+    VacacionTomada, se rechazan las solicitudes que se traslapan y el comando
+    de reconstrucción llega al mismo saldo.
+    """
+
+    def setUp(self):
+        self.empleado = Empleado.objects.create(nombre="Empleado", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        self.otro = Empleado.objects.create(nombre="Otro", telefono="5550001", fecha_entrada=date(2026, 1, 1))
+        Vacacion.objects.create(empleado=self.otro, dias_restantes=10)
+        self.vacacion = Vacacion.objects.create(empleado=self.empleado, dias_restantes=12)
+
+    def saldo(self, empleado):
+        return Vacacion.objects.filter(empleado=empleado).order_by('-id').values_list('dias_restantes', flat=True).first()
+
+    def solicitar(self, fecha_inicio, fecha_fin, dias):
+        return self.client.post('/api/vacaciones_tomadas/', {
+            "empleado": self.empleado.id, "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin, "dias_tomados": dias
+        }, content_type='application/json')
+
+    def test_saldo_y_traslapes(self):
+        self.assertEqual(self.vacacion.dias_asignados, 12)
+        primera = self.solicitar('2026-03-02', '2026-03-04', 3)
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(self.saldo(self.empleado), 9)
+
+        self.assertEqual(self.solicitar('2026-03-04', '2026-03-06', 3).status_code, 400)
+        self.assertEqual(self.solicitar('2026-03-10', '2026-03-09', 1).status_code, 400)
+        # Un cuerpo que no es un objeto es un error de validación, no un 500
+        lista = self.client.post('/api/vacaciones_tomadas/', [self.empleado.id], content_type='application/json')
+        self.assertEqual(lista.status_code, 400)
+        self.assertEqual(self.solicitar('2026-03-05', '2026-03-06', 2).status_code, 201)
+        self.assertEqual(self.saldo(self.empleado), 7)
+
+        # Editar los días aplica la diferencia; cambiar de empleado devuelve los días
+        url = f"/api/vacaciones_tomadas/{primera.json()['id']}/"
+        datos = {"empleado": self.empleado.id, "fecha_inicio": '2026-03-02', "fecha_fin": '2026-03-04', "dias_tomados": 1}
+        self.assertEqual(self.client.put(url, datos, content_type='application/json').status_code, 200)
+        self.assertEqual(self.saldo(self.empleado), 9)
+        self.assertEqual(self.client.put(url, [datos], content_type='application/json').status_code, 400)
+        datos['empleado'] = self.otro.id
+        self.assertEqual(self.client.put(url, datos, content_type='application/json').status_code, 200)
+        self.assertEqual((self.saldo(self.empleado), self.saldo(self.otro)), (10, 9))
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.saldo(self.otro), 10)
+
+        Vacacion.objects.filter(empleado=self.empleado).update(dias_restantes=0)
+        with CaptureQueriesContext(connection) as capturadas:
+            call_command('reconstruir_saldos_vacaciones', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(capturadas), 1)
+        self.assertEqual((self.saldo(self.empleado), self.saldo(self.otro)), (10, 10))
+
+    def test_traslapes_con_indice(self):
+        for semana in range(20):
+            inicio = date(2026, 1, 5) + timedelta(weeks=semana)
+            VacacionTomada.objects.create(empleado=self.empleado, fecha_inicio=inicio, fecha_fin=inicio + timedelta(days=1), dias_tomados=2)
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertTrue(vacaciones_que_se_traslapan(self.empleado.id, date(2026, 1, 6), date(2026, 1, 8)).exists())
+        plan = explicar(capturadas[0]['sql'])
+        self.assertEqual(recorridos_secuenciales(plan, 'Servidor_vacaciontomada'), [], plan)
+
+
+class MatrizAsistenciaTest(TestCase):
+    """
+    La matriz de asistencias entrega un mapa de bits por empleado con una sola
+    consulta.
+    """
+
+    def test_matriz(self):
+        empleado = Empleado.objects.create(nombre="Empleado", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        sin_registros = Empleado.objects.create(nombre="Sin registros", telefono="5550001", fecha_entrada=date(2026, 1, 1))
+        for dia, asistencia in ((1, True), (2, False), (4, True), (10, True)):
+            Asistencia.objects.create(empleado=empleado, fecha=date(2026, 3, dia), asistencia=asistencia)
+
+        with CaptureQueriesContext(connection) as capturadas:
+            datos = self.client.get('/api/asistencias/matriz/?desde=2026-03-01&hasta=2026-03-09').json()
+        self.assertEqual(len(capturadas), 1)
+        self.assertEqual(datos['dias'], 9)
+        self.assertEqual(datos['empleados'], [
+            {"empleado": empleado.id, "nombre_empleado": "Empleado", "presentes": "100100000", "ausentes": "010000000"},
+            {"empleado": sin_registros.id, "nombre_empleado": "Sin registros", "presentes": "000000000", "ausentes": "000000000"},
+        ])
+
+        # Sin ?hasta= llega al fin del mes; en base64 el día i es el bit i % 8 del byte i // 8
+        datos = self.client.get(f'/api/asistencias/matriz/?desde=2026-03-01&empleado={empleado.id}&formato=base64').json()
+        self.assertEqual((datos['hasta'], datos['dias'], len(datos['empleados'])), ('2026-03-31', 31, 1))
+        presentes = int.from_bytes(base64.b64decode(datos['empleados'][0]['presentes']), 'little')
+        self.assertEqual(presentes, 1 << 0 | 1 << 3 | 1 << 9)
+
+        self.assertEqual(self.client.get('/api/asistencias/matriz/?desde=2026-03-09&hasta=2026-03-01').status_code, 400)
+        self.assertEqual(self.client.get('/api/asistencias/matriz/?formato=csv').status_code, 400)
+
+
+class MapasDeAsistenciaTest(TestCase):
+    """
+    Los mapas de bits del resumen semanal se escriben junto con cada Asistencia
+    y las faltas de la nómina calculadas con ellos coinciden con las de los
+    registros diarios.
+    """
+
+    def test_mapas_y_faltas(self):
+        empleado = Empleado.objects.create(nombre="Empleado", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('1200.00'), vigente_desde=date(2026, 1, 1))
+        # Semana del lunes 2 de marzo y lunes 9 de marzo de 2026
+        for dia, asistencia in ((3, False), (4, False), (5, True), (6, False), (9, False), (10, False)):
+            Asistencia.objects.create(empleado=empleado, fecha=date(2026, 3, dia), asistencia=asistencia)
+
+        resumen = ResumenAsistenciaSemanal.objects.get(empleado=empleado, semana=date(2026, 3, 2))
+        self.assertEqual((resumen.registrados, resumen.presentes), (0b0011110, 0b0001000))
+
+        asistencia = Asistencia.objects.get(empleado=empleado, fecha=date(2026, 3, 4))
+        asistencia.asistencia = True
+        asistencia.save()
+        Asistencia.objects.get(empleado=empleado, fecha=date(2026, 3, 6)).delete()
+        resumen.refresh_from_db()
+        self.assertEqual((resumen.registrados, resumen.presentes), (0b0001110, 0b0001100))
+
+        # Periodo del pago del martes 10: miércoles 4 a lunes 9, sin martes
+        calculos, _ = calcular_nomina(date(2026, 3, 10), empleado_ids=[empleado.id])
+        with self.settings(ASISTENCIA_FALTAS_DESDE_MAPAS=False):
+            en_registros, _ = calcular_nomina(date(2026, 3, 10), empleado_ids=[empleado.id])
+        self.assertEqual(calculos, en_registros)
+        self.assertEqual(calculos[0]['detalle']['faltas']['dias_faltados'], 1)
+
+
+@SIN_CACHE_DE_RESPUESTAS
+class RangoDeFechasTest(TestCase):
+    """
+    Las consultas por rango de fechas devuelven los registros agrupados por
+    fecha con una sola consulta.
+    """
+
+    def test_pagos_y_asistencias_por_rango(self):
+        empleados = [crear_empleado_con_historial(numero=numero) for numero in range(4)]
+        hoy = date.today()
+        desde, hasta = hoy - timedelta(days=2), hoy
+
+        with CaptureQueriesContext(connection) as capturadas:
+            datos = self.client.get(f'/api/pagos/por_fecha/?desde={desde}&hasta={hasta}').json()
+        self.assertEqual(len(capturadas), 1)
+        self.assertEqual([grupo['fecha'] for grupo in datos['fechas']], [str(hoy - timedelta(days=n)) for n in (2, 1, 0)])
+        for grupo in datos['fechas']:
+            self.assertEqual(grupo, self.client.get(f"/api/pagos/{grupo['fecha']}/").json())
+
+        datos = self.client.get(f'/api/asistencias/por_fecha/?desde={desde}&hasta={hasta}&empleado={empleados[1].id}').json()
+        self.assertEqual(datos['fechas'], [
+            {"fecha": str(hoy - timedelta(days=1)), "asistencias": self.client.get(f'/api/asistencias/{hoy - timedelta(days=1)}/').json()}
+        ])
+
+        datos = self.client.get(f'/api/asistencias/por_fecha/?desde={hoy}').json()
+        self.assertEqual((datos['hasta'], len(datos['fechas'])), (str(hoy), 1))
+        self.assertEqual(self.client.get('/api/pagos/por_fecha/').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/pagos/por_fecha/?desde={hoy}&hasta={desde}').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/asistencias/por_fecha/?desde={hoy}&empleado=x').status_code, 400)
+
+
+class ReporteNominaTest(TestCase):
+    """
+    El reporte de nómina suma los pagos en la base de datos por semana o mes,
+    guarda los periodos cerrados y solo recalcula el abierto o los que cambian.
+    """
+
+    def setUp(self):
+        caches['respuestas'].clear()
+        self.uno = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        self.dos = Empleado.objects.create(nombre="Dos", telefono="5550001", fecha_entrada=date(2026, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            for empleado, fecha, faltas, abonos in (
+                (self.uno, date(2026, 3, 3), 1, '100.00'), (self.dos, date(2026, 3, 3), 0, '0'),
+                (self.uno, date(2026, 3, 10), 0, '100.00'), (self.uno, date(2026, 4, 7), 2, '0'),
+            ):
+                descuento = faltas * (Decimal('1200.00') / Decimal(6))
+                Pago.objects.create(
+                    empleado=empleado, fecha_pago=fecha, monto_a_pagar=Decimal('1200.00') - descuento - Decimal(abonos),
+                    detalle={
+                        "faltas": {"dias_faltados": faltas, "descuento": str(descuento)},
+                        "prestamos": [], "total_abonos": abonos, "sueldo_base": "1200.00",
+                        "total_pagado": str(Decimal('1200.00') - descuento - Decimal(abonos)),
+                    },
+                )
+            Pago.objects.create(empleado=self.dos, fecha_pago=date(2026, 3, 12), monto_a_pagar=Decimal('50.00'), detalle={})
+
+    def test_totales_por_semana_y_mes(self):
+        reporte = reporte_de_nomina('semana', date(2026, 3, 2), date(2026, 3, 15), hoy=date(2026, 3, 11), por_empleado=True)
+        primera, segunda = reporte['periodos']
+        self.assertEqual((primera['inicio'], primera['cerrado'], segunda['cerrado']), ('2026-03-02', True, False))
+        self.assertEqual(primera['totales'], {
+            "pagos": 2, "dias_faltados": 1, "sueldo_base": "2400.00", "descuento_faltas": "200.00",
+            "abonos_prestamos": "100.00", "total_pagado": "2100.00",
+        })
+        self.assertEqual([fila['nombre_empleado'] for fila in primera['empleados']], ['Uno', 'Dos'])
+        self.assertEqual(primera['empleados'][0]['total_pagado'], '900.00')
+        # Un pago sin desglose solo suma a pagos y total pagado
+        self.assertEqual(
+            (segunda['totales']['pagos'], segunda['totales']['sueldo_base'], segunda['totales']['total_pagado']),
+            (2, '1200.00', '1150.00')
+        )
+
+        datos = self.client.get('/api/pagos/reporte/?periodo=mes&desde=2026-03-01&hasta=2026-04-30').json()
+        self.assertEqual([periodo['totales']['pagos'] for periodo in datos['periodos']], [4, 1])
+        self.assertEqual(datos['periodos'][1]['totales']['descuento_faltas'], '400.00')
+        self.assertEqual(self.client.get('/api/pagos/reporte/?periodo=dia').status_code, 400)
+
+    def test_ultimos_12_periodos_por_defecto(self):
+        for periodo, hasta, primero, ultimo in (
+            ('mes', '2026-10-15', '2025-11-01', '2026-10-01'),
+            ('mes', '2026-03-31', '2025-04-01', '2026-03-01'),
+            ('semana', '2026-10-15', '2026-07-27', '2026-10-12'),
+        ):
+            datos = self.client.get(f'/api/pagos/reporte/?periodo={periodo}&hasta={hasta}').json()
+            inicios = [fila['inicio'] for fila in datos['periodos']]
+            self.assertEqual((len(inicios), inicios[0], inicios[-1]), (12, primero, ultimo), periodo)
+
+    def test_periodos_cerrados_en_cache(self):
+        consultar = lambda: reporte_de_nomina('semana', date(2026, 3, 2), date(2026, 3, 15), hoy=date(2026, 3, 11))
+        primero = consultar()
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(consultar(), primero)
+        # Se leen las versiones y solo se recalcula la semana abierta
+        self.assertEqual(len(capturadas), 2)
+        self.assertIn(str(date(2026, 3, 9)), capturadas[1]['sql'])
+        self.assertNotIn(str(date(2026, 3, 2)), capturadas[1]['sql'])
+
+        # Corregir un pago de una semana cerrada la vuelve a calcular
+        with self.captureOnCommitCallbacks(execute=True):
+            Pago.objects.filter(empleado=self.dos, fecha_pago=date(2026, 3, 3)).get().delete()
+        self.assertEqual(consultar()['periodos'][0]['totales']['pagos'], 1)
+
+    def test_version_compartida_y_nombres_al_consultar(self):
+        consultar = lambda: reporte_de_nomina('semana', date(2026, 3, 2), date(2026, 3, 8), hoy=date(2026, 3, 11), por_empleado=True)
+        self.assertEqual([fila['nombre_empleado'] for fila in consultar()['periodos'][0]['empleados']], ['Uno', 'Dos'])
+
+        # Otro worker: borra un pago y cambia la versión de su semana en la base de datos
+        Pago.objects.filter(empleado=self.dos, fecha_pago=date(2026, 3, 3)).delete()
+        self.assertEqual(consultar()['periodos'][0]['totales']['pagos'], 2)
+        versiones.incrementar([reportes.clave_de_version(date(2026, 3, 2))])
+        self.assertEqual(consultar()['periodos'][0]['totales']['pagos'], 1)
+
+        # El nombre no se guarda con los totales: renombrar se ve aunque no cambie ninguna versión
+        Empleado.objects.filter(id=self.uno.id).update(nombre="Uno renombrado")
+        with self.assertNumQueries(2):
+            periodo = consultar()['periodos'][0]
+        self.assertEqual([fila['nombre_empleado'] for fila in periodo['empleados']], ['Uno renombrado'])
+        self.assertEqual(periodo['empleados'][0]['total_pagado'], '900.00')
+
+
+def nomina_empleado_por_empleado(empleado, fecha_pago):
+    """
+    Pago de un empleado calculado como lo hacía registrar_pago antes de la
+    nómina por lotes: una consulta por empleado y por préstamo, sin escribir.
+    """
+    salario = empleado.salario_set.filter(vigente_desde__lte=fecha_pago).latest('vigente_desde', 'created_at')
+    fecha_inicio, fecha_fin = periodo_de_pago(fecha_pago)
+    faltas = (
+        Asistencia.objects.filter(empleado=empleado, fecha__range=(fecha_inicio, fecha_fin), asistencia=False)
+        .exclude(fecha__week_day=3)
+        .count()
+    )
+    descuento_por_faltas = faltas * (salario.sueldo_semanal / Decimal(6))
+    total_abonos = Decimal(0)
+    detalle_prestamos = []
+    prestamos = {}
+    for prestamo in Prestamo.objects.filter(empleado=empleado, estatus=True).order_by('id'):
+        abono, deuda_restante, estatus = prestamo.abono_semanal, prestamo.deuda_restante, True
+        if deuda_restante <= abono:
+            abono, deuda_restante, estatus = deuda_restante, Decimal(0), False
+        else:
+            deuda_restante -= abono
+        total_abonos += abono
+        prestamos[prestamo.id] = (deuda_restante, estatus, abono)
+        detalle_prestamos.append({
+            "prestamo_id": prestamo.id,
+            "monto_abonado": str(abono),
+            "monto_restante": str(deuda_restante),
+            "razon": prestamo.razon
+        })
+    monto_a_pagar = salario.sueldo_semanal - descuento_por_faltas - total_abonos
+    detalle = {
+        "faltas": {"dias_faltados": faltas, "descuento": str(descuento_por_faltas)},
+        "prestamos": detalle_prestamos,
+        "total_abonos": str(total_abonos),
+        "sueldo_base": str(salario.sueldo_semanal),
+        "total_pagado": str(monto_a_pagar)
+    }
+    return monto_a_pagar, detalle, prestamos
+
+
+def crear_empleados_para_nomina(cantidad, fecha_pago):
+    """
+    Crea empleados con salarios, asistencias y préstamos (uno normal, uno que
+    se salda con un abono recortado y uno ya saldado) para una fecha de pago.
+    """
+    empleados = []
+    for numero in range(cantidad):
+        empleado = Empleado.objects.create(nombre=f"Nómina {numero}", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('1500.00'), vigente_desde=date(2026, 1, 1))
+        Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('1800.00') + numero, vigente_desde=date(2026, 6, 1))
+        # El salario que empieza después de la fecha de pago no aplica
+        Salario.objects.create(empleado=empleado, sueldo_semanal=Decimal('9999.00'), vigente_desde=date(2026, 10, 14))
+        fecha_inicio, fecha_fin = periodo_de_pago(fecha_pago)
+        for dia in range((fecha_fin - fecha_inicio).days + 1):
+            Asistencia.objects.create(
+                empleado=empleado, fecha=fecha_inicio + timedelta(days=dia), asistencia=(dia + numero) % 3 != 0
+            )
+        # Una falta fuera del periodo no se descuenta
+        Asistencia.objects.create(empleado=empleado, fecha=fecha_inicio - timedelta(days=1), asistencia=False)
+        for deuda, abono, estatus in (('1000.00', '150.00', True), ('80.00', '150.00', True), ('500.00', '100.00', False)):
+            Prestamo.objects.create(
+                empleado=empleado, monto_prestamo=Decimal('1000.00'), deuda_restante=Decimal(deuda),
+                abono_semanal=Decimal(abono), razon="Préstamo", fecha_prestamo=date(2026, 1, 1), estatus=estatus
+            )
+        empleados.append(empleado)
+    return empleados
+
+
+class NominaPorLotesTest(TestCase):
+    """
+    La nómina por lotes da los mismos pagos que el cálculo empleado por empleado
+    y hace el mismo número de consultas sin importar cuántos empleados pague.
+    """
+    fecha_pago = date(2026, 10, 13)  # Martes
+
+    def registrar(self, empleados):
+        with transaction.atomic():
+            calculos, sin_salario = calcular_nomina(self.fecha_pago, [empleado.id for empleado in empleados], bloquear=True)
+            registrar_nomina(calculos, self.fecha_pago)
+        return calculos, sin_salario
+
+    def test_igual_que_empleado_por_empleado(self):
+        empleados = crear_empleados_para_nomina(4, self.fecha_pago)
+        sin_salario = Empleado.objects.create(nombre="Sin salario", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        esperados = {empleado.id: nomina_empleado_por_empleado(empleado, self.fecha_pago) for empleado in empleados}
+
+        calculos, faltantes = self.registrar(empleados + [sin_salario])
+        self.assertEqual(faltantes, [sin_salario.id])
+        self.assertEqual(
+            {calculo['empleado_id']: (calculo['monto_a_pagar'], calculo['detalle']) for calculo in calculos},
+            {empleado_id: (monto, detalle) for empleado_id, (monto, detalle, _) in esperados.items()}
+        )
+        # Las faltas cambian de un empleado a otro y el préstamo chico se salda con un abono recortado
+        self.assertEqual(len({esperado[1]['faltas']['dias_faltados'] for esperado in esperados.values()}), 2)
+        for empleado_id, (monto, detalle, prestamos) in esperados.items():
+            pago = Pago.objects.get(empleado_id=empleado_id)
+            self.assertEqual(
+                (pago.monto_a_pagar, pago.detalle, pago.semana),
+                (monto.quantize(Decimal('0.01')), detalle, semana_de_pago(self.fecha_pago))
+            )
+            for prestamo in Prestamo.objects.filter(empleado_id=empleado_id, id__in=prestamos):
+                deuda_restante, estatus, abono = prestamos[prestamo.id]
+                self.assertEqual((prestamo.deuda_restante, prestamo.estatus), (deuda_restante, estatus))
+                self.assertEqual(
+                    list(Abono.objects.filter(prestamo=prestamo).values_list('monto_abono', 'deuda_restante', 'fecha_abono')),
+                    [(abono, deuda_restante, self.fecha_pago)]
+                )
+        self.assertEqual(Abono.objects.count(), 2 * len(empleados))
+
+    def test_consultas_no_crecen_con_los_empleados(self):
+        pocos = crear_empleados_para_nomina(2, self.fecha_pago)
+        muchos = crear_empleados_para_nomina(8, self.fecha_pago)
+        with CaptureQueriesContext(connection) as con_pocos:
+            self.registrar(pocos)
+        with CaptureQueriesContext(connection) as con_muchos:
+            self.registrar(muchos)
+        self.assertEqual(Pago.objects.count(), 10)
+        self.assertEqual(len(con_pocos), len(con_muchos))
+
+    def test_cuerpo_invalido(self):
+        empleado, = crear_empleados_para_nomina(1, self.fecha_pago)
+        for cuerpo in ([empleado.id], {"empleados": [True]}, {"empleados": empleado.id}, {"empleados": ["1"]}):
+            respuesta = self.client.post('/api/pagos/registrar_masivo/', cuerpo, content_type='application/json')
+            self.assertEqual(respuesta.status_code, 400, cuerpo)
+        self.assertFalse(Pago.objects.exists())
+
+
+class PrevisualizacionNominaTest(TestCase):
+    """
+    La previsualización se guarda en caché hasta que cambia la versión
+    compartida en la base de datos, aunque el cambio lo haga otro proceso.
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.empleado = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        Salario.objects.create(empleado=self.empleado, sueldo_semanal=Decimal('1200.00'), vigente_desde=date(2026, 1, 1))
+        self.fecha_pago = date(2026, 10, 13)
+
+    def faltas(self):
+        datos = self.client.get(f'/api/pagos/previsualizar/?fecha={self.fecha_pago.isoformat()}').json()
+        return datos['pagos'][0]['detalle']['faltas']['dias_faltados']
+
+    def test_escritura_cambia_la_siguiente_previsualizacion(self):
+        self.assertEqual(self.faltas(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            asistencia = Asistencia.objects.create(empleado=self.empleado, fecha=date(2026, 10, 12), asistencia=False)
+        self.assertEqual(self.faltas(), 1)
+
+        # Otro worker: cambia los datos y la versión en la base de datos, sin tocar el caché de este proceso
+        Asistencia.objects.filter(id=asistencia.id).update(asistencia=True)
+        ResumenAsistenciaSemanal.objects.update(presentes=F('registrados'))
+        self.assertEqual(self.faltas(), 1)
+        versiones.incrementar([CLAVE_VERSION_PREVISUALIZACION])
+        self.assertEqual(self.faltas(), 0)
+
+
+class PruebaDeMigracion(TransactionTestCase):
+    """
+    Migra la base de datos de prueba hasta `migrar_desde`, para crear datos con
+    los modelos de entonces, y después hasta `migrar_hasta`.
+    """
+    migrar_desde = None
+    migrar_hasta = None
+
+    def migrar(self, migracion):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('Servidor', migracion)])
+        return executor.loader.project_state([('Servidor', migracion)]).apps
+
+    def setUp(self):
+        self.apps_antes = self.migrar(self.migrar_desde)
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes('Servidor')[0][1])
+
+    def migrar_al_final(self):
+        return self.migrar(self.migrar_hasta)
+
+
+class PagoIdempotenteTest(TestCase):
+    """
+    Un pago repetido en la misma semana devuelve el ya registrado, y un pago
+    concurrente se detecta por la restricción única.
+    """
+
+    def setUp(self):
+        self.empleado = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        Salario.objects.create(empleado=self.empleado, sueldo_semanal=Decimal('1200.00'), vigente_desde=date(2026, 1, 1))
+        self.semana = semana_de_pago(date.today())
+
+    def pago_concurrente(self):
+        return Pago.objects.create(
+            empleado=self.empleado, monto_a_pagar=Decimal('1.00'), fecha_pago=date.today(), semana=self.semana, detalle={}
+        )
+
+    def test_pago_repetido(self):
+        primera = self.client.post(f'/api/empleado/{self.empleado.id}/registrar_pago/')
+        segunda = self.client.post(f'/api/empleado/{self.empleado.id}/registrar_pago/')
+        self.assertEqual((primera.status_code, segunda.status_code), (201, 200))
+        self.assertEqual(primera.json()['pago']['id'], segunda.json()['pago']['id'])
+        self.assertEqual(Pago.objects.count(), 1)
+
+        masivo = self.client.post('/api/pagos/registrar_masivo/', {}, content_type='application/json').json()
+        self.assertEqual((masivo['pagos'], masivo['ya_pagados']), ([], [self.empleado.id]))
+
+    def test_pago_concurrente(self):
+        # La otra petición confirma su pago después de las dos revisiones
+        pago = self.pago_concurrente()
+        with mock.patch('Servidor.views.pago_de_la_semana', side_effect=[None, None, pago]):
+            respuesta = self.client.post(f'/api/empleado/{self.empleado.id}/registrar_pago/')
+        self.assertEqual((respuesta.status_code, respuesta.json()['pago']['id']), (200, pago.id))
+
+        # Otro IntegrityError no se confunde con un pago duplicado
+        Pago.objects.all().delete()
+        with mock.patch('Servidor.views.registrar_nomina', side_effect=IntegrityError('otra restricción')):
+            with self.assertRaises(IntegrityError):
+                self.client.post(f'/api/empleado/{self.empleado.id}/registrar_pago/')
+
+    def test_pago_masivo_concurrente(self):
+        def calcular_con_pago_concurrente(*args, **kwargs):
+            self.pago_concurrente()
+            return calcular_nomina(*args, **kwargs)
+
+        with mock.patch('Servidor.views.calcular_nomina', side_effect=calcular_con_pago_concurrente):
+            respuesta = self.client.post('/api/pagos/registrar_masivo/', {}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertFalse(Pago.objects.exists())
+
+
+class SemanaDePagosExistentesTest(PruebaDeMigracion):
+    """
+    La migración asigna la semana a los pagos existentes; de los duplicados de
+    una semana solo el primero la recibe.
+    """
+    migrar_desde = '0007_remove_abono_created_at_remove_abono_updated_at_and_more'
+    migrar_hasta = '0008_pago_semana_pago_pago_unico_por_empleado_semana'
+
+    def test_semanas_asignadas(self):
+        Empleado = self.apps_antes.get_model('Servidor', 'Empleado')
+        Pago = self.apps_antes.get_model('Servidor', 'Pago')
+        empleado = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        primero, repetido, siguiente = (
+            Pago.objects.create(empleado=empleado, monto_a_pagar=Decimal(1), fecha_pago=fecha, detalle={}).id
+            for fecha in (date(2026, 10, 6), date(2026, 10, 8), date(2026, 10, 13))
+        )
+
+        Pago = self.migrar_al_final().get_model('Servidor', 'Pago')
+        self.assertEqual(dict(Pago.objects.values_list('id', 'semana')), {
+            primero: date(2026, 10, 5), repetido: None, siguiente: date(2026, 10, 12),
+        })
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Pago.objects.create(
+                empleado_id=empleado.id, monto_a_pagar=Decimal(1), fecha_pago=date(2026, 10, 6),
+                semana=date(2026, 10, 5), detalle={}
+            )
+
+
+class EjecutarNominaTest(TransactionTestCase):
+    """
+    Repartir la nómina en lotes da los mismos pagos, abonos y saldos que
+    procesarla en uno solo, y un lote fallido termina el comando con error.
+    """
+    fecha_pago = date(2026, 10, 13)
+
+    def setUp(self):
+        crear_empleados_para_nomina(10, self.fecha_pago)
+        self.prestamos = list(Prestamo.objects.values_list('id', 'deuda_restante', 'estatus'))
+
+    def ejecutar(self, lotes):
+        Pago.objects.all().delete()
+        Abono.objects.all().delete()
+        for prestamo_id, deuda_restante, estatus in self.prestamos:
+            Prestamo.objects.filter(id=prestamo_id).update(deuda_restante=deuda_restante, estatus=estatus)
+        call_command(
+            'ejecutar_nomina', fecha=self.fecha_pago.isoformat(), procesos=1, lotes=lotes,
+            stdout=io.StringIO(), stderr=io.StringIO()
+        )
+        return (
+            sorted(Pago.objects.values_list('empleado_id', 'monto_a_pagar', 'fecha_pago', 'semana', 'detalle')),
+            sorted(Abono.objects.values_list('prestamo_id', 'empleado_id', 'monto_abono', 'fecha_abono', 'deuda_restante')),
+            sorted(Prestamo.objects.values_list('id', 'deuda_restante', 'estatus')),
+        )
+
+    def test_mismo_resultado_con_1_y_7_lotes(self):
+        pagos, abonos, prestamos = self.ejecutar(1)
+        self.assertEqual((len(pagos), len(abonos)), (10, 20))
+        self.assertEqual(self.ejecutar(7), (pagos, abonos, prestamos))
+
+    def test_lote_fallido(self):
+        def fallar_en_el_segundo_lote(*args, **kwargs):
+            if len(calcular.call_args_list) == 2:
+                raise ValueError("falla simulada")
+            return calcular_nomina(*args, **kwargs)
+
+        comando = 'Servidor.management.commands.ejecutar_nomina'
+        with mock.patch(f'{comando}.calcular_nomina', side_effect=fallar_en_el_segundo_lote) as calcular:
+            with self.assertRaisesMessage(CommandError, 'Los lotes [2] fallaron'):
+                self.ejecutar(3)
+        # Los otros lotes se registraron; el fallido se revirtió completo
+        self.assertEqual(Pago.objects.count(), 6)
+
+
+class ResumenAsistenciaSemanalTest(TestCase):
+    """
+    Las señales mantienen el resumen semanal al crear, editar, mover y borrar
+    asistencias, y el comando de reconstrucción llega al mismo resultado.
+    """
+
+    def setUp(self):
+        self.uno = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        self.dos = Empleado.objects.create(nombre="Dos", telefono="5550001", fecha_entrada=date(2026, 1, 1))
+        self.semana = date(2026, 10, 5)
+
+    def resumenes(self):
+        return set(ResumenAsistenciaSemanal.objects.values_list(
+            'empleado_id', 'semana', 'dias_presentes', 'dias_ausentes', 'registrados', 'presentes'
+        ))
+
+    def test_senales_y_reconstruccion(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            lunes = Asistencia.objects.create(empleado=self.uno, fecha=self.semana, asistencia=True)
+        if connection.features.has_select_for_no_key_update:
+            self.assertTrue(any('FOR NO KEY UPDATE' in consulta['sql'] for consulta in capturadas))
+        martes = Asistencia.objects.create(empleado=self.uno, fecha=self.semana + timedelta(days=1), asistencia=False)
+        self.assertEqual(self.resumenes(), {(self.uno.id, self.semana, 1, 1, 0b11, 0b01)})
+
+        # Editar, mover a otra semana y a otro empleado recalcula también el origen
+        martes.asistencia = True
+        martes.save()
+        self.assertEqual(self.resumenes(), {(self.uno.id, self.semana, 2, 0, 0b11, 0b11)})
+        martes.fecha = self.semana + timedelta(days=8)
+        martes.save()
+        lunes.empleado = self.dos
+        lunes.save()
+        self.assertEqual(self.resumenes(), {
+            (self.uno.id, self.semana + timedelta(days=7), 1, 0, 0b10, 0b10),
+            (self.dos.id, self.semana, 1, 0, 0b01, 0b01),
+        })
+        lunes.delete()
+        self.assertEqual(self.resumenes(), {(self.uno.id, self.semana + timedelta(days=7), 1, 0, 0b10, 0b10)})
+
+        # La reconstrucción llega a las mismas filas desde los registros diarios
+        for dia in range(3):
+            Asistencia.objects.create(empleado=self.dos, fecha=self.semana + timedelta(days=dia), asistencia=dia != 1)
+        esperados = self.resumenes()
+        ResumenAsistenciaSemanal.objects.all().delete()
+        Asistencia.objects.bulk_create([Asistencia(empleado=self.uno, fecha=self.semana, asistencia=False)])
+        ResumenAsistenciaSemanal.objects.bulk_create([
+            ResumenAsistenciaSemanal(empleado=self.dos, semana=self.semana, dias_presentes=7, registrados=0b1111111)
+        ])
+        salida = io.StringIO()
+        call_command('reconstruir_resumen_asistencia', stdout=salida)
+        self.assertIn('3 resúmenes semanales reconstruidos', salida.getvalue())
+        self.assertEqual(self.resumenes(), esperados | {(self.uno.id, self.semana, 0, 1, 0b01, 0)})
+
+
+class ResumenAsistenciasExistentesTest(PruebaDeMigracion):
+    """
+    La migración que crea el resumen semanal lo llena con las asistencias que
+    ya existen.
+    """
+    migrar_desde = '0008_pago_semana_pago_pago_unico_por_empleado_semana'
+    migrar_hasta = '0009_resumenasistenciasemanal'
+
+    def test_resumen_inicial(self):
+        Empleado = self.apps_antes.get_model('Servidor', 'Empleado')
+        Asistencia = self.apps_antes.get_model('Servidor', 'Asistencia')
+        empleado = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        for fecha, asistencia in ((date(2026, 10, 5), True), (date(2026, 10, 6), False), (date(2026, 10, 12), False)):
+            Asistencia.objects.create(empleado=empleado, fecha=fecha, asistencia=asistencia)
+
+        Resumen = self.migrar_al_final().get_model('Servidor', 'ResumenAsistenciaSemanal')
+        self.assertEqual(
+            set(Resumen.objects.values_list('empleado_id', 'semana', 'dias_presentes', 'dias_ausentes')),
+            {(empleado.id, date(2026, 10, 5), 1, 1), (empleado.id, date(2026, 10, 12), 0, 1)}
+        )
+
+
+class PaginacionCursorTest(TestCase):
+    """
+    Las páginas encadenadas por cursor recorren toda la lista sin repetir
+    registros, y un cursor alterado responde 400.
+    """
+
+    def setUp(self):
+        for numero in range(5):
+            empleado = Empleado.objects.create(nombre=f"E{numero}", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+            for dia in range(3):
+                Asistencia.objects.create(empleado=empleado, fecha=date(2026, 10, 5 + dia), asistencia=True)
+
+    def recorrer(self, url):
+        ids = []
+        while url:
+            datos = self.client.get(url).json()
+            ids += [fila['id'] for fila in datos['resultados']]
+            url = datos['siguiente']
+        return ids
+
+    def test_paginas_encadenadas(self):
+        asistencias = list(Asistencia.objects.order_by('fecha', 'id').values_list('id', flat=True))
+        self.assertEqual(self.recorrer('/api/asistencias/?limite=4'), asistencias)
+        empleados = list(Empleado.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(self.recorrer('/api/empleados/?limite=2'), empleados)
+        self.assertEqual(self.recorrer(f'/api/empleado/{empleados[0]}/pagos/?limite=2'), [])
+
+    def test_cursor_invalido(self):
+        def cursor(valores):
+            return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+        casos = [
+            ('/api/asistencias/', 'no-es-base64!'),
+            ('/api/asistencias/', cursor({"fecha": "2026-10-05"})),
+            ('/api/asistencias/', cursor(["2026-10-05"])),
+            ('/api/asistencias/', cursor(["no-es-fecha", 1])),
+            ('/api/asistencias/', cursor([{"x": 1}, 2])),
+            ('/api/asistencias/', cursor(["2026-10-05", None])),
+            ('/api/pagos/', cursor(["no-es-fecha", 1])),
+            ('/api/pagos/', cursor([{"x": 1}, 2])),
+            ('/api/empleados/', cursor(["abc"])),
+            ('/api/empleados/', cursor([2 ** 70])),
+        ]
+        for url, valor in casos:
+            respuesta = self.client.get(url, {'cursor': valor})
+            self.assertEqual(respuesta.status_code, 400, (url, valor))
+            self.assertEqual(respuesta.json(), {"error": "Cursor inválido."})
+
+
+class AsistenciaMasivaTest(TestCase):
+    """
+    El registro masivo inserta o actualiza las asistencias en una operación y
+    deja al día el resumen semanal y los cachés que dependen de ellas.
+    """
+
+    def setUp(self):
+        caches['respuestas'].clear()
+        self.uno = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        self.dos = Empleado.objects.create(nombre="Dos", telefono="5550001", fecha_entrada=date(2026, 1, 1))
+        Asistencia.objects.create(empleado=self.uno, fecha=date(2026, 10, 5), asistencia=True)
+
+    def registrar(self, datos):
+        return self.client.post('/api/asistencias/masivo/', datos, content_type='application/json')
+
+    def test_inserta_y_actualiza(self):
+        # Respuesta en caché antes del registro masivo
+        self.assertEqual(len(self.client.get('/api/asistencias/2026-10-05/').json()), 1)
+        self.client.get('/api/pagos/previsualizar/?fecha=2026-10-13')
+        antes = version_previsualizacion()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.registrar({"fecha": "2026-10-05", "asistencias": [
+                {"empleado": self.uno.id, "asistencia": False},
+                {"empleado": self.dos.id, "asistencia": True},
+                {"empleado": self.dos.id, "asistencia": False, "fecha": "2026-10-06"},
+            ]})
+        self.assertEqual((respuesta.status_code, respuesta.json()['registradas']), (201, 3))
+        self.assertEqual(set(Asistencia.objects.values_list('empleado_id', 'fecha', 'asistencia')), {
+            (self.uno.id, date(2026, 10, 5), False),
+            (self.dos.id, date(2026, 10, 5), True),
+            (self.dos.id, date(2026, 10, 6), False),
+        })
+        resumenes = ResumenAsistenciaSemanal.objects.values_list(
+            'empleado_id', 'dias_presentes', 'dias_ausentes', 'registrados', 'presentes'
+        )
+        self.assertEqual(set(resumenes), {(self.uno.id, 0, 1, 0b01, 0), (self.dos.id, 1, 1, 0b11, 0b01)})
+        self.assertEqual(
+            sorted(fila['asistencia'] for fila in self.client.get('/api/asistencias/2026-10-05/').json()), [False, True]
+        )
+        self.assertNotEqual(version_previsualizacion(), antes)
+
+    def test_errores(self):
+        self.assertEqual(self.registrar({"asistencias": []}).status_code, 400)
+        self.assertEqual(self.registrar([{"empleado": self.uno.id, "asistencia": True}]).status_code, 400)
+        repetidas = [{"empleado": self.uno.id, "asistencia": True}] * 2
+        self.assertEqual(self.registrar({"fecha": "2026-10-06", "asistencias": repetidas}).status_code, 400)
+        respuesta = self.registrar({"fecha": "2026-10-06", "asistencias": [{"empleado": 999, "asistencia": True}]})
+        self.assertEqual((respuesta.status_code, respuesta.json()['empleados']), (404, [999]))
+        self.assertEqual(Asistencia.objects.count(), 1)
+
+
+class AsistenciasDuplicadasTest(PruebaDeMigracion):
+    """
+    La migración de la restricción única conserva la asistencia más reciente
+    de cada empleado y fecha y corrige el resumen de esas semanas.
+    """
+    migrar_desde = '0009_resumenasistenciasemanal'
+    migrar_hasta = '0010_asistencia_unica_por_empleado_fecha'
+
+    def test_elimina_duplicados(self):
+        Empleado = self.apps_antes.get_model('Servidor', 'Empleado')
+        Asistencia = self.apps_antes.get_model('Servidor', 'Asistencia')
+        Resumen = self.apps_antes.get_model('Servidor', 'ResumenAsistenciaSemanal')
+        empleado = Empleado.objects.create(nombre="Uno", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+        Asistencia.objects.create(empleado=empleado, fecha=date(2026, 10, 5), asistencia=True)
+        ultima = Asistencia.objects.create(empleado=empleado, fecha=date(2026, 10, 5), asistencia=False).id
+        otra = Asistencia.objects.create(empleado=empleado, fecha=date(2026, 10, 6), asistencia=True).id
+        Resumen.objects.create(empleado=empleado, semana=date(2026, 10, 5), dias_presentes=2, dias_ausentes=1)
+
+        apps = self.migrar_al_final()
+        Asistencia = apps.get_model('Servidor', 'Asistencia')
+        self.assertEqual(sorted(Asistencia.objects.values_list('id', flat=True)), [ultima, otra])
+        Resumen = apps.get_model('Servidor', 'ResumenAsistenciaSemanal')
+        self.assertEqual(list(Resumen.objects.values_list('dias_presentes', 'dias_ausentes')), [(1, 1)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Asistencia.objects.create(empleado_id=empleado.id, fecha=date(2026, 10, 6), asistencia=False)
+
+
+class MapasDeAsistenciasExistentesTest(PruebaDeMigracion):
+    """
+    La migración de los mapas de bits crea el resumen de las semanas que no lo
+    tenían, y las faltas contadas con los mapas son las mismas que con los
+    registros diarios.
+    """
+    migrar_desde = '0014_vacacion_dias_asignados_vacacion_tomada_intervalo'
+    migrar_hasta = '0015_resumen_asistencia_mapas_de_bits'
+
+    def test_faltas_iguales_antes_y_despues(self):
+        Empleado = self.apps_antes.get_model('Servidor', 'Empleado')
+        Asistencia = self.apps_antes.get_model('Servidor', 'Asistencia')
+        Resumen = self.apps_antes.get_model('Servidor', 'ResumenAsistenciaSemanal')
+        uno, dos = [
+            Empleado.objects.create(nombre=f"Empleado {numero}", telefono="5550000", fecha_entrada=date(2026, 1, 1))
+            for numero in range(2)
+        ]
+        # Tres semanas con faltas salteadas; solo la primera semana de `uno` tiene resumen
+        inicio = date(2026, 9, 28)
+        Asistencia.objects.bulk_create([
+            Asistencia(empleado=empleado, fecha=inicio + timedelta(days=dia), asistencia=(dia + empleado.id) % 3 != 0)
+            for empleado in (uno, dos) for dia in range(21)
+        ])
+        Resumen.objects.create(empleado=uno, semana=inicio, dias_presentes=7)
+        ids, desde, hasta = [uno.id, dos.id], inicio + timedelta(days=2), inicio + timedelta(days=18)
+        antes = contar_faltas_en_registros(ids, desde, hasta, excluir=(6,))
+
+        Resumen = self.migrar_al_final().get_model('Servidor', 'ResumenAsistenciaSemanal')
+        self.assertEqual(Resumen.objects.count(), 6)
+        presentes = Asistencia.objects.filter(empleado=uno, fecha__lt=inicio + timedelta(days=7), asistencia=True).count()
+        self.assertEqual(
+            list(Resumen.objects.filter(empleado_id=uno.id, semana=inicio).values_list('dias_presentes', 'dias_ausentes')),
+            [(presentes, 7 - presentes)]
+        )
+        self.assertEqual(len(antes), 2)
+        with self.settings(ASISTENCIA_FALTAS_DESDE_MAPAS=True):
+            self.assertEqual(contar_faltas(ids, desde, hasta, excluir=(6,)), antes)
@@ -5,6 +5,7 @@ urlpatterns = [
     # CRUD para Empleados
     path('empleados/', views.empleado_list, name='empleado-list'),
     path('empleados/<int:pk>/', views.empleado_detail, name='empleado-detail'),
+    path('empleado/<int:empleado_id>/tablero/', views.tablero_empleado, name='tablero_empleado'),
     path('empleado/<int:empleado_id>/abonos/', views.abonos_por_empleado, name='abonos_por_empleado'),
     path('empleado/<int:empleado_id>/prestamos/', views.prestamos_por_empleado, name='prestamos_por_empleado'),
     path('empleado/<int:empleado_id>/vacacion_tomada/', views.vacaciones_tomadas_por_empleado, name='vacacion_tomada_por_empleado'),
@@ -12,7 +13,11 @@ urlpatterns = [
     # CRUD para Asistencias
     path('asistencias/', views.asistencia_list, name='asistencia-list'),
     path('asistencias/<int:pk>/', views.asistencia_detail, name='asistencia-detail'),
+    path('asistencias/masivo/', views.asistencia_masiva, name='asistencia_masiva'),
+    path('asistencias/resumen_semanal/', views.resumen_asistencia_semanal, name='resumen_asistencia_semanal'),
+    path('asistencias/matriz/', views.matriz_asistencia, name='matriz_asistencia'),
     #Asistencias por fecha
+    path('asistencias/por_fecha/', views.asistencia_por_rango, name='asistencia_por_rango'),
     path('asistencias/<str:fecha>/', views.asistencia_por_fecha, name='asistencia_por_fecha'),
 
     # CRUD para Vacaciones
@@ -30,6 +35,7 @@ urlpatterns = [
     # CRUD para Préstamos
     path('prestamos/', views.prestamo_list, name='prestamo-list'),
     path('prestamos/<int:pk>/', views.prestamo_detail, name='prestamo-detail'),
+    path('prestamos/proyeccion/', views.proyeccion_prestamos, name='proyeccion_prestamos'),
     
 
     # CRUD para Abonos
@@ -41,6 +47,14 @@ urlpatterns = [
     path('pagos/', views.pago_list, name='pago-list'),
     path('pagos/<int:pk>/', views.pago_detail, name='pago-detail'),
     path('empleado/<int:empleado_id>/registrar_pago/', views.registrar_pago, name='registrar_pago'),
+    path('pagos/registrar_masivo/', views.registrar_pagos_masivo, name='registrar_pagos_masivo'),
+    path('pagos/previsualizar/', views.previsualizar_pagos, name='previsualizar_pagos'),
+    path('pagos/exportar/', views.exportar_pagos, name='exportar_pagos'),
+    path('pagos/por_fecha/', views.pagos_por_rango, name='pagos_por_rango'),
+    path('pagos/reporte/', views.reporte_nomina, name='reporte_nomina'),
     path('pagos/<str:fecha>/', views.pagos_por_fecha, name='pagos_por_fecha'),
 
+    # Estadísticas del caché de respuestas
+    path('cache/estadisticas/', views.estadisticas_cache, name='estadisticas_cache'),
+
 ]
@@ -0,0 +1,56 @@
+# Servidor/vacaciones.py
+# Saldo de vacaciones de cada empleado.
+#
+# El saldo vive en la Vacacion más reciente del empleado: dias_restantes es
+# dias_asignados menos los días de todas sus VacacionTomada. Las señales lo
+# ajustan con un UPDATE relativo en la misma transacción en que se crea, edita
+# o borra cada VacacionTomada, y reconstruir_saldos lo recalcula para todos los
+# empleados con una sola consulta agregada.
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Vacacion, VacacionTomada
+
+
+def vacaciones_que_se_traslapan(empleado_id, fecha_inicio, fecha_fin):
+    """
+    VacacionTomada del empleado que comparten al menos un día con el intervalo;
+    se resuelve con el índice (empleado, fecha_inicio, fecha_fin).
+    """
+    return VacacionTomada.objects.filter(
+        empleado_id=empleado_id, fecha_inicio__lte=fecha_fin, fecha_fin__gte=fecha_inicio
+    )
+
+
+def dias_tomados(empleado_id):
+    return VacacionTomada.objects.filter(empleado_id=empleado_id).aggregate(total=Sum('dias_tomados'))['total'] or 0
+
+
+def ajustar_dias_restantes(empleado_id, dias):
+    """
+    Suma `dias` (negativo al tomar vacaciones) al saldo del empleado sin leerlo
+    antes, para que dos ajustes simultáneos no se pisen.
+    """
+    ultima = Vacacion.objects.filter(empleado_id=empleado_id).order_by('-id').values('id')[:1]
+    Vacacion.objects.filter(id=Subquery(ultima)).update(
+        dias_restantes=F('dias_restantes') + dias, updated_at=timezone.now()
+    )
+
+
+def reconstruir_saldos():
+    """
+    Recalcula el saldo de todos los empleados con un solo UPDATE que suma los
+    días tomados por empleado. Devuelve el número de saldos recalculados.
+    """
+    tomados = (
+        VacacionTomada.objects.filter(empleado=OuterRef('empleado'))
+        .order_by()
+        .values('empleado')
+        .annotate(total=Sum('dias_tomados'))
+        .values('total')
+    )
+    ultimas = Vacacion.objects.order_by().values('empleado').annotate(ultima=Max('id')).values('ultima')
+    return Vacacion.objects.filter(id__in=ultimas).update(
+        dias_restantes=F('dias_asignados') - Coalesce(Subquery(tomados), 0), updated_at=timezone.now()
+    )
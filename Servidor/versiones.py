@@ -0,0 +1,47 @@
+# Servidor/versiones.py
+# Versiones compartidas de los cachés en memoria.
+#
+# Los cachés LocMem son de cada proceso de gunicorn: si la versión que invalida
+# sus entradas viviera también ahí, un cambio confirmado en un worker no
+# llegaría a los demás. Cada versión es una fila de VersionDeCache; invalidar
+# la incrementa con un UPDATE relativo y cada worker, al leerla, deja de usar
+# las entradas guardadas con la anterior. Leer no escribe: una clave sin fila
+# tiene la versión 0 y su fila se crea la primera vez que se invalida, así que
+# la tabla solo crece con lo que se modifica.
+import time
+
+from django.db.models import F
+
+from .models import VersionDeCache
+
+
+def nueva_version():
+    # Basada en la hora: si la fila se borra (o se revierte), la versión nueva no
+    # coincide con entradas viejas que sigan en los cachés
+    return time.time_ns()
+
+
+def versiones(claves):
+    """
+    Devuelve {clave: versión} con una sola consulta; 0 para las claves que
+    nunca se han invalidado.
+    """
+    encontradas = dict(VersionDeCache.objects.filter(clave__in=claves).values_list('clave', 'version'))
+    return {clave: encontradas.get(clave, 0) for clave in claves}
+
+
+def version(clave):
+    return versiones([clave])[clave]
+
+
+def incrementar(claves):
+    """
+    Incrementa las versiones de las claves. Debe llamarse después del commit
+    del cambio, para que nadie guarde en caché datos sin confirmar con la
+    versión nueva.
+    """
+    claves = list(claves)
+    VersionDeCache.objects.bulk_create(
+        [VersionDeCache(clave=clave, version=nueva_version()) for clave in claves], ignore_conflicts=True
+    )
+    VersionDeCache.objects.filter(clave__in=claves).update(version=F('version') + 1)
@@ -5,16 +5,33 @@ from rest_framework import status
 from datetime import datetime
 from datetime import date, timedelta
 from decimal import Decimal
-from django.db import transaction
-from .models import Empleado, Asistencia, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
+from itertools import groupby
+from operator import itemgetter
+from django.db import IntegrityError, transaction
+from .models import Empleado, Asistencia, ResumenAsistenciaSemanal, Vacacion, VacacionTomada, Salario, Prestamo, Abono, Pago
 from .serializers import (
-    EmpleadoSerializer, AsistenciaSerializer, VacacionSerializer, VacacionTomadaSerializer,
-    SalarioSerializer, PrestamoSerializer, AbonoSerializer, PagoSerializer
+    EmpleadoSerializer, AsistenciaSerializer, ResumenAsistenciaSemanalSerializer, VacacionSerializer, VacacionTomadaSerializer,
+    SalarioSerializer, PrestamoSerializer, AbonoSerializer, PagoSerializer, AsistenciaMasivaSerializer, serializar_lista
 )
+from .nomina import calcular_nomina, registrar_nomina, previsualizar_nomina, semana_de_pago, invalidar_previsualizacion
+from .resumen_asistencia import semana_de, actualizar_resumenes, bloquear_empleados
+from .salarios import sueldos_vigentes
+from .paginacion import lista_paginada
+from . import cache_respuestas
+from .cache_respuestas import cachear_respuesta, normalizar_fecha
+from .condicional import respuesta_condicional
+from .proyeccion import proyectar_prestamos
+from .reportes import (
+    MAXIMO_PERIODOS, PERIODOS, PERIODOS_POR_DEFECTO, inicio_de_ultimos_periodos, inicios_de_periodos, reporte_de_nomina
+)
+from .matriz_asistencia import FORMATOS, MAXIMO_DIAS, matriz_de_asistencia, ultimo_dia_del_mes
+from .exportacion import csv_de_pagos, pagos_a_exportar
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
 #Pagos por fechas
 @api_view(['GET'])
+@cachear_respuesta('pagos_fecha', 'fecha', normalizar_fecha)
 def pagos_por_fecha(request, fecha):
     """
     Filtra los pagos por una fecha proporcionada en la URL y los serializa.
@@ -25,115 +42,309 @@ def pagos_por_fecha(request, fecha):
         return Response({"error": "Formato de fecha inválido. Use 'YYYY-MM-DD'."}, status=400)
 
     pagos = Pago.objects.filter(fecha_pago=fecha_parsed).order_by('id')
-    serializer = PagoSerializer(pagos, many=True)
 
     return Response({
         "fecha": str(fecha_parsed),
-        "pagos": serializer.data
+        "pagos": serializar_lista(pagos, PagoSerializer)
     })
 
 
-    # Convertir el defaultdict a un diccionario estándar
-    data = {str(fecha): pagos for fecha, pagos in pagos_agrupados.items()}
-    return JsonResponse(data)
+# Reporte de nómina por semana o mes
+@api_view(['GET'])
+def reporte_nomina(request):
+    """
+    Devuelve por semana (?periodo=semana, por defecto) o por mes (?periodo=mes)
+    el sueldo base, los descuentos por faltas y préstamos y el total pagado,
+    sumados en la base de datos. Acepta ?desde= y ?hasta= (YYYY-MM-DD, por
+    defecto los últimos 12 periodos), ?empleado=<id> y ?por_empleado=1 para
+    incluir el desglose por empleado de cada periodo.
+    """
+    periodo = request.query_params.get('periodo', 'semana')
+    if periodo not in PERIODOS:
+        return Response({"error": f"'periodo' debe ser uno de: {', '.join(PERIODOS)}."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        hasta = date.today()
+        if request.query_params.get('hasta'):
+            hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date()
+        desde = inicio_de_ultimos_periodos(hasta, periodo, PERIODOS_POR_DEFECTO)
+        if request.query_params.get('desde'):
+            desde = datetime.strptime(request.query_params['desde'], '%Y-%m-%d').date()
+    except ValueError:
+        return Response({"error": "El formato de la fecha debe ser YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+    if hasta < desde or len(inicios_de_periodos(periodo, desde, hasta)) > MAXIMO_PERIODOS:
+        return Response(
+            {"error": f"'hasta' debe ser igual o posterior a 'desde' y el reporte no puede pasar de {MAXIMO_PERIODOS} periodos."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    empleado_id = request.query_params.get('empleado')
+    if empleado_id and not empleado_id.isdigit():
+        return Response({"error": "El empleado debe ser un id numérico."}, status=status.HTTP_400_BAD_REQUEST)
 
+    return Response(reporte_de_nomina(
+        periodo, desde, hasta,
+        empleado_id=int(empleado_id) if empleado_id else None,
+        por_empleado=request.query_params.get('por_empleado') in ('1', 'true'),
+    ))
 
-#Generar Pago
-@api_view(['POST'])
-# Función para registrar pago
-def registrar_pago(request, empleado_id):
+
+# Consultas por rango de fechas
+MAXIMO_DIAS_POR_RANGO = 366
+
+
+def leer_rango_de_fechas(request):
+    """
+    Lee ?desde= (obligatorio), ?hasta= (por defecto igual a desde) y ?empleado=
+    de la petición. Lanza ValueError con el mensaje de error si no son válidos.
+    """
     try:
-        empleado = Empleado.objects.get(id=empleado_id)
-    except Empleado.DoesNotExist:
-        return Response({"error": "Empleado no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+        desde = datetime.strptime(request.query_params.get('desde', ''), '%Y-%m-%d').date()
+        hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date() if request.query_params.get('hasta') else desde
+    except ValueError:
+        raise ValueError("Indique ?desde= y opcionalmente ?hasta= con el formato YYYY-MM-DD.")
+    if not 0 <= (hasta - desde).days < MAXIMO_DIAS_POR_RANGO:
+        raise ValueError(f"'hasta' debe ser igual o posterior a 'desde' y el rango no puede pasar de {MAXIMO_DIAS_POR_RANGO} días.")
+    empleado_id = request.query_params.get('empleado')
+    if empleado_id and not empleado_id.isdigit():
+        raise ValueError("El empleado debe ser un id numérico.")
+    return desde, hasta, empleado_id
+
+
+def agrupar_por_fecha(filas, campo, nombre):
+    """
+    Agrupa filas ya ordenadas por fecha en [{"fecha": ..., nombre: [...]}, ...].
+    """
+    return [{"fecha": fecha, nombre: list(grupo)} for fecha, grupo in groupby(filas, key=itemgetter(campo))]
+
 
-    # Obtener el salario semanal del empleado
+@api_view(['GET'])
+def pagos_por_rango(request):
+    """
+    Devuelve los pagos de ?desde= a ?hasta= agrupados por fecha, con una sola
+    consulta ordenada sobre el índice (fecha_pago, id). Acepta ?empleado=<id>.
+    Cada grupo tiene la misma forma que la respuesta de pagos/<fecha>/.
+    """
     try:
-        salario = empleado.salario_set.latest('created_at')  # Asumiendo que hay un salario activo
-    except Salario.DoesNotExist:
-        return Response({"error": "No se encontró salario registrado para el empleado."}, status=status.HTTP_404_NOT_FOUND)
-
-    # Calcular faltas (de miércoles a lunes) excluyendo el martes como día de descanso
-    fecha_fin = date.today() - timedelta(days=1)  # Día anterior al pago (lunes)
-    fecha_inicio = fecha_fin - timedelta(days=4)  # Miércoles anterior
-    asistencias = Asistencia.objects.filter(empleado=empleado, fecha__range=(fecha_inicio, fecha_fin)).exclude(
-        fecha__week_day=3  # Excluir martes (día 3 en datetime.weekday)
-    )
-    faltas = asistencias.filter(asistencia=False).count()
-    descuento_por_faltas = faltas * (salario.sueldo_semanal / Decimal(6))  # Sueldo dividido por 6 días laborables
-
-    # Calcular abonos a préstamos
-    prestamos_activos = Prestamo.objects.filter(empleado=empleado, estatus='True')
-    total_abonos = Decimal(0)
-    detalle_prestamos = []
-    for prestamo in prestamos_activos:
-        abono = prestamo.abono_semanal
-
-        if prestamo.deuda_restante <= abono:
-            abono = prestamo.deuda_restante  # Ajustar abono si es mayor a la deuda restante
-            prestamo.deuda_restante = Decimal(0)  # La deuda queda saldada
-            prestamo.estatus = 'False'  # Cambiar estado a saldado
-        else:
-            prestamo.deuda_restante -= abono  # Reducir deuda restante
-
-        # Guardar cambios en el préstamo
-        prestamo.save()
-
-        # Crear registro de abono con la deuda restante actualizada
-        Abono.objects.create(
-            prestamo=prestamo,
-            empleado=empleado,
-            monto_abono=abono,
-            fecha_abono=date.today(),
-            deuda_restante=prestamo.deuda_restante  # Usar el valor actual de deuda restante
-        )
+        desde, hasta, empleado_id = leer_rango_de_fechas(request)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    pagos = Pago.objects.filter(fecha_pago__range=(desde, hasta))
+    if empleado_id:
+        pagos = pagos.filter(empleado_id=empleado_id)
+    pagos = serializar_lista(pagos.order_by('fecha_pago', 'id'), PagoSerializer)
+    return Response({
+        "desde": str(desde),
+        "hasta": str(hasta),
+        "fechas": agrupar_por_fecha(pagos, 'fecha_pago', 'pagos'),
+    })
 
-        # Registrar detalle para reporte
-        total_abonos += abono
-        detalle_prestamos.append({
-            "prestamo_id": prestamo.id,
-            "monto_abonado": str(abono),
-            "monto_restante": str(prestamo.deuda_restante),
-            "razon": prestamo.razon
-        })
-
-    # Calcular monto total del pago
-    monto_a_pagar = salario.sueldo_semanal - descuento_por_faltas - total_abonos
-
-    # Generar desglose
-    detalle = {
-        "faltas": {
-            "dias_faltados": faltas,
-            "descuento": str(descuento_por_faltas)
-        },
-        "prestamos": detalle_prestamos,
-        "total_abonos": str(total_abonos),
-        "sueldo_base": str(salario.sueldo_semanal),
-        "total_pagado": str(monto_a_pagar)
-    }
-
-    # Guardar el pago
-    pago = Pago.objects.create(
-        empleado=empleado,
-        monto_a_pagar=monto_a_pagar,
-        fecha_pago=date.today(),
-        detalle=detalle
-    )
 
+#Generar Pago
+def respuesta_pago(pago, mensaje, status_code):
     return Response({
-        "mensaje": "Pago registrado correctamente.",
+        "mensaje": mensaje,
         "pago": {
             "id": pago.id,
             "monto_a_pagar": pago.monto_a_pagar,
             "detalle": pago.detalle,
             "fecha_pago": pago.fecha_pago
         }
+    }, status=status_code)
+
+
+def pago_de_la_semana(empleado_id, semana):
+    return Pago.objects.filter(empleado_id=empleado_id, semana=semana).first()
+
+
+@api_view(['POST'])
+# Función para registrar pago
+def registrar_pago(request, empleado_id):
+    if not Empleado.objects.filter(id=empleado_id).exists():
+        return Response({"error": "Empleado no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+    fecha_pago = date.today()
+    semana = semana_de_pago(fecha_pago)
+
+    # Un reintento devuelve el pago ya registrado en la semana sin recalcularlo
+    pago = pago_de_la_semana(empleado_id, semana)
+    if pago is not None:
+        return respuesta_pago(pago, "Pago ya registrado para esta semana.", status.HTTP_200_OK)
+
+    sueldos = sueldos_vigentes([empleado_id], fecha_pago)
+    try:
+        with transaction.atomic():
+            calculos, sin_salario = calcular_nomina(fecha_pago, empleado_ids=[empleado_id], bloquear=True, sueldos=sueldos)
+            if sin_salario:
+                return Response({"error": "No se encontró salario registrado para el empleado."}, status=status.HTTP_404_NOT_FOUND)
+
+            # Otra petición pudo registrar el pago mientras esperábamos el bloqueo de los préstamos
+            pago = pago_de_la_semana(empleado_id, semana)
+            if pago is not None:
+                return respuesta_pago(pago, "Pago ya registrado para esta semana.", status.HTTP_200_OK)
+
+            pago, = registrar_nomina(calculos, fecha_pago)
+    except IntegrityError:
+        # Empleado sin préstamos que bloquear: la restricción única detuvo el
+        # pago duplicado. Si no hay pago en la semana, el error fue otro.
+        pago = pago_de_la_semana(empleado_id, semana)
+        if pago is None:
+            raise
+        return respuesta_pago(pago, "Pago ya registrado para esta semana.", status.HTTP_200_OK)
+
+    return respuesta_pago(pago, "Pago registrado correctamente.", status.HTTP_201_CREATED)
+
+
+#Generar Pagos de todos los empleados
+@api_view(['POST'])
+def registrar_pagos_masivo(request):
+    """
+    Registra en una sola transacción el pago de todos los empleados, o solo de
+    los indicados en "empleados" (lista de ids). Los empleados sin salario
+    registrado o que ya tienen pago en la semana se omiten y se reportan en la
+    respuesta.
+    """
+    if not isinstance(request.data, dict):
+        return Response({"error": "Se esperaba un objeto JSON."}, status=status.HTTP_400_BAD_REQUEST)
+    empleado_ids = request.data.get("empleados")
+    if empleado_ids is not None:
+        # bool es subclase de int: true no es el id 1
+        if not isinstance(empleado_ids, list) or not all(
+            isinstance(i, int) and not isinstance(i, bool) for i in empleado_ids
+        ):
+            return Response({"error": "'empleados' debe ser una lista de ids."}, status=status.HTTP_400_BAD_REQUEST)
+        encontrados = set(Empleado.objects.filter(id__in=empleado_ids).values_list('id', flat=True))
+        faltantes = sorted(set(empleado_ids) - encontrados)
+        if faltantes:
+            return Response({"error": "Empleados no encontrados.", "empleados": faltantes}, status=status.HTTP_404_NOT_FOUND)
+
+    fecha_pago = date.today()
+    semana = semana_de_pago(fecha_pago)
+    # Los sueldos se leen antes de la transacción para poder guardarlos en memoria;
+    # un empleado creado después no entra en esta nómina
+    candidatos = empleado_ids if empleado_ids is not None else list(Empleado.objects.values_list('id', flat=True))
+    sueldos = sueldos_vigentes(candidatos, fecha_pago)
+    try:
+        with transaction.atomic():
+            pendientes = list(
+                Empleado.objects.exclude(pago__semana=semana).filter(id__in=candidatos)
+                .values_list('id', flat=True)
+            )
+            calculos, sin_salario = calcular_nomina(fecha_pago, empleado_ids=pendientes, bloquear=True, sueldos=sueldos)
+            pagos = registrar_nomina(calculos, fecha_pago)
+    except IntegrityError:
+        return Response(
+            {"error": "Otro proceso registró pagos de esta semana al mismo tiempo. Intente de nuevo."},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    ya_pagados = Pago.objects.filter(semana=semana).exclude(id__in=[pago.id for pago in pagos])
+    if empleado_ids is not None:
+        ya_pagados = ya_pagados.filter(empleado_id__in=empleado_ids)
+
+    return Response({
+        "mensaje": f"{len(pagos)} pagos registrados correctamente.",
+        "pagos": [
+            {
+                "id": pago.id,
+                "empleado": pago.empleado_id,
+                "monto_a_pagar": pago.monto_a_pagar,
+                "detalle": pago.detalle,
+                "fecha_pago": pago.fecha_pago
+            }
+            for pago in pagos
+        ],
+        "sin_salario": sin_salario,
+        "ya_pagados": sorted(ya_pagados.values_list('empleado_id', flat=True))
     }, status=status.HTTP_201_CREATED)
 
 
+#Previsualizar nómina sin registrar pagos
+@api_view(['GET'])
+def previsualizar_pagos(request):
+    """
+    Calcula el desglose de pago de todos los empleados para la fecha de pago
+    indicada en ?fecha= (hoy por defecto) sin escribir nada.
+    """
+    fecha = request.query_params.get('fecha')
+    fecha_pago = date.today()
+    if fecha:
+        try:
+            fecha_pago = datetime.strptime(fecha, "%Y-%m-%d").date()
+        except ValueError:
+            return Response({"error": "Formato de fecha inválido. Use 'YYYY-MM-DD'."}, status=400)
+
+    return Response(previsualizar_nomina(fecha_pago))
+
+
+# Exportación de pagos en CSV
+@api_view(['GET'])
+def exportar_pagos(request):
+    """
+    Descarga los pagos en CSV, con el desglose del campo detalle en columnas.
+    Acepta ?desde= y ?hasta= (YYYY-MM-DD) sobre la fecha de pago. El archivo se
+    escribe mientras se lee la base de datos, sin cargar todos los pagos.
+    """
+    try:
+        desde = hasta = None
+        if request.query_params.get('desde'):
+            desde = datetime.strptime(request.query_params['desde'], '%Y-%m-%d').date()
+        if request.query_params.get('hasta'):
+            hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date()
+    except ValueError:
+        return Response(
+            {"error": "El formato de la fecha debe ser YYYY-MM-DD"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    respuesta = StreamingHttpResponse(csv_de_pagos(pagos_a_exportar(desde, hasta)), content_type='text/csv')
+    respuesta['Content-Disposition'] = f'attachment; filename="pagos_{desde or "inicio"}_{hasta or "fin"}.csv"'
+    return respuesta
+
+
+# Tablero de un empleado
+@api_view(['GET'])
+def tablero_empleado(request, empleado_id):
+    """
+    Devuelve en una sola llamada el empleado, su salario vigente, sus préstamos
+    activos, los días de vacaciones restantes, sus últimos ?pagos= pagos (5 por
+    defecto) y las asistencias de la semana en curso. Hace el mismo número de
+    consultas sin importar el historial del empleado.
+    """
+    limite_pagos = request.query_params.get('pagos', '5')
+    if not limite_pagos.isdigit() or not 1 <= int(limite_pagos) <= 100:
+        return Response({"error": "'pagos' debe ser un número entre 1 y 100."}, status=status.HTTP_400_BAD_REQUEST)
+
+    empleado = serializar_lista(Empleado.objects.filter(id=empleado_id), EmpleadoSerializer)
+    if not empleado:
+        return Response({"error": "Empleado no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+    salario = Salario.objects.filter(empleado_id=empleado_id, vigente_desde__lte=date.today()).order_by('-vigente_desde', '-created_at', '-id')
+    salario = serializar_lista(salario[:1], SalarioSerializer)
+    prestamos = Prestamo.objects.filter(empleado_id=empleado_id, estatus=True).order_by('id')
+    dias_restantes = Vacacion.objects.filter(empleado_id=empleado_id).order_by('-id').values_list('dias_restantes', flat=True).first()
+    pagos = Pago.objects.filter(empleado_id=empleado_id).order_by('-fecha_pago', '-id')[:int(limite_pagos)]
+    semana = semana_de(date.today())
+    asistencias = Asistencia.objects.filter(empleado_id=empleado_id, fecha__range=(semana, semana + timedelta(days=6))).order_by('fecha')
+
+    prestamos_activos = serializar_lista(prestamos, PrestamoSerializer)
+    return Response({
+        "empleado": empleado[0],
+        "salario": salario[0] if salario else None,
+        "prestamos_activos": prestamos_activos,
+        "deuda_total": str(sum((Decimal(prestamo['deuda_restante']) for prestamo in prestamos_activos), Decimal(0))),
+        "vacaciones": {"dias_restantes": dias_restantes},
+        "pagos": serializar_lista(pagos, PagoSerializer),
+        "asistencia_semana": {
+            "semana": semana.isoformat(),
+            "asistencias": serializar_lista(asistencias, AsistenciaSerializer),
+        },
+    })
+
 
 #Pagos por empleados
 @api_view(['GET'])
+@respuesta_condicional(Pago, PagoSerializer, por_empleado=True)
+@cachear_respuesta('pagos_empleado', 'empleado_id')
 def pagos_por_empleado(request,empleado_id):
     try:
         # Verificar que el empleado existe
@@ -147,11 +358,12 @@ def pagos_por_empleado(request,empleado_id):
     pagos = Pago.objects.filter(empleado=empleado)
     
     # Serializar los datos
-    serializer = PagoSerializer(pagos, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return lista_paginada(request, pagos, PagoSerializer, orden=('fecha_pago', 'id'))
 
 #Vacaciones Tomadas por empleado
 @api_view(['GET'])
+@respuesta_condicional(VacacionTomada, VacacionTomadaSerializer, por_empleado=True)
+@cachear_respuesta('vacaciones_tomadas_empleado', 'empleado_id')
 def vacaciones_tomadas_por_empleado(request,empleado_id):
     try:
         # Verificar que el empleado existe
@@ -165,11 +377,12 @@ def vacaciones_tomadas_por_empleado(request,empleado_id):
     vacaciones_tomadas = VacacionTomada.objects.filter(empleado=empleado)
     
     # Serializar los datos
-    serializer = VacacionTomadaSerializer(vacaciones_tomadas, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return lista_paginada(request, vacaciones_tomadas, VacacionTomadaSerializer)
 
 #Abonos de cada empleado
 @api_view(['GET'])
+@respuesta_condicional(Abono, AbonoSerializer, por_empleado=True)
+@cachear_respuesta('abonos_empleado', 'empleado_id')
 def abonos_por_empleado(request,empleado_id):
     try:
         # Verificar que el empleado existe
@@ -183,13 +396,14 @@ def abonos_por_empleado(request,empleado_id):
     abonos = Abono.objects.filter(empleado=empleado)
     
     # Serializar los datos
-    serializer = AbonoSerializer(abonos, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return lista_paginada(request, abonos, AbonoSerializer, orden=('fecha_abono', 'id'))
 
 
 
 #Prestamos de cada empleado
 @api_view(['GET'])
+@respuesta_condicional(Prestamo, PrestamoSerializer, por_empleado=True)
+@cachear_respuesta('prestamos_empleado', 'empleado_id')
 def prestamos_por_empleado(request, empleado_id):
     try:
         # Verificar que el empleado existe
@@ -204,12 +418,12 @@ def prestamos_por_empleado(request, empleado_id):
     prestamos = Prestamo.objects.filter(empleado=empleado)
     
     # Serializar los datos
-    serializer = PrestamoSerializer(prestamos, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return lista_paginada(request, prestamos, PrestamoSerializer)
 
 
 #Asistencias por fechas
 @api_view(['GET'])
+@cachear_respuesta('asistencias_fecha', 'fecha', normalizar_fecha)
 def asistencia_por_fecha(request, fecha):
     try:
         # Convertir la fecha del parámetro a un objeto datetime para mayor seguridad
@@ -222,17 +436,159 @@ def asistencia_por_fecha(request, fecha):
     
     # Filtrar las asistencias por la fecha específica
     asistencias = Asistencia.objects.filter(fecha=fecha_objeto)
-    serializer = AsistenciaSerializer(asistencias, many=True)
-    return Response(serializer.data)
+    return Response(serializar_lista(asistencias, AsistenciaSerializer))
+
+
+@api_view(['GET'])
+def asistencia_por_rango(request):
+    """
+    Devuelve las asistencias de ?desde= a ?hasta= agrupadas por fecha, con una
+    sola consulta ordenada sobre el índice (fecha, id). Acepta ?empleado=<id>.
+    """
+    try:
+        desde, hasta, empleado_id = leer_rango_de_fechas(request)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    asistencias = Asistencia.objects.filter(fecha__range=(desde, hasta))
+    if empleado_id:
+        asistencias = asistencias.filter(empleado_id=empleado_id)
+    asistencias = serializar_lista(asistencias.order_by('fecha', 'id'), AsistenciaSerializer)
+    return Response({
+        "desde": str(desde),
+        "hasta": str(hasta),
+        "fechas": agrupar_por_fecha(asistencias, 'fecha', 'asistencias'),
+    })
+
+
+#Registro masivo de asistencias
+@api_view(['POST'])
+def asistencia_masiva(request):
+    """
+    Registra o actualiza en una sola operación las asistencias de muchos
+    empleados. Acepta {"fecha": "YYYY-MM-DD", "asistencias": [{"empleado": id,
+    "asistencia": true}, ...]}; cada fila puede traer su propia "fecha" para
+    cargar una semana completa. Si ya existe la asistencia de un empleado en una
+    fecha, se actualiza.
+    """
+    if not isinstance(request.data, dict):
+        return Response({"error": "Se esperaba un objeto JSON."}, status=status.HTTP_400_BAD_REQUEST)
+    filas = request.data.get("asistencias")
+    if not isinstance(filas, list) or not filas:
+        return Response({"error": "'asistencias' debe ser una lista no vacía."}, status=status.HTTP_400_BAD_REQUEST)
+    fecha = request.data.get("fecha")
+    if fecha:
+        filas = [{"fecha": fecha, **fila} if isinstance(fila, dict) else fila for fila in filas]
+
+    serializer = AsistenciaMasivaSerializer(data=filas, many=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    filas = serializer.validated_data
+
+    claves = [(fila['empleado'], fila['fecha']) for fila in filas]
+    if len(set(claves)) != len(claves):
+        return Response({"error": "Hay asistencias repetidas para el mismo empleado y fecha."}, status=status.HTTP_400_BAD_REQUEST)
+
+    empleado_ids = {fila['empleado'] for fila in filas}
+    faltantes = empleado_ids - set(Empleado.objects.filter(id__in=empleado_ids).values_list('id', flat=True))
+    if faltantes:
+        return Response({"error": "Empleados no encontrados.", "empleados": sorted(faltantes)}, status=status.HTTP_404_NOT_FOUND)
+
+    with transaction.atomic():
+        Asistencia.objects.bulk_create(
+            [Asistencia(empleado_id=fila['empleado'], fecha=fila['fecha'], asistencia=fila['asistencia']) for fila in filas],
+            update_conflicts=True,
+            unique_fields=['empleado', 'fecha'],
+            update_fields=['asistencia', 'updated_at'],
+            batch_size=1000
+        )
+        # bulk_create no dispara señales: se actualizan aquí el resumen y los cachés
+        actualizar_resumenes({(empleado_id, semana_de(fecha)) for empleado_id, fecha in claves})
+        transaction.on_commit(invalidar_previsualizacion)
+        cache_respuestas.invalidar({('asistencias_fecha', fecha.isoformat()) for _, fecha in claves})
+
+    return Response({
+        "mensaje": f"{len(filas)} asistencias registradas correctamente.",
+        "registradas": len(filas)
+    }, status=status.HTTP_201_CREATED)
+
+
+#Estadísticas del caché de respuestas
+@api_view(['GET'])
+def estadisticas_cache(request):
+    return Response(cache_respuestas.estadisticas())
+
+
+#Resumen semanal de asistencias
+@api_view(['GET'])
+@respuesta_condicional(ResumenAsistenciaSemanal, ResumenAsistenciaSemanalSerializer)
+def resumen_asistencia_semanal(request):
+    """
+    Devuelve una fila por empleado y semana con los días presentes y ausentes.
+    Acepta ?desde= y ?hasta= (YYYY-MM-DD) y ?empleado=<id> como filtros.
+    """
+    resumenes = ResumenAsistenciaSemanal.objects.order_by('semana', 'empleado_id')
+    try:
+        if request.query_params.get('desde'):
+            desde = datetime.strptime(request.query_params['desde'], '%Y-%m-%d').date()
+            resumenes = resumenes.filter(semana__gte=semana_de(desde))
+        if request.query_params.get('hasta'):
+            hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date()
+            resumenes = resumenes.filter(semana__lte=hasta)
+    except ValueError:
+        return Response(
+            {"error": "El formato de la fecha debe ser YYYY-MM-DD"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    empleado_id = request.query_params.get('empleado')
+    if empleado_id:
+        if not empleado_id.isdigit():
+            return Response({"error": "El empleado debe ser un id numérico."}, status=status.HTTP_400_BAD_REQUEST)
+        resumenes = resumenes.filter(empleado_id=empleado_id)
+
+    return lista_paginada(request, resumenes, ResumenAsistenciaSemanalSerializer, orden=('semana', 'id'))
+
+
+# Matriz de asistencias
+@api_view(['GET'])
+def matriz_asistencia(request):
+    """
+    Devuelve la asistencia de cada empleado en un rango de días como dos mapas
+    de bits (presentes y ausentes) en lugar de un registro por día. Acepta
+    ?desde= y ?hasta= (YYYY-MM-DD, por defecto el mes en curso), ?empleado=<id>
+    y ?formato=texto|base64.
+    """
+    try:
+        desde = date.today().replace(day=1)
+        if request.query_params.get('desde'):
+            desde = datetime.strptime(request.query_params['desde'], '%Y-%m-%d').date()
+        hasta = ultimo_dia_del_mes(desde)
+        if request.query_params.get('hasta'):
+            hasta = datetime.strptime(request.query_params['hasta'], '%Y-%m-%d').date()
+    except ValueError:
+        return Response({"error": "El formato de la fecha debe ser YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 <= (hasta - desde).days < MAXIMO_DIAS:
+        return Response(
+            {"error": f"'hasta' debe ser igual o posterior a 'desde' y el rango no puede pasar de {MAXIMO_DIAS} días."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    empleado_id = request.query_params.get('empleado')
+    if empleado_id and not empleado_id.isdigit():
+        return Response({"error": "El empleado debe ser un id numérico."}, status=status.HTTP_400_BAD_REQUEST)
+    formato = request.query_params.get('formato', 'texto')
+    if formato not in FORMATOS:
+        return Response({"error": f"'formato' debe ser uno de: {', '.join(FORMATOS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(matriz_de_asistencia(desde, hasta, int(empleado_id) if empleado_id else None, formato))
 
 
 # CRUD para Empleados
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Empleado, EmpleadoSerializer)
 def empleado_list(request):
     if request.method == 'GET':
         empleados = Empleado.objects.all()
-        serializer = EmpleadoSerializer(empleados, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, empleados, EmpleadoSerializer)
     elif request.method == 'POST':
         serializer = EmpleadoSerializer(data=request.data)
         if serializer.is_valid():
@@ -264,11 +620,11 @@ def empleado_detail(request, pk):
 
 # CRUD para Asistencias
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Asistencia, AsistenciaSerializer)
 def asistencia_list(request):
     if request.method == 'GET':
         asistencias = Asistencia.objects.all()
-        serializer = AsistenciaSerializer(asistencias, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, asistencias, AsistenciaSerializer, orden=('fecha', 'id'))
     elif request.method == 'POST':
         serializer = AsistenciaSerializer(data=request.data)
         if serializer.is_valid():
@@ -298,11 +654,11 @@ def asistencia_detail(request, pk):
 
 # CRUD para Vacaciones
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Vacacion, VacacionSerializer)
 def vacacion_list(request):
     if request.method == 'GET':
         vacaciones = Vacacion.objects.all()
-        serializer = VacacionSerializer(vacaciones, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, vacaciones, VacacionSerializer)
     elif request.method == 'POST':
         serializer = VacacionSerializer(data=request.data)
         if serializer.is_valid():
@@ -330,18 +686,30 @@ def vacacion_detail(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def empleado_solicitado(request):
+    """
+    Id del empleado en el cuerpo de la petición, o None si el cuerpo no es un
+    objeto o el id no es un número (el serializer reporta el error).
+    """
+    empleado_id = request.data.get('empleado') if isinstance(request.data, dict) else None
+    return int(empleado_id) if str(empleado_id).isdigit() else None
+
+
 # CRUD para Vacaciones Tomadas
 @api_view(['GET', 'POST'])
+@respuesta_condicional(VacacionTomada, VacacionTomadaSerializer)
 def vacacion_tomada_list(request):
     if request.method == 'GET':
         vacaciones_tomadas = VacacionTomada.objects.all()
-        serializer = VacacionTomadaSerializer(vacaciones_tomadas, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, vacaciones_tomadas, VacacionTomadaSerializer)
     elif request.method == 'POST':
         serializer = VacacionTomadaSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # La revisión de traslapes, el alta y el ajuste del saldo van juntos
+        with transaction.atomic():
+            bloquear_empleados({empleado_solicitado(request)} - {None})
+            if serializer.is_valid():
+                serializer.save()
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'PUT', 'DELETE'])
@@ -354,23 +722,26 @@ def vacacion_tomada_detail(request, pk):
     
     elif request.method == 'PUT':
         serializer = VacacionTomadaSerializer(vacacion_tomada, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+        with transaction.atomic():
+            bloquear_empleados({vacacion_tomada.empleado_id, empleado_solicitado(request)} - {None})
+            if serializer.is_valid():
+                serializer.save()
+                return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'DELETE':
-        vacacion_tomada.delete()
+        with transaction.atomic():
+            vacacion_tomada.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 # CRUD para Salarios
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Salario, SalarioSerializer)
 def salario_list(request):
     if request.method == 'GET':
         salarios = Salario.objects.all()
-        serializer = SalarioSerializer(salarios, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, salarios, SalarioSerializer)
     elif request.method == 'POST':
         serializer = SalarioSerializer(data=request.data)
         if serializer.is_valid():
@@ -398,13 +769,30 @@ def salario_detail(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+# Proyección de liquidación de préstamos
+@api_view(['GET'])
+def proyeccion_prestamos(request):
+    """
+    Proyecta cuándo se liquida cada préstamo activo y el total de abonos de las
+    próximas ?semanas= nóminas (12 por defecto). Acepta ?empleado=<id>.
+    """
+    semanas = request.query_params.get('semanas', '12')
+    if not semanas.isdigit() or not 1 <= int(semanas) <= 520:
+        return Response({"error": "'semanas' debe ser un número entre 1 y 520."}, status=status.HTTP_400_BAD_REQUEST)
+    empleado_id = request.query_params.get('empleado')
+    if empleado_id and not empleado_id.isdigit():
+        return Response({"error": "El empleado debe ser un id numérico."}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(proyectar_prestamos(int(semanas), empleado_id=int(empleado_id) if empleado_id else None))
+
+
 # CRUD para Préstamos
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Prestamo, PrestamoSerializer)
 def prestamo_list(request):
     if request.method == 'GET':
         prestamos = Prestamo.objects.all()
-        serializer = PrestamoSerializer(prestamos, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, prestamos, PrestamoSerializer)
     elif request.method == 'POST':
         serializer = PrestamoSerializer(data=request.data)
         if serializer.is_valid():
@@ -434,11 +822,11 @@ def prestamo_detail(request, pk):
 
 # CRUD para Abonos
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Abono, AbonoSerializer)
 def abono_list(request):
     if request.method == 'GET':
         abonos = Abono.objects.all()
-        serializer = AbonoSerializer(abonos, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, abonos, AbonoSerializer, orden=('fecha_abono', 'id'))
     elif request.method == 'POST':
         serializer = AbonoSerializer(data=request.data)
         if serializer.is_valid():
@@ -468,11 +856,11 @@ def abono_detail(request, pk):
 
 # CRUD para Pagos
 @api_view(['GET', 'POST'])
+@respuesta_condicional(Pago, PagoSerializer)
 def pago_list(request):
     if request.method == 'GET':
         pagos = Pago.objects.all()
-        serializer = PagoSerializer(pagos, many=True)
-        return Response(serializer.data)
+        return lista_paginada(request, pagos, PagoSerializer, orden=('fecha_pago', 'id'))
     elif request.method == 'POST':
         serializer = PagoSerializer(data=request.data)
         if serializer.is_valid():
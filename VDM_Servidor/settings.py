@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Servidor.instrumentacion.InstrumentacionMiddleware',
      "corsheaders.middleware.CorsMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -88,11 +90,65 @@ WSGI_APPLICATION = 'VDM_Servidor.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Conexiones persistentes: cada hilo de gunicorn reutiliza su conexión durante
+# CONN_MAX_AGE segundos y la verifica antes de usarla tras un error o un corte.
+# (El pool nativo de Django requiere psycopg 3; el proyecto usa psycopg2.)
 DATABASES = {
-    'default': dj_database_url.config(default=os.getenv('DATABASE_URL'))
+    'default': dj_database_url.config(
+        default=os.getenv('DATABASE_URL'),
+        conn_max_age=int(os.getenv('CONN_MAX_AGE', 600)),
+        conn_health_checks=True,
+    )
 }
 
 
+# Caché de respuestas de las consultas por fecha y por empleado
+# (Servidor/cache_respuestas.py). RESPUESTAS_CACHE=archivos comparte el caché
+# entre los workers de gunicorn; 'memoria' (por defecto) es por proceso y lee
+# de la base de datos las versiones que invalidan sus respuestas. Ambos
+# desalojan las entradas menos usadas al llegar a MAX_ENTRIES.
+RESPUESTAS_CACHE = os.getenv('RESPUESTAS_CACHE', 'memoria')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'respuestas': {
+        'BACKEND': (
+            'Servidor.cache_respuestas.CacheArchivosLRU' if RESPUESTAS_CACHE == 'archivos'
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': (
+            os.getenv('RESPUESTAS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'vdm_cache_respuestas'))
+            if RESPUESTAS_CACHE == 'archivos' else 'vdm-respuestas'
+        ),
+        'TIMEOUT': 86400,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RESPUESTAS_CACHE_MAX_ENTRADAS', 5000)),
+        },
+    },
+}
+
+
+# Paginación por cursor de las listas (Servidor/paginacion.py). Sin límite por
+# defecto las listas se entregan completas salvo que el cliente envíe ?limite=
+# o ?cursor=.
+PAGINACION_LIMITE_POR_DEFECTO = int(os.getenv('PAGINACION_LIMITE_POR_DEFECTO', 0)) or None
+PAGINACION_LIMITE_MAXIMO = 1000
+
+# Medición por petición (Servidor/instrumentacion.py): cabecera Server-Timing y
+# registro en el log de las peticiones que pasan del umbral con sus consultas
+# más lentas.
+INSTRUMENTACION_ACTIVA = os.getenv('INSTRUMENTACION_ACTIVA', '1') != '0'
+INSTRUMENTACION_UMBRAL_LENTO_MS = int(os.getenv('INSTRUMENTACION_UMBRAL_LENTO_MS', 500))
+INSTRUMENTACION_CONSULTAS_TOP = 5
+
+# Las faltas de la nómina se cuentan con los mapas de bits del resumen semanal
+# (Servidor/resumen_asistencia.py), que se escriben junto con cada Asistencia.
+# Con 0 se vuelven a contar sobre los registros diarios.
+ASISTENCIA_FALTAS_DESDE_MAPAS = os.getenv('ASISTENCIA_FALTAS_DESDE_MAPAS', '1') != '0'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+# Perfil de producción de gunicorn (se usa desde el Procfile con -c).
+#
+# Workers gthread: cada proceso atiende varias peticiones a la vez con hilos,
+# lo que conviene porque casi todo el tiempo de una petición es espera de la
+# base de datos. Cada hilo mantiene su propia conexión persistente
+# (CONN_MAX_AGE), así que el total de conexiones es workers x threads.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# La aplicación se importa una vez antes de crear los workers: arrancan más
+# rápido y comparten la memoria del código cargado
+preload_app = True
+
+# Reinicia cada worker después de N peticiones (con variación para que no se
+# reinicien todos a la vez) para acotar el crecimiento de memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    # Con preload_app ningún worker debe heredar una conexión abierta por el proceso principal
+    from django.db import connections
+    connections.close_all()